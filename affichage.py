@@ -0,0 +1,173 @@
+from micropython import const
+from ssd1306 import SSD1306_I2C
+
+# Commandes SSD1306 pour l'adressage par fenêtre (mode horizontal)
+_SET_COL_ADDR = const(0x21)
+_SET_PAGE_ADDR = const(0x22)
+
+_PROPRE = const(0xFF)  # Marqueur "page non modifiée" dans _col_min
+
+
+class EcranPartiel(SSD1306_I2C):
+    """
+    Écran SSD1306 qui n'envoie sur l'I2C que les octets modifiés.
+
+    Chaque primitive de dessin marque les pages de 8 lignes et la plage de
+    colonnes touchées. Au moment de show(), la plage marquée est encore
+    réduite en la comparant à une copie de ce qui a déjà été envoyé, puis
+    seule la fenêtre (page, colonnes) qui a réellement changé est transmise.
+    """
+
+    def __init__(self, width, height, i2c, addr=0x3C, external_vcc=False):
+        # Ces attributs doivent exister avant super().__init__, qui appelle
+        # déjà fill() et show() via init_display()
+        self._nb_pages = height // 8
+        self._col_min = bytearray(b'\xff' * self._nb_pages)
+        self._col_max = bytearray(self._nb_pages)
+        self._ombre = bytearray(self._nb_pages * width)
+        self._cmd_fenetre = bytearray((0x00, _SET_COL_ADDR, 0, 0, _SET_PAGE_ADDR, 0, 0))
+        self._decalage_col = (128 - width) // 2 if width != 128 else 0
+        self._vue = None
+        self._forcer = True
+
+        # Statistiques de transfert
+        self.octets_envoyes = 0
+        self.nb_flush = 0
+        self.nb_fenetres = 0
+
+        super().__init__(width, height, i2c, addr, external_vcc)
+
+    def _marquer(self, x, y, w, h):
+        """Marque la zone (x, y, w, h) comme modifiée"""
+        if w <= 0 or h <= 0:
+            return
+        x1 = x + w - 1
+        y1 = y + h - 1
+        if x1 < 0 or y1 < 0 or x >= self.width or y >= self.height:
+            return
+        if x < 0:
+            x = 0
+        if y < 0:
+            y = 0
+        if x1 >= self.width:
+            x1 = self.width - 1
+        if y1 >= self.height:
+            y1 = self.height - 1
+
+        col_min = self._col_min
+        col_max = self._col_max
+        for page in range(y >> 3, (y1 >> 3) + 1):
+            if col_min[page] == _PROPRE:
+                col_min[page] = x
+                col_max[page] = x1
+            else:
+                if x < col_min[page]:
+                    col_min[page] = x
+                if x1 > col_max[page]:
+                    col_max[page] = x1
+
+    def marquer_tout(self):
+        """Force l'envoi complet de l'écran au prochain show()"""
+        self._forcer = True
+
+    # ----- Primitives de dessin (marquage puis dessin) -----
+    def fill(self, c):
+        self._marquer(0, 0, self.width, self.height)
+        super().fill(c)
+
+    def pixel(self, x, y, c=None):
+        if c is None:
+            return super().pixel(x, y)
+        self._marquer(x, y, 1, 1)
+        super().pixel(x, y, c)
+
+    def fill_rect(self, x, y, w, h, c):
+        self._marquer(x, y, w, h)
+        super().fill_rect(x, y, w, h, c)
+
+    def rect(self, x, y, w, h, c, *args):
+        self._marquer(x, y, w, h)
+        super().rect(x, y, w, h, c, *args)
+
+    def hline(self, x, y, w, c):
+        self._marquer(x, y, w, 1)
+        super().hline(x, y, w, c)
+
+    def vline(self, x, y, h, c):
+        self._marquer(x, y, 1, h)
+        super().vline(x, y, h, c)
+
+    def line(self, x0, y0, x1, y1, c):
+        self._marquer(min(x0, x1), min(y0, y1), abs(x1 - x0) + 1, abs(y1 - y0) + 1)
+        super().line(x0, y0, x1, y1, c)
+
+    def text(self, s, x, y, c=1):
+        self._marquer(x, y, 8 * len(s), 8)
+        super().text(s, x, y, c)
+
+    def blit(self, fbuf, x, y, *args):
+        # La taille de la source n'est pas connue: on marque depuis (x, y)
+        # jusqu'au bord, la comparaison avec l'ombre réduira la fenêtre
+        self._marquer(x, y, self.width - x, self.height - y)
+        super().blit(fbuf, x, y, *args)
+
+    def blit_zone(self, fbuf, x, y, w, h, *args):
+        """blit() d'une source de taille connue: seule sa zone est marquée"""
+        self._marquer(x, y, w, h)
+        super().blit(fbuf, x, y, *args)
+
+    def scroll(self, dx, dy):
+        self._marquer(0, 0, self.width, self.height)
+        super().scroll(dx, dy)
+
+    # ----- Envoi -----
+    def _envoyer_fenetre(self, page, c0, c1):
+        """Envoie les colonnes c0..c1 d'une page avec une seule commande de fenêtre"""
+        cmd = self._cmd_fenetre
+        cmd[2] = c0 + self._decalage_col
+        cmd[3] = c1 + self._decalage_col
+        cmd[5] = page
+        cmd[6] = page
+        self.i2c.writeto(self.addr, cmd)
+        debut = page * self.width
+        self.write_data(self._vue[debut + c0:debut + c1 + 1])
+        self.octets_envoyes += c1 - c0 + 1 + len(cmd)
+        self.nb_fenetres += 1
+
+    def show(self):
+        """Envoie uniquement les pages et colonnes modifiées depuis le dernier envoi"""
+        if self._vue is None:
+            self._vue = memoryview(self.buffer)
+        self.nb_flush += 1
+
+        if self._forcer:
+            # Premier envoi (contenu de la RAM de l'écran inconnu) ou envoi forcé
+            super().show()
+            self._ombre[:] = self.buffer
+            self.octets_envoyes += len(self.buffer)
+            self._forcer = False
+            for page in range(self._nb_pages):
+                self._col_min[page] = _PROPRE
+            return
+
+        buf = self.buffer
+        ombre = self._ombre
+        largeur = self.width
+        for page in range(self._nb_pages):
+            c0 = self._col_min[page]
+            if c0 == _PROPRE:
+                continue
+            c1 = self._col_max[page]
+            self._col_min[page] = _PROPRE
+
+            # Réduire la fenêtre aux colonnes qui diffèrent réellement
+            debut = page * largeur
+            while c0 <= c1 and buf[debut + c0] == ombre[debut + c0]:
+                c0 += 1
+            while c1 >= c0 and buf[debut + c1] == ombre[debut + c1]:
+                c1 -= 1
+            if c0 > c1:
+                continue
+
+            self._envoyer_fenetre(page, c0, c1)
+            ombre[debut + c0:debut + c1 + 1] = self._vue[debut + c0:debut + c1 + 1]
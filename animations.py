@@ -0,0 +1,138 @@
+try:
+    from micropython import const
+except ImportError:
+    # Construction des tables sur l'hôte (bancs d'essai sous CPython)
+    def const(x):
+        return x
+
+_ORDRE_DEFAUT = (1, 0, 2, 3)  # Ordre GRB utilisé par le module neopixel
+_PLEIN = const(255)
+
+
+def table_correction(luminosite=255, gamma=2.2):
+    """
+    Table de 256 octets: niveau perçu (0-255) -> niveau PWM du ruban, avec
+    correction gamma et luminosité globale. Calcul flottant, une seule fois
+    à la construction des animations.
+    """
+    lut = bytearray(256)
+    for i in range(256):
+        lut[i] = int((i / 255) ** gamma * luminosite + 0.5)
+    return lut
+
+
+class Animation:
+    """
+    Motif périodique précalculé pour une plage de LEDs.
+
+    Le motif est une suite d'étapes: chaque étape est une séquence de
+    niveaux (0 à 255), un par LED, de `debut` vers `fin` (debut > fin pour
+    un balayage vers les indices décroissants). À la construction, chaque
+    niveau passe par la table de correction `lut` puis multiplie `couleur`:
+    un niveau 255 à luminosité maximale donne exactement `couleur`, les
+    niveaux intermédiaires (fondus) suivent la courbe gamma. Les trames sont
+    rangées dans deux bytearray, octets déjà dans l'ordre du ruban et masque
+    de couverture, de la plus petite à la plus grande LED de la plage: la
+    lecture n'est plus qu'une copie.
+
+    Sans `opaque`, un niveau 0 laisse voir les couches inférieures. Avec
+    `opaque`, les LEDs de `couvertes` (toutes par défaut) restent couvertes,
+    en noir au niveau 0.
+    """
+
+    def __init__(self, debut, fin, etapes, couleur, lut=None, opaque=False, couvertes=None,
+                 ordre=_ORDRE_DEFAUT):
+        n = abs(fin - debut) + 1
+        self.bas = min(debut, fin)
+        self.haut = max(debut, fin)
+        self.n = n
+        self.nb_trames = len(etapes)
+        self.octets = bytearray(self.nb_trames * n * 3)
+        self.masques = bytearray(self.nb_trames * n)
+        pas = 1 if fin >= debut else -1
+        o0 = ordre[0]
+        o1 = ordre[1]
+        o2 = ordre[2]
+        for t, niveaux in enumerate(etapes):
+            if len(niveaux) != n:
+                raise ValueError("étape de {} niveaux pour {} LEDs".format(len(niveaux), n))
+            for k in range(n):
+                i = debut + k * pas - self.bas      # Position dans la plage
+                niveau = niveaux[k]
+                if lut is not None:
+                    niveau = lut[niveau]
+                o = (t * n + i) * 3
+                self.octets[o + o0] = couleur[0] * niveau // _PLEIN
+                self.octets[o + o1] = couleur[1] * niveau // _PLEIN
+                self.octets[o + o2] = couleur[2] * niveau // _PLEIN
+                if opaque:
+                    couverte = 1 if couvertes is None else couvertes[k]
+                else:
+                    couverte = 1 if niveaux[k] else 0
+                self.masques[t * n + i] = couverte
+        self._octets = memoryview(self.octets)
+        self._masques = memoryview(self.masques)
+
+    def trame(self, t):
+        """(octets, masque) de la trame t, vues sans copie sur les tables"""
+        n = self.n
+        return self._octets[t * n * 3:(t + 1) * n * 3], self._masques[t * n:(t + 1) * n]
+
+
+# ----- Motifs usuels (de simples tables de niveaux) -----
+def point_mobile(n):
+    """Une seule LED allumée, qui avance d'une LED par étape"""
+    return [bytes(_PLEIN if k == t else 0 for k in range(n)) for t in range(n)]
+
+
+def remplissage(n, pause=2):
+    """Balayage séquentiel: les LEDs s'allument une à une, puis tout s'éteint"""
+    etapes = [bytes(_PLEIN if k < t else 0 for k in range(n)) for t in range(1, n + 1)]
+    etapes += [bytes(n)] * pause
+    return etapes
+
+
+def clignotement(n, allume=1, eteint=1):
+    """Toutes les LEDs allumées `allume` étapes, puis éteintes `eteint` étapes"""
+    return [bytes([_PLEIN] * n)] * allume + [bytes(n)] * eteint
+
+
+def fondu(n, nb_etapes=8):
+    """Montée puis descente progressive (niveaux perçus, corrigés par la table)"""
+    montee = [bytes([_PLEIN * t // nb_etapes] * n) for t in range(1, nb_etapes + 1)]
+    return montee + montee[-2::-1] + [bytes(n)]
+
+
+class Lecteur:
+    """
+    Joue une animation dans une couche du compositeur, une trame par appel
+    d'avancer() (la période vient de la tâche qui l'appelle).
+    """
+
+    def __init__(self, couche):
+        self.couche = couche
+        self.animation = None
+        self.indice = 0
+
+    def jouer(self, animation):
+        """Repart de la première trame (libère la plage de l'animation précédente)"""
+        if self.animation is not None and self.animation is not animation:
+            self.couche.liberer(self.animation.bas, self.animation.haut)
+        self.animation = animation
+        self.indice = 0
+
+    def arreter(self):
+        """Rend la plage de l'animation transparente"""
+        if self.animation is not None:
+            self.couche.liberer(self.animation.bas, self.animation.haut)
+            self.animation = None
+
+    def avancer(self, timer=None):
+        animation = self.animation
+        if animation is None:
+            return
+        octets, masque = animation.trame(self.indice)
+        self.couche.copier(animation.bas, octets, masque)
+        self.indice += 1
+        if self.indice >= animation.nb_trames:
+            self.indice = 0
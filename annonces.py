@@ -0,0 +1,161 @@
+import time
+from micropython import const
+
+# Types de structures AD (Bluetooth Core Supplement, partie A)
+_AD_UUID16_INCOMPLET = const(0x02)
+_AD_UUID16_COMPLET = const(0x03)
+_AD_NOM_COURT = const(0x08)
+_AD_NOM_COMPLET = const(0x09)
+
+# Services recherchés dans les annonces
+UUID_CYCLING_POWER = const(0x1818)
+UUID_HEART_RATE = const(0x180D)
+UUID_CSC = const(0x1816)  # Cycling Speed and Cadence
+
+_TAILLE_ADRESSE = const(6)
+
+
+def contient_uuid16(adv, uuid):
+    """Vrai si l'annonce liste le service 16 bits `uuid` (parcours sur place)"""
+    n = len(adv)
+    i = 0
+    while i + 1 < n:
+        longueur = adv[i]
+        if longueur == 0:
+            break
+        fin = i + 1 + longueur
+        if fin > n:
+            break
+        type_ad = adv[i + 1]
+        if type_ad == _AD_UUID16_INCOMPLET or type_ad == _AD_UUID16_COMPLET:
+            j = i + 2
+            while j + 1 < fin:
+                if adv[j] | (adv[j + 1] << 8) == uuid:
+                    return True
+                j += 2
+        i = fin
+    return False
+
+
+def nom_commence_par(adv, prefixe):
+    """Vrai si le nom (court ou complet) de l'annonce commence par `prefixe` (bytes)"""
+    n = len(adv)
+    p = len(prefixe)
+    i = 0
+    while i + 1 < n:
+        longueur = adv[i]
+        if longueur == 0:
+            break
+        fin = i + 1 + longueur
+        if fin > n:
+            break
+        type_ad = adv[i + 1]
+        if (type_ad == _AD_NOM_COURT or type_ad == _AD_NOM_COMPLET) and longueur - 1 >= p:
+            k = 0
+            while k < p and adv[i + 2 + k] == prefixe[k]:
+                k += 1
+            if k == p:
+                return True
+        i = fin
+    return False
+
+
+class FiltreScan:
+    """
+    Filtre des résultats de scan, utilisable dans l'IRQ (aucune allocation).
+
+    Une annonce est candidate si son adresse est dans la liste blanche, si
+    elle annonce un des services 16 bits recherchés ou si son nom commence
+    par un des préfixes donnés. Chaque annonceur n'est examiné qu'une fois
+    par fenêtre de scan: les annonces répétées (candidates ou non) sont
+    écartées sans analyse grâce à une petite table d'adresses déjà vues.
+    Une candidate que l'appelant n'a pas pu transmettre (file pleine) doit
+    être rendue par oublier(), sinon elle serait ignorée jusqu'à la fin de
+    la fenêtre.
+    """
+
+    def __init__(self, adresses=(), uuids=(), noms=(), taille_table=16, fenetre_ms=5000):
+        self.adresses = tuple(adresses)
+        self.uuids = tuple(uuids)
+        self.noms = tuple(noms)
+        self.fenetre_ms = fenetre_ms
+        self._taille = taille_table
+        self._vus = bytearray(taille_table * _TAILLE_ADRESSE)
+        self._nb_vus = 0
+        self._prochain = 0
+        self._debut = time.ticks_ms()
+
+        # Statistiques
+        self.nb_candidats = 0
+        self.nb_rejets = 0
+        self.nb_doublons = 0
+
+    def nouvelle_fenetre(self):
+        """Oublie les annonceurs vus (à appeler au démarrage d'un scan)"""
+        self._nb_vus = 0
+        self._prochain = 0
+        self._debut = time.ticks_ms()
+
+    def _indice(self, addr):
+        """Entrée de la table qui contient `addr`, ou -1"""
+        vus = self._vus
+        for e in range(self._nb_vus):
+            o = e * _TAILLE_ADRESSE
+            k = 0
+            while k < _TAILLE_ADRESSE and vus[o + k] == addr[k]:
+                k += 1
+            if k == _TAILLE_ADRESSE:
+                return e
+        return -1
+
+    def _memoriser(self, addr):
+        # Table pleine: on remplace les entrées les plus anciennes
+        o = self._prochain * _TAILLE_ADRESSE
+        for k in range(_TAILLE_ADRESSE):
+            self._vus[o + k] = addr[k]
+        self._prochain = (self._prochain + 1) % self._taille
+        if self._nb_vus < self._taille:
+            self._nb_vus += 1
+
+    def oublier(self, addr):
+        """Retire `addr` des annonceurs vus: sa prochaine annonce sera réexaminée"""
+        e = self._indice(addr)
+        if e < 0:
+            return
+        # La dernière entrée de la table prend sa place; la table n'est plus pleine
+        self._nb_vus -= 1
+        dernier = self._nb_vus
+        o = e * _TAILLE_ADRESSE
+        od = dernier * _TAILLE_ADRESSE
+        for k in range(_TAILLE_ADRESSE):
+            self._vus[o + k] = self._vus[od + k]
+        self._prochain = dernier
+
+    def _correspond(self, addr, adv):
+        for adresse in self.adresses:
+            k = 0
+            while k < _TAILLE_ADRESSE and adresse[k] == addr[k]:
+                k += 1
+            if k == _TAILLE_ADRESSE:
+                return True
+        for uuid in self.uuids:
+            if contient_uuid16(adv, uuid):
+                return True
+        for nom in self.noms:
+            if nom_commence_par(adv, nom):
+                return True
+        return False
+
+    def accepter(self, addr, adv):
+        """Vrai si l'annonce est une nouvelle candidate dans la fenêtre courante"""
+        if time.ticks_diff(time.ticks_ms(), self._debut) > self.fenetre_ms:
+            self.nouvelle_fenetre()
+        if self._indice(addr) >= 0:
+            self.nb_doublons += 1
+            return False
+        self._memoriser(addr)
+        if self._correspond(addr, adv):
+            self.nb_candidats += 1
+            return True
+        self.nb_rejets += 1
+        return False
@@ -1,7 +1,12 @@
 import bluetooth
 from micropython import const
 import time
-import struct
+import cpm
+import cadence
+import evenements_ble
+import cache_gatt
+import annonces
+import batterie_ble
 
 # BLE Event IRQs
 _IRQ_SCAN_RESULT = const(5)
@@ -13,6 +18,7 @@ _IRQ_GATTC_SERVICE_DONE = const(10)
 _IRQ_GATTC_CHARACTERISTIC_RESULT = const(11)
 _IRQ_GATTC_CHARACTERISTIC_DONE = const(12)
 _IRQ_GATTC_READ_RESULT = const(15)
+_IRQ_GATTC_READ_DONE = const(16)
 _IRQ_GATTC_WRITE_DONE = const(17)
 _IRQ_GATTC_NOTIFY = const(18)
 
@@ -25,22 +31,45 @@ CPM_MEASUREMENT_UUID = bluetooth.UUID(0x2A63)  # Cycling Power Measurement
 BATTERY_SERVICE_UUID = bluetooth.UUID(0x180F)  # Battery Service
 BATTERY_LEVEL_UUID = bluetooth.UUID(0x2A19)  # Battery Level
 
+# Clés des handles dans le cache GATT (UUID 16 bits en hexadécimal)
+_CLE_CPM_SERVICE = "1818"
+_CLE_CPM_MEASUREMENT = "2a63"
+_CLE_BATTERY_SERVICE = "180f"
+_CLE_BATTERY_LEVEL = "2a19"
+
 # Variables globales
 ble_connected = False
 current_power = 0
 battery_level = 0
 
 class AssiomaBLEClient:
-    def __init__(self):
+    def __init__(self, drainage_auto=True):
         self.ble = bluetooth.BLE()
         self.ble.active(True)
-        self.ble.irq(self._irq)
+
+        # Les événements BLE sont copiés par l'IRQ puis traités hors interruption:
+        # via micropython.schedule, ou par le propriétaire qui appelle
+        # traiter_evenements() (cœur 1 en mode double cœur)
+        # (UUID gardés par indice dans cette table: l'objet de l'IRQ est réutilisé)
+        self.evenements = evenements_ble.FileEvenements(
+            16, self.traiter_evenements if drainage_auto else None,
+            uuids=(CPM_SERVICE_UUID, BATTERY_SERVICE_UUID, CPM_MEASUREMENT_UUID, BATTERY_LEVEL_UUID))
+        # Seule la pédale cible passe, une fois par fenêtre de scan
+        self.filtre_scan = annonces.FiltreScan(adresses=(target_mac,))
+        self._adresse_visee = None  # Adresse du gap_connect en cours
+        evenements_ble.aiguillage_partage(self.ble).ajouter(self)
 
         # Handles pour la connexion et les caractéristiques
         self.conn_handle = None
         self.cpm_measurement_handle = None
         self.battery_level_handle = None
         self.cccd_handles = {}
+        self.peer_addr = None
+        self.peer_addr_type = None  # Connu après la première annonce reçue
+
+        # Handles découverts, mémorisés en flash par adresse de pédale
+        self.cache = cache_gatt.cache_partage()
+        self._handles_en_cache = False
         
         # Variables d'état
         self._scan_done = False
@@ -48,19 +77,51 @@ class AssiomaBLEClient:
         self._discovering_services = False
         self._discovering_chars = False
         self._write_pending = False
-        self._read_pending = False
         
         # Données
+        self.mesure = cpm.MesureCPM()  # Dernière mesure complète, mise à jour sur place
+        self.cadence = cadence.MoteurCadence()  # Cadence/vitesse issues des compteurs CPM
         self.last_power = 0
-        self.last_battery = 0
+        # Niveau de batterie en cache: notifications si possible, sinon lectures espacées
+        self.batterie = batterie_ble.ServiceBatterie(self.ble)
+        self._proprietes_batterie = 0
         self.scan_started = False
         
-    def start_scan(self):
+    def start_scan(self, duree_ms=10000, interval_us=30000, window_us=30000):
         """Démarre le scan pour trouver la pédale Assioma"""
         if not self.scan_started:
-            self.ble.gap_scan(10000, 30000, 30000)
+            self.filtre_scan.nouvelle_fenetre()
+            self.ble.gap_scan(duree_ms, interval_us, window_us)
             self.scan_started = True
-            
+
+    def connecter(self, addr_type, addr, duree_ms=2000):
+        """Connexion directe à une adresse connue, sans scan préalable"""
+        if self._connecting or self.conn_handle is not None:
+            return False
+        self.stop_scan()
+        try:
+            self._connecting = True
+            self._adresse_visee = bytes(addr)
+            self.ble.gap_connect(addr_type, addr, duree_ms)
+            return True
+        except OSError as e:
+            print(f"Erreur connexion directe: {e}")
+            self._connecting = False
+            return False
+
+    def annuler_connexion(self):
+        """Abandonne une tentative de connexion en cours"""
+        if self._connecting and self.conn_handle is None:
+            try:
+                self.ble.gap_connect(None)
+            except OSError as e:
+                print(f"Erreur annulation connexion: {e}")
+            self._connecting = False
+
+    def connexion_en_cours(self):
+        """Vrai si une tentative de connexion (directe ou après scan) est en cours"""
+        return self._connecting
+
     def stop_scan(self):
         """Arrête le scan BLE en cours"""
         if self.scan_started:
@@ -68,129 +129,213 @@ class AssiomaBLEClient:
             self.scan_started = False
             self._scan_done = True
 
+    def accepte_connexion(self, adresse):
+        """Vrai si la connexion (ou son échec) vers `adresse` est la nôtre (appelé depuis l'IRQ)"""
+        return self._connecting and self._adresse_visee is not None \
+            and evenements_ble.meme_adresse(adresse, self._adresse_visee)
+
     def _irq(self, event, data):
-        try:
-            if event == _IRQ_SCAN_RESULT:
-                addr_type, addr, adv_type, rssi, adv_data = data
-                if addr == target_mac and not self._connecting:
-                    print(f"Pédale Assioma trouvée! RSSI: {rssi} dBm. Connexion en cours...")
-                    self._connecting = True
-                    # Arrêter le scan avant de se connecter
-                    self.ble.gap_scan(None)
-                    self.scan_started = False
-                    time.sleep_ms(200)
-                    self.ble.gap_connect(addr_type, addr)
-
-            elif event == _IRQ_SCAN_DONE:
-                self._scan_done = True
+        # Contexte d'interruption: on ne fait que copier l'événement dans la file
+        file = self.evenements
+        if event == _IRQ_SCAN_RESULT:
+            addr_type, addr, adv_type, rssi, adv_data = data
+            if not self._connecting and self.filtre_scan.accepter(addr, adv_data):
+                if not file.pousser_annonce(event, addr_type, adv_type, rssi, addr, adv_data):
+                    # File pleine: la prochaine annonce de cet annonceur sera réexaminée
+                    self.filtre_scan.oublier(addr)
+
+        elif event == _IRQ_PERIPHERAL_CONNECT or event == _IRQ_PERIPHERAL_DISCONNECT:
+            conn_handle, addr_type, addr = data
+            file.pousser(event, conn_handle, addr_type, 0, 0, addr, None, None)
+
+        elif event == _IRQ_GATTC_SERVICE_RESULT:
+            conn_handle, start_handle, end_handle, uuid = data
+            file.pousser(event, conn_handle, start_handle, end_handle, 0, None, None, uuid)
+
+        elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
+            conn_handle, def_handle, value_handle, properties, uuid = data
+            file.pousser(event, conn_handle, value_handle, def_handle, properties, None, None, uuid)
+
+        elif event == _IRQ_GATTC_SERVICE_DONE or event == _IRQ_GATTC_CHARACTERISTIC_DONE:
+            conn_handle, status = data
+            file.pousser(event, conn_handle, status, 0, 0, None, None, None)
+
+        elif event == _IRQ_GATTC_READ_RESULT or event == _IRQ_GATTC_NOTIFY:
+            conn_handle, value_handle, donnees = data
+            file.pousser(event, conn_handle, value_handle, 0, 0, None, donnees, None)
+
+        elif event == _IRQ_GATTC_WRITE_DONE or event == _IRQ_GATTC_READ_DONE:
+            conn_handle, value_handle, status = data
+            file.pousser(event, conn_handle, value_handle, status, 0, None, None, None)
+
+        elif event == _IRQ_SCAN_DONE:
+            file.pousser(event, 0, 0, 0, 0, None, None, None)
+
+    def traiter_evenements(self):
+        """Traite les événements BLE en attente (hors IRQ)"""
+        file = self.evenements
+        i = file.premier()
+        while i >= 0:
+            try:
+                self._traiter_evenement(file, i)
+            except Exception as e:
+                print(f"Erreur BLE: {e}")
+            file.liberer()
+            i = file.premier()
+
+    def _traiter_evenement(self, file, i):
+        global ble_connected, battery_level
+        event = file.code(i)
+
+        if event == _IRQ_GATTC_NOTIFY:
+            value_handle = file.b(i)
+            if value_handle == self.cpm_measurement_handle:
+                if file.tronque(i):
+                    # Champs de fin perdus: trame ignorée plutôt que mal lue
+                    self.mesure.nb_erreurs += 1
+                    return
+                self._parse_power_measurement(file.donnees(i))
+            elif value_handle == self.battery_level_handle:
+                # Notifications de batterie (si l'abonnement a été accepté)
+                self.batterie.sur_valeur(file.donnees(i)[0], time.ticks_ms(), notification=True)
+                battery_level = self.batterie.niveau_pct
+
+        elif event == _IRQ_SCAN_RESULT:
+            if not self._connecting:
+                print(f"Pédale Assioma trouvée! RSSI: {file.d(i)} dBm. Connexion en cours...")
+                self._connecting = True
+                # Arrêter le scan avant de se connecter
+                self.ble.gap_scan(None)
                 self.scan_started = False
+                self.peer_addr_type = file.a(i)
+                self._adresse_visee = bytes(file.adresse(i))
+                try:
+                    self.ble.gap_connect(file.a(i), self._adresse_visee)
+                except OSError as e:
+                    # Ex. EALREADY: la ceinture cardio se connecte; le scan reprendra
+                    print(f"Erreur connexion: {e}")
+                    self._connecting = False
 
+        elif event == _IRQ_SCAN_DONE:
+            self._scan_done = True
+            self.scan_started = False
 
-            elif event == _IRQ_PERIPHERAL_CONNECT:
-                conn_handle, addr_type, addr = data
-                global ble_connected
-                ble_connected = True
-                self.conn_handle = conn_handle
-                # Découverte des services après délai
-                time.sleep_ms(500)
+        elif event == _IRQ_PERIPHERAL_CONNECT:
+            ble_connected = True
+            self.conn_handle = file.a(i)
+            self.peer_addr = bytes(file.adresse(i))
+            self.peer_addr_type = file.b(i)
+            # Abonnement immédiat si les handles sont connus, sinon découverte complète
+            if not self._abonner_depuis_cache():
                 self._start_service_discovery()
 
-            elif event == _IRQ_PERIPHERAL_DISCONNECT:
-                conn_handle, _, _ = data
-                global ble_connected
-                ble_connected = False
-                self._reset_state()
-
-            elif event == _IRQ_GATTC_SERVICE_RESULT:
-                conn_handle, start_handle, end_handle, uuid = data
-                if uuid == CPM_SERVICE_UUID:
-                    self._cpm_service_start_handle = start_handle
-                    self._cpm_service_end_handle = end_handle
-                elif uuid == BATTERY_SERVICE_UUID:
-                    self._battery_service_start_handle = start_handle
-                    self._battery_service_end_handle = end_handle
-
-            elif event == _IRQ_GATTC_SERVICE_DONE:
-                conn_handle, status = data
-                self._discovering_services = False
-                time.sleep_ms(500)
-                # Découvrir les caractéristiques du service de puissance en premier
-                self._discover_characteristics(self._cpm_service_start_handle, self._cpm_service_end_handle)
-
-            elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
-                conn_handle, def_handle, value_handle, properties, uuid = data
-                if uuid == CPM_MEASUREMENT_UUID:
-                    self.cpm_measurement_handle = value_handle
-                    # Stocker le handle CCCD (pour les notifications)
-                    self.cccd_handles[self.cpm_measurement_handle] = value_handle + 1
-                elif uuid == BATTERY_LEVEL_UUID:
-                    self.battery_level_handle = value_handle
-                    # Stocker le handle CCCD (pour les notifications optionnelles)
-                    self.cccd_handles[self.battery_level_handle] = value_handle + 1
-            
-            elif event == _IRQ_GATTC_CHARACTERISTIC_DONE:
-                conn_handle, status = data
-                self._discovering_chars = False
-                
-                # S'il nous reste à découvrir les caractéristiques de batterie
-                if hasattr(self, '_battery_service_start_handle') and not self.battery_level_handle:
-                    time.sleep_ms(500)
-                    self._discover_characteristics(self._battery_service_start_handle, self._battery_service_end_handle)
-                else:
-                    # Configuration des notifications pour la puissance
-                    time.sleep_ms(500)
-                    self._setup_notifications()
-                    
-                    # Lecture initiale du niveau de batterie
-                    if self.battery_level_handle:
-                        time.sleep_ms(500)
-                        self.read_battery_level()
-
-            elif event == _IRQ_GATTC_READ_RESULT:
-                conn_handle, value_handle, data = data
-                if value_handle == self.battery_level_handle:
-                    self._read_pending = False
-                    battery = struct.unpack("<B", data)[0]
-                    self.last_battery = battery
-                    global battery_level
-                    battery_level = battery
-                    print(f"Niveau de batterie: {battery}%")
-
-            elif event == _IRQ_GATTC_WRITE_DONE:
-                conn_handle, value_handle, status = data
-                self._write_pending = False
+        elif event == _IRQ_PERIPHERAL_DISCONNECT:
+            ble_connected = False
+            self._reset_state()
 
-            elif event == _IRQ_GATTC_NOTIFY:
-                conn_handle, value_handle, notify_data = data
-                if value_handle == self.cpm_measurement_handle:
-                    self._parse_power_measurement(notify_data)
-                elif value_handle == self.battery_level_handle:
-                    # Si on reçoit des notifications de batterie
-                    battery = struct.unpack("<B", notify_data)[0]
-                    self.last_battery = battery
-                    global battery_level
-                    battery_level = battery
+        elif event == _IRQ_GATTC_SERVICE_RESULT:
+            uuid = file.uuid(i)
+            if uuid == CPM_SERVICE_UUID:
+                self._cpm_service_start_handle = file.b(i)
+                self._cpm_service_end_handle = file.c(i)
+            elif uuid == BATTERY_SERVICE_UUID:
+                self._battery_service_start_handle = file.b(i)
+                self._battery_service_end_handle = file.c(i)
 
-        except Exception as e:
-            print(f"Erreur BLE: {e}")
+        elif event == _IRQ_GATTC_SERVICE_DONE:
+            self._discovering_services = False
+            # Découvrir les caractéristiques du service de puissance en premier
+            self._discover_characteristics(self._cpm_service_start_handle, self._cpm_service_end_handle)
+
+        elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
+            uuid = file.uuid(i)
+            value_handle = file.b(i)
+            if uuid == CPM_MEASUREMENT_UUID:
+                self.cpm_measurement_handle = value_handle
+                # Stocker le handle CCCD (pour les notifications)
+                self.cccd_handles[self.cpm_measurement_handle] = value_handle + 1
+            elif uuid == BATTERY_LEVEL_UUID:
+                self.battery_level_handle = value_handle
+                self._proprietes_batterie = file.d(i)
+                # Stocker le handle CCCD (pour les notifications optionnelles)
+                self.cccd_handles[self.battery_level_handle] = value_handle + 1
+
+        elif event == _IRQ_GATTC_CHARACTERISTIC_DONE:
+            self._discovering_chars = False
+
+            # S'il nous reste à découvrir les caractéristiques de batterie
+            if hasattr(self, '_battery_service_start_handle') and not self.battery_level_handle:
+                self._discover_characteristics(self._battery_service_start_handle, self._battery_service_end_handle)
+            else:
+                self._memoriser_handles()
+                self._brancher_batterie()
+                # Configuration des notifications pour la puissance; la
+                # batterie suit la fin de l'écriture du CCCD
+                self._setup_notifications()
+                if not self._write_pending:
+                    self._configurer_batterie()
+
+        elif event == _IRQ_GATTC_READ_RESULT:
+            if file.b(i) == self.battery_level_handle:
+                battery = file.donnees(i)[0]
+                self.batterie.sur_valeur(battery, time.ticks_ms())
+                battery_level = battery
+                print(f"Niveau de batterie: {battery}%")
+
+        elif event == _IRQ_GATTC_READ_DONE:
+            if file.b(i) == self.battery_level_handle:
+                self.batterie.sur_fin_lecture(file.c(i))
+
+        elif event == _IRQ_GATTC_WRITE_DONE:
+            self._write_pending = False
+            if self.batterie.cccd is not None and file.b(i) == self.batterie.cccd:
+                # Abonnement batterie terminé (refusé: lectures espacées)
+                self.batterie.sur_ecriture_cccd(file.c(i))
+                self.batterie.rafraichir(time.ticks_ms())
+                return
+            if self._handles_en_cache:
+                self._handles_en_cache = False
+                if file.c(i) != 0:
+                    # Handle du cache refusé: retour à la découverte complète
+                    print(f"Handles GATT en cache invalides (statut {file.c(i)}), découverte...")
+                    self._abandonner_cache()
+                    self._start_service_discovery()
+                    return
+                self.cache.nb_succes += 1
+            self._configurer_batterie()
+
+    def _brancher_batterie(self):
+        if self.battery_level_handle:
+            self.batterie.brancher(self.conn_handle, self.battery_level_handle,
+                                   self.cccd_handles[self.battery_level_handle],
+                                   self._proprietes_batterie)
+
+    def _configurer_batterie(self):
+        """Abonnement au niveau de batterie s'il notifie, sinon lecture initiale"""
+        if self.batterie.abonner():
+            self._write_pending = True
+        else:
+            self.batterie.rafraichir(time.ticks_ms())
+
+    def _occupe(self):
+        """Une procédure GATT est en cours (une seule à la fois par connexion)"""
+        return self._write_pending or self._discovering_services or self._discovering_chars
 
     def _parse_power_measurement(self, data):
-        """Analyse les données de mesure de puissance"""
+        """Analyse les données de mesure de puissance (sans allocation)"""
+        global current_power
         try:
-            if len(data) < 4:
+            # Tous les champs présents sont décodés dans self.mesure
+            if not cpm.decoder_mesure_puissance(data, self.mesure):
                 return
-                
-            # Les 2 premiers octets sont les flags
-            flags = struct.unpack("<H", data[0:2])[0]
-            
-            # Puissance instantanée (toujours présente)
-            power = struct.unpack("<h", data[2:4])[0]
-            
+
             # Mettre à jour la puissance
-            self.last_power = power
-            global current_power
-            current_power = power
-            
+            self.last_power = self.mesure.puissance
+            current_power = self.last_power
+
+            # Cadence et vitesse de roue à partir des compteurs cumulés
+            self.cadence.mettre_a_jour(self.mesure, time.ticks_ms())
+
         except Exception as e:
             print(f"Erreur données puissance: {e}")
 
@@ -203,9 +348,61 @@ class AssiomaBLEClient:
         self._discovering_services = False
         self._discovering_chars = False
         self._write_pending = False
-        self._read_pending = False
         self.cccd_handles = {}
         self.scan_started = False
+        self._handles_en_cache = False
+        self.batterie.debrancher()
+        self.cadence.reinitialiser()
+
+    def _abonner_depuis_cache(self):
+        """S'abonne avec les handles en cache; renvoie False s'il faut découvrir"""
+        handles = self.cache.handles(self.peer_addr, _CLE_CPM_SERVICE, _CLE_CPM_MEASUREMENT)
+        if handles is None:
+            return False
+        self.cpm_measurement_handle = handles[0]
+        self.cccd_handles[handles[0]] = handles[1]
+
+        handles = self.cache.handles(self.peer_addr, _CLE_BATTERY_SERVICE, _CLE_BATTERY_LEVEL)
+        if handles is not None:
+            self.battery_level_handle = handles[0]
+            self.cccd_handles[handles[0]] = handles[1]
+            # Propriétés absentes d'un ancien cache: pas d'abonnement, lectures espacées
+            self._proprietes_batterie = handles[2] if len(handles) > 2 else 0
+            self._brancher_batterie()
+
+        self._handles_en_cache = True
+        if not self._setup_notifications():
+            self._abandonner_cache()
+            return False
+        print("Handles GATT en cache, abonnement direct")
+        return True
+
+    def _abandonner_cache(self):
+        """Oublie les handles en cache de la pédale connectée"""
+        self.cache.oublier(self.peer_addr)
+        self._handles_en_cache = False
+        self.cpm_measurement_handle = None
+        self.battery_level_handle = None
+        self.batterie.debrancher()
+        self.cccd_handles = {}
+
+    def _memoriser_handles(self):
+        """Enregistre en flash les handles trouvés par la découverte"""
+        if not self.peer_addr or not self.cpm_measurement_handle:
+            return
+        services = {
+            _CLE_CPM_SERVICE: {
+                _CLE_CPM_MEASUREMENT: [self.cpm_measurement_handle,
+                                       self.cccd_handles[self.cpm_measurement_handle]],
+            },
+        }
+        if self.battery_level_handle:
+            services[_CLE_BATTERY_SERVICE] = {
+                _CLE_BATTERY_LEVEL: [self.battery_level_handle,
+                                     self.cccd_handles[self.battery_level_handle],
+                                     self._proprietes_batterie],
+            }
+        self.cache.enregistrer(self.peer_addr, services)
 
     def _start_service_discovery(self):
         """Démarre la découverte des services"""
@@ -232,9 +429,9 @@ class AssiomaBLEClient:
             self._discovering_chars = False
 
     def _setup_notifications(self):
-        """Configure les notifications pour la mesure de puissance"""
+        """Configure les notifications pour la mesure de puissance (True si l'écriture est lancée)"""
         if not self.conn_handle or self._write_pending:
-            return
+            return False
             
         # Activer les notifications pour la mesure de puissance
         if self.cpm_measurement_handle and self.cpm_measurement_handle in self.cccd_handles:
@@ -242,29 +439,28 @@ class AssiomaBLEClient:
             try:
                 self._write_pending = True
                 self.ble.gattc_write(self.conn_handle, cccd_handle, b'\x01\x00', 1)
+                return True
             except Exception as e:
                 print(f"Erreur activation notifications: {e}")
                 self._write_pending = False
+        return False
 
     def read_battery_level(self):
-        """Lit le niveau de batterie actuel"""
-        if not self.conn_handle or not self.battery_level_handle or self._read_pending:
-            return
-            
-        try:
-            self._read_pending = True
-            self.ble.gattc_read(self.conn_handle, self.battery_level_handle)
-        except Exception as e:
-            print(f"Erreur lecture batterie: {e}")
-            self._read_pending = False
+        """Relit le niveau de batterie s'il a expiré (jamais deux lectures en vol)"""
+        self.batterie.rafraichir(time.ticks_ms(), self._occupe())
 
     def get_current_power(self):
         """Renvoie la dernière valeur de puissance reçue"""
         return self.last_power
     
+    def get_current_cadence(self):
+        """Renvoie la cadence (tr/min), 0 si le pédalier ne tourne plus"""
+        self.cadence.verifier(time.ticks_ms())
+        return self.cadence.cadence
+
     def get_battery_level(self):
-        """Renvoie le dernier niveau de batterie lu"""
-        return self.last_battery
+        """Renvoie le niveau de batterie en cache (relu seulement s'il a expiré)"""
+        return self.batterie.niveau(time.ticks_ms(), self._occupe())
 
     def disconnect(self):
         """Déconnexion de la pédale"""
@@ -0,0 +1,142 @@
+import time
+
+try:
+    from micropython import const
+except ImportError:
+    # Exécution sur l'hôte (bancs d'essai sous CPython)
+    def const(x):
+        return x
+
+PROPRIETE_NOTIFY = const(0x10)      # Propriétés GATT de la caractéristique
+
+_TTL_MIN_MS = const(60000)          # Valeur lue considérée à jour pendant ce délai...
+_TTL_MAX_MS = const(600000)         # ...qui double tant qu'elle ne change pas
+_DELAI_LECTURE_MS = const(5000)     # Lecture sans réponse: considérée perdue
+
+
+class ServiceBatterie:
+    """
+    Niveau de batterie (0x2A19) d'un pair BLE, servi depuis un cache.
+
+    Si la caractéristique le permet (propriété notify), le client écrit son
+    CCCD une fois et la valeur arrive d'elle-même quand elle change: plus
+    aucune lecture après la lecture initiale. Sinon, niveau() relance une
+    lecture quand la valeur a dépassé sa durée de validité; cette durée
+    double (jusqu'à _TTL_MAX_MS) à chaque lecture qui ne change rien et se
+    réduit de moitié quand le niveau bouge. Jamais plus d'une lecture en vol.
+
+    Le client transmet les événements GATT (sur_valeur, sur_fin_lecture,
+    sur_ecriture_cccd) et indique s'il a une autre opération en cours.
+    """
+
+    def __init__(self, ble, ttl_min_ms=_TTL_MIN_MS, ttl_max_ms=_TTL_MAX_MS):
+        self.ble = ble
+        self.ttl_min_ms = ttl_min_ms
+        self.ttl_max_ms = ttl_max_ms
+        self.ttl_ms = ttl_min_ms
+        self.niveau_pct = 0
+        self._conn_handle = None
+        self.handle = None
+        self.cccd = None
+        self.proprietes = 0
+        self.abonne = False
+        self._t_valeur = None       # ticks_ms de la dernière valeur reçue
+        self._t_lecture = None      # ticks_ms de la lecture en vol (None: aucune)
+
+        # Statistiques
+        self.nb_demandes = 0        # Appels à niveau()
+        self.nb_lectures = 0        # Lectures GATT lancées
+        self.nb_notifications = 0
+        self.nb_lectures_perdues = 0
+
+    def brancher(self, conn_handle, handle, cccd, proprietes):
+        """Caractéristique trouvée (découverte ou cache) sur une nouvelle connexion"""
+        self._conn_handle = conn_handle
+        self.handle = handle
+        self.cccd = cccd
+        self.proprietes = proprietes
+        self.abonne = False
+        self.ttl_ms = self.ttl_min_ms
+        self._t_valeur = None
+        self._t_lecture = None
+
+    def debrancher(self):
+        """Liaison perdue: le dernier niveau reste affichable, rien n'est plus en vol"""
+        self._conn_handle = None
+        self.handle = None
+        self.cccd = None
+        self.abonne = False
+        self._t_lecture = None
+
+    def lecture_en_vol(self):
+        return self._t_lecture is not None
+
+    def abonner(self):
+        """Écrit le CCCD si la caractéristique notifie; True si l'écriture est lancée"""
+        if self._conn_handle is None or not self.cccd or not self.proprietes & PROPRIETE_NOTIFY:
+            return False
+        try:
+            self.ble.gattc_write(self._conn_handle, self.cccd, b'\x01\x00', 1)
+            return True
+        except OSError as e:
+            print(f"Erreur abonnement batterie: {e}")
+            return False
+
+    def sur_ecriture_cccd(self, statut):
+        # Refusé: on reste en lecture périodique
+        self.abonne = statut == 0
+
+    def sur_valeur(self, valeur, maintenant, notification=False):
+        if notification:
+            self.nb_notifications += 1
+        else:
+            self._t_lecture = None
+            # Durée de validité adaptée à la vitesse de variation du niveau
+            if self._t_valeur is None or valeur != self.niveau_pct:
+                self.ttl_ms = max(self.ttl_min_ms, self.ttl_ms // 2)
+            else:
+                self.ttl_ms = min(self.ttl_max_ms, self.ttl_ms * 2)
+        self.niveau_pct = valeur
+        self._t_valeur = maintenant
+
+    def sur_fin_lecture(self, statut):
+        if statut != 0 and self._t_lecture is not None:
+            self._t_lecture = None
+            self.nb_lectures_perdues += 1
+
+    def a_jour(self, maintenant):
+        if self._t_valeur is None:
+            return False
+        if self.abonne:
+            return True
+        return time.ticks_diff(maintenant, self._t_valeur) < self.ttl_ms
+
+    def rafraichir(self, maintenant, occupe=False):
+        """Lance une lecture si la valeur a expiré; True si une lecture est partie"""
+        if self._conn_handle is None or not self.handle:
+            return False
+        if self._t_lecture is not None:
+            if time.ticks_diff(maintenant, self._t_lecture) < _DELAI_LECTURE_MS:
+                return False
+            self._t_lecture = None
+            self.nb_lectures_perdues += 1
+        if occupe or self.a_jour(maintenant):
+            return False
+        try:
+            self.ble.gattc_read(self._conn_handle, self.handle)
+        except OSError as e:
+            print(f"Erreur lecture batterie: {e}")
+            return False
+        self._t_lecture = maintenant
+        self.nb_lectures += 1
+        return True
+
+    def niveau(self, maintenant, occupe=False):
+        """Dernier niveau connu (%), relu seulement s'il a expiré"""
+        self.nb_demandes += 1
+        self.rafraichir(maintenant, occupe)
+        return self.niveau_pct
+
+    def lectures_evitees(self):
+        """Demandes servies sans opération GATT"""
+        return max(0, self.nb_demandes - self.nb_lectures)
@@ -0,0 +1,66 @@
+# Bancs d'essai exécutables sur la carte (MicroPython) ou sur l'hôte (CPython).
+# Sur l'hôte, lancer depuis la racine du dépôt: python -m bench.bench_cpm
+import gc
+import time
+
+try:
+    _ticks_us = time.ticks_us
+    _ticks_diff = time.ticks_diff
+except AttributeError:
+    _ticks_us = None
+
+
+def chrono_us():
+    """Horodatage en microsecondes (ticks_us sur la carte, perf_counter_ns sinon)"""
+    if _ticks_us is not None:
+        return _ticks_us()
+    return time.perf_counter_ns() // 1000
+
+
+def duree_us(debut, fin):
+    """Écart entre deux horodatages de chrono_us()"""
+    if _ticks_us is not None:
+        return _ticks_diff(fin, debut)
+    return fin - debut
+
+
+def mesurer(fonction, arguments, repetitions):
+    """
+    Appelle fonction(*args) pour chaque jeu d'arguments, `repetitions` fois.
+    Renvoie (durée moyenne par appel en µs, octets alloués par appel).
+
+    Sur MicroPython les octets viennent de gc.mem_alloc() avec le ramasse-miettes
+    désactivé: c'est le nombre exact d'octets de tas consommés. Sous CPython,
+    c'est le pic de tracemalloc pendant un appel, à titre indicatif seulement.
+    """
+    nb_appels = repetitions * len(arguments)
+    gc.collect()
+
+    if hasattr(gc, "mem_alloc"):
+        gc.disable()
+        avant = gc.mem_alloc()
+        debut = chrono_us()
+        for _ in range(repetitions):
+            for args in arguments:
+                fonction(*args)
+        fin = chrono_us()
+        alloue = gc.mem_alloc() - avant
+        gc.enable()
+    else:
+        import tracemalloc
+        debut = chrono_us()
+        for _ in range(repetitions):
+            for args in arguments:
+                fonction(*args)
+        fin = chrono_us()
+        tracemalloc.start()
+        pic_total = 0
+        for args in arguments:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fonction(*args)
+            pic_total += tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+        return duree_us(debut, fin) / nb_appels, pic_total / len(arguments)
+
+    return duree_us(debut, fin) / nb_appels, alloue / nb_appels
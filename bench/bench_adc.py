@@ -0,0 +1,136 @@
+# Compare l'ancien lire_adc() de main.py (5 lectures en rafale + calcul
+# flottant) à la chaîne en virgule fixe de courant.py (16 lectures réparties
+# sur la période, moyenne glissante ou EMA entière).
+#   Hôte:  python -m bench.bench_adc
+#   Carte: from bench import bench_adc; bench_adc.lancer()
+#
+# Temps CPU: une période d'affichage (500 ms) de chaque méthode, ADC constant.
+# Bruit: signal synthétique de l'ACS712 = courant constant + ondulation
+# triangulaire du PWM + bruit aléatoire, échantillonné en temps virtuel.
+# Sous CPython les octets comptent les objets int au-delà de 256; sur la carte
+# les valeurs restent des petits entiers et la chaîne n'alloue rien, alors que
+# chaque flottant de l'ancien calcul est un objet du tas.
+import math
+
+import courant
+from bench import mesurer
+
+PERIODE_US = 500000          # Une mise à jour de l'affichage
+NB_ECHANTILLONS = 16
+COURANT_MA = 5000            # Courant réel simulé
+ONDULATION_PAS = 400         # Crête de l'ondulation PWM (~0,3 A)
+FREQUENCE_PWM = 144
+BRUIT_PAS = 60               # Amplitude du bruit blanc
+NB_PERIODES = 400
+REPETITIONS = 200
+
+ZERO_PAS = 2540 * 65535 // 3300
+
+
+class _ADCFixe:
+    def read_u16(self):
+        return ZERO_PAS + 1000
+
+
+class _ADCSynthetique:
+    """ADC en temps virtuel: chaque lecture avance l'horloge de 4 us"""
+
+    def __init__(self, courant_ma, graine=12345):
+        self.t_us = 0
+        self._niveau = ZERO_PAS + courant_ma * 66 * 65535 // 3300000
+        self._graine = graine
+
+    def _hasard(self):
+        self._graine = (self._graine * 1103515245 + 12345) & 0x7FFFFFFF
+        return self._graine >> 16
+
+    def read_u16(self):
+        # Triangle de -1 à 1 sur une période PWM
+        phase = (self.t_us * FREQUENCE_PWM) % 1000000 / 1000000
+        triangle = 4 * phase - 1 if phase < 0.5 else 3 - 4 * phase
+        bruit = sum(self._hasard() % (2 * BRUIT_PAS + 1) - BRUIT_PAS for _ in range(4)) // 2
+        self.t_us += 4
+        return max(0, min(65535, int(self._niveau + ONDULATION_PAS * triangle + bruit)))
+
+
+class _AncienneLecture:
+    """Copie de l'ancien lire_adc() de main.py"""
+
+    TENSION_OFFSET = 2.540
+    SENSIBILITE = 0.066
+
+    def __init__(self, adc):
+        self.adc = adc
+
+    def lire_adc(self, num_samples=5):
+        total = 0
+        for _ in range(num_samples):
+            total += self.adc.read_u16()
+        avg_value = total / num_samples
+        tension = (avg_value / 65535) * 3.3
+        courant = (tension - self.TENSION_OFFSET) / self.SENSIBILITE
+        courant = abs(courant)
+        return tension, courant
+
+
+def _periode_nouvelle(capteur):
+    for _ in range(NB_ECHANTILLONS):
+        capteur.echantillonner()
+    return capteur.courant_ma()
+
+
+def _statistiques(valeurs):
+    n = len(valeurs)
+    moyenne = sum(valeurs) / n
+    ecart_type = math.sqrt(sum((v - moyenne) ** 2 for v in valeurs) / n)
+    return moyenne, ecart_type
+
+
+def bruit_ancien():
+    adc = _ADCSynthetique(COURANT_MA)
+    ancien = _AncienneLecture(adc)
+    valeurs = []
+    for k in range(NB_PERIODES):
+        adc.t_us = k * PERIODE_US
+        valeurs.append(ancien.lire_adc()[1] * 1000)
+    return _statistiques(valeurs)
+
+
+def bruit_nouveau(decalage_ema):
+    adc = _ADCSynthetique(COURANT_MA)
+    capteur = courant.CapteurCourant(adc, NB_ECHANTILLONS, decalage_ema)
+    pas = PERIODE_US // NB_ECHANTILLONS
+    valeurs = []
+    for k in range(NB_PERIODES + 2):
+        for i in range(NB_ECHANTILLONS):
+            adc.t_us = k * PERIODE_US + i * pas
+            capteur.echantillonner()
+        if k >= 2:
+            # Fenêtre pleine et EMA établie
+            valeurs.append(capteur.courant_ma())
+    return _statistiques(valeurs)
+
+
+def lancer():
+    ancien = _AncienneLecture(_ADCFixe())
+    t_ancien, a_ancien = mesurer(ancien.lire_adc, [()], REPETITIONS)
+    print("Temps CPU par période de {} ms".format(PERIODE_US // 1000))
+    print("  ancien lire_adc (5 lectures en rafale): {:.1f} us, {:.0f} octets".format(t_ancien, a_ancien))
+    for decalage in (0, 3):
+        capteur = courant.CapteurCourant(_ADCFixe(), NB_ECHANTILLONS, decalage)
+        t, a = mesurer(_periode_nouvelle, [(capteur,)], REPETITIONS)
+        print("  virgule fixe, {} lectures, {:<17}: {:.1f} us, {:.0f} octets".format(
+            NB_ECHANTILLONS, "EMA >> {}".format(decalage) if decalage else "moyenne glissante", t, a))
+
+    print("Bruit sur {} périodes, courant réel {} mA, ondulation +/-{} pas à {} Hz".format(
+        NB_PERIODES, COURANT_MA, ONDULATION_PAS, FREQUENCE_PWM))
+    moyenne, ecart = bruit_ancien()
+    print("  ancien                          : moyenne {:.0f} mA, écart-type {:.1f} mA".format(moyenne, ecart))
+    for decalage in (0, 3):
+        moyenne, ecart = bruit_nouveau(decalage)
+        print("  {:<32}: moyenne {:.0f} mA, écart-type {:.1f} mA".format(
+            "EMA >> {}".format(decalage) if decalage else "moyenne glissante", moyenne, ecart))
+
+
+if __name__ == "__main__":
+    lancer()
@@ -0,0 +1,67 @@
+# Compare l'ancien décodeur Cycling Power Measurement (tranches + struct.unpack,
+# puissance seule) au décodeur sans allocation de cpm.py.
+#   Hôte:  python -m bench.bench_cpm
+#   Carte: from bench import bench_cpm; bench_cpm.lancer()
+import struct
+from binascii import unhexlify
+
+import cpm
+from bench import mesurer
+
+# Suite de notifications au format de la pédale Assioma (flags 0x0023:
+# équilibre + référence gauche + données pédalier), puis des trames utilisant
+# tous les champs optionnels de la spécification
+NOTIFICATIONS = [
+    "2300cc0064a0037c9a",
+    "2300d20063a1037da1",
+    "2300c80065a2037aa8",
+    "2300e10062a30378af",
+    "2300dc0064a40373b6",
+    "2300cf0066a5036fbd",
+    "2300000064a5036fbd",
+    "3f00fa0062dc05e8030000c400a603e7c2",
+    "ff1f2c0164e205fa0a00008012a7030fc92003d4fe5000c0ff3c8002b400a4013801",
+]
+
+REPETITIONS = 200
+
+
+class _AncienDecodeur:
+    """Copie de l'ancien AssiomaBLEClient._parse_power_measurement"""
+
+    def __init__(self):
+        self.last_power = 0
+
+    def decoder(self, data):
+        if len(data) < 4:
+            return
+        flags = struct.unpack("<H", data[0:2])[0]
+        power = struct.unpack("<h", data[2:4])[0]
+        self.last_power = power
+
+
+def lancer():
+    trames = [memoryview(unhexlify(t)) for t in NOTIFICATIONS]
+
+    ancien = _AncienDecodeur()
+    args_ancien = [(t,) for t in trames]
+    t_ancien, a_ancien = mesurer(ancien.decoder, args_ancien, REPETITIONS)
+
+    mesure = cpm.MesureCPM()
+    args_nouveau = [(t, mesure) for t in trames]
+    t_nouveau, a_nouveau = mesurer(cpm.decoder_mesure_puissance, args_nouveau, REPETITIONS)
+
+    print("Décodage CPM sur", len(trames), "notifications x", REPETITIONS)
+    print("  ancien : {:.2f} us/notif, {:.1f} octets/notif (puissance seule)".format(t_ancien, a_ancien))
+    print("  nouveau: {:.2f} us/notif, {:.1f} octets/notif (tous les champs)".format(t_nouveau, a_nouveau))
+
+    # Vérifie que les deux décodeurs s'accordent sur la puissance
+    for t in trames:
+        ancien.decoder(t)
+        cpm.decoder_mesure_puissance(t, mesure)
+        if ancien.last_power != mesure.puissance:
+            print("  ECART de puissance:", ancien.last_power, mesure.puissance)
+
+
+if __name__ == "__main__":
+    lancer()
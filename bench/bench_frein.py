@@ -0,0 +1,134 @@
+# Pire latence du feu stop: du front du levier de frein à la trame NeoPixel
+# qui allume (ou éteint) les LEDs 7 à 18, main.py tournant sur le banc simulé.
+#   Hôte:  python -m bench.bench_frein
+#          python -m bench.bench_frein --facteur-cpu 100 --budget-ms 5
+#
+# Le temps CPU réel de chaque tâche, multiplié par --facteur-cpu (rapport de
+# vitesse pessimiste entre MicroPython sur RP2040 et CPython), est ajouté au
+# temps virtuel, et les transferts I2C (écran) et NeoPixel bloquent le temps
+# de leur envoi. Comme sur la carte, les fronts des broches interrompent ces
+# temps et leurs IRQ hard s'y exécutent; tout ce qui passe par
+# micropython.schedule attend la fin du code en cours (un rafraîchissement
+# complet de l'écran: ~23 ms à 400 kHz). La latence est mesurée de
+# l'extérieur (instant du front -> fin de la trame écrite) et comparée à
+# celle du crochet FeuStop.sur_latence.
+# Non modélisé: les écritures en flash, qui masquent les IRQ sur le RP2040.
+# Code de sortie 1 si le pire cas dépasse --budget-ms.
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+
+_RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _RACINE not in sys.path:
+    sys.path.insert(0, _RACINE)
+
+import simulateur  # noqa: E402
+from simulateur.horloge import horloge  # noqa: E402
+
+BROCHE_FREIN = 7
+LEDS_FREIN = range(7, 19)
+
+
+def principal():
+    parser = argparse.ArgumentParser(description="Latence front du levier -> feu stop")
+    parser.add_argument("--duree", type=float, default=120, help="durée simulée (s)")
+    parser.add_argument("--freinages", type=int, default=80)
+    parser.add_argument("--facteur-cpu", type=float, default=50)
+    parser.add_argument("--budget-ms", type=float, default=5)
+    parser.add_argument("--rebonds", type=int, default=2)
+    parser.add_argument("--graine", type=int, default=1)
+    args = parser.parse_args()
+
+    simulateur.installer(facteur_cpu=args.facteur_cpu)
+    from simulateur import scenario, machine, neopixel
+    os.chdir(tempfile.mkdtemp(prefix="bench_frein_"))
+    machine.I2C.modeliser_duree = True
+    neopixel.NeoPixel.modeliser_duree = True
+
+    # Trafic réaliste: BLE, vitesse, boutons qui redessinent l'écran
+    scenario.velo(8)
+    scenario.roue(30)
+    hasard = random.Random(args.graine)
+    fronts = []      # (instant du front en us, état attendu de la bande)
+    debut_ms = 5000
+    pas_ms = int((args.duree * 1000 - debut_ms - 2000) / args.freinages)
+    for k in range(args.freinages):
+        # Instants pseudo-aléatoires: les fronts tombent à toutes les phases des tâches
+        appui = debut_ms + k * pas_ms + hasard.randrange(pas_ms // 2)
+        duree = hasard.randrange(150, pas_ms // 2)
+        fronts.append((appui * 1000, True))
+        fronts.append(((appui + duree) * 1000, False))
+        horloge.planifier(appui * 1000, lambda: machine.forcer_broche(BROCHE_FREIN, 0), materiel=True)
+        for r in range(args.rebonds):
+            # Rebonds du contact à l'appui, 0,3 ms chacun
+            horloge.planifier(appui * 1000 + 300 * (2 * r + 1), lambda: machine.forcer_broche(BROCHE_FREIN, 1),
+                              materiel=True)
+            horloge.planifier(appui * 1000 + 300 * (2 * r + 2), lambda: machine.forcer_broche(BROCHE_FREIN, 0),
+                              materiel=True)
+        horloge.planifier((appui + duree) * 1000, lambda: machine.forcer_broche(BROCHE_FREIN, 1),
+                          materiel=True)
+        if k % 4 == 0:
+            scenario.appuyer(8, appui + 30)     # Changement de page: écran redessiné
+
+    # Trames réellement écrites: (fin d'envoi en us, bande allumée ?)
+    trames = []
+    ecrire = neopixel.NeoPixel.write
+
+    def write_espion(ruban):
+        ecrire(ruban)
+        allumee = all(ruban.couleur(i)[0] > 0 and ruban.couleur(i)[1] == 0 for i in LEDS_FREIN)
+        trames.append((horloge.us, allumee))
+
+    neopixel.NeoPixel.write = write_espion
+    latences_crochet = []
+    sortie = io.StringIO()
+    with contextlib.redirect_stdout(sortie):
+        # Démarrage (jusqu'avant le premier freinage), puis pose du crochet
+        espace = simulateur.executer_script(os.path.join(_RACINE, "main.py"), debut_ms / 2000)
+        espace["feu_stop"].sur_latence = latences_crochet.append
+        horloge.limite_us = int(args.duree * 1000000)
+        try:
+            horloge.executer()
+        except simulateur.FinSimulation:
+            pass
+    neopixel.NeoPixel.write = ecrire
+
+    latences = []
+    for t_front, attendu in fronts:
+        suite = [t for t, allumee in trames if t >= t_front and allumee == attendu]
+        if not suite:
+            print(f"Front à {t_front / 1000:.0f} ms: bande jamais {'allumée' if attendu else 'éteinte'}")
+            latences.append(float("inf"))
+            continue
+        latences.append(suite[0] - t_front)
+
+    feu = espace["feu_stop"]
+    pire = max(latences)
+    # Pire cas analytique: front juste après le début d'une trame complète
+    # (IRQ masquées pendant son envoi), puis la trame écrite par l'IRQ
+    duree_trame = len(neopixel.NeoPixel.instances[0].buf) * 10
+    borne = duree_trame + feu.latence_max_us
+    print(f"Feu stop sur {len(fronts)} fronts, facteur CPU {args.facteur_cpu:g}")
+    print(f"  latence mesurée (front -> trame écrite): moyenne {sum(latences) / len(latences) / 1000:.2f} ms, "
+          f"pire {pire / 1000:.2f} ms")
+    if latences_crochet:
+        print(f"  crochet sur_latence (IRQ -> trame):     moyenne "
+              f"{sum(latences_crochet) / len(latences_crochet) / 1000:.2f} ms, "
+              f"pire {max(latences_crochet) / 1000:.2f} ms")
+    print(f"  borne (trame en cours + écriture depuis l'IRQ): {borne / 1000:.2f} ms")
+    print(f"  {feu.nb_fronts} IRQ, {feu.nb_ecritures_irq} écritures depuis l'IRQ, "
+          f"{feu.nb_refus} refus de schedule, {feu.nb_rattrapages} rattrapages")
+    simulateur.desinstaller()
+    pire = max(pire, borne)
+    if pire > args.budget_ms * 1000:
+        print(f"DÉPASSEMENT du budget de {args.budget_ms:g} ms")
+        sys.exit(1)
+    print(f"OK: pire cas sous le budget de {args.budget_ms:g} ms")
+
+
+if __name__ == "__main__":
+    principal()
@@ -0,0 +1,278 @@
+# Rejoue des traces d'événements BLE dans AssiomaBLEClient._irq et
+# BLECentral._irq (heartrate.py) et mesure, pour chaque événement, le temps
+# passé dans le gestionnaire d'IRQ, les octets alloués et le traitement
+# différé (traiter_evenements / process_events), avec le pire blocage.
+#   Hôte:  python -m bench.bench_irq
+#          python -m bench.bench_irq --trace trajet.jsonl --client assioma
+# Sans --trace, une trace de trajet est générée (pairs de simulateur.scenario).
+# Une trace enregistrée en simulation: python -m simulateur --enregistrer-trace t.jsonl
+#
+# Les octets alloués viennent de tracemalloc (moins le coût d'un appel vide):
+# ils ne prédisent pas le tas MicroPython, car CPython alloue aussi ses
+# propres temporaires (l'itérateur d'un `for k in range(n)` par exemple, que
+# le compilateur MicroPython transforme en simple compteur). Le pire cas par
+# type d'événement est donc comparé à une référence mesurée sur les
+# gestionnaires actuels (reference_irq.json): code de sortie 1 si un type
+# la dépasse de plus de --marge octets (un bloc de 16 octets de l'allocateur
+# de CPython par défaut: d'une exécution à l'autre, un même gestionnaire a
+# déjà varié d'autant). Après un changement voulu des gestionnaires:
+#          python -m bench.bench_irq --ecrire-reference
+import argparse
+import json
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+_RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _RACINE not in sys.path:
+    sys.path.insert(0, _RACINE)
+
+# Horloge réelle, capturée avant que le simulateur ne remplace le module time
+_horodatage_ns = time.perf_counter_ns
+
+import simulateur  # noqa: E402
+from bench import trace_ble  # noqa: E402
+
+DUREE_TRAJET_S = 600
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference_irq.json")
+MARGE_OCTETS = 16
+
+
+class _BLEFactice:
+    """Pile BLE qui accepte toutes les opérations sans rien faire"""
+
+    def __getattr__(self, nom):
+        return lambda *args, **kwargs: True
+
+
+def _client_assioma():
+    import assioma
+    client = assioma.AssiomaBLEClient()
+    client.ble = _BLEFactice()
+    return client, client._irq, client.traiter_evenements, client.evenements
+
+
+def _client_cardio():
+    import heartrate
+    with contextlib.redirect_stdout(io.StringIO()):
+        central = heartrate.BLECentral()
+    central.ble = _BLEFactice()
+    return central, central._irq, central.process_events, central.events
+
+
+CLIENTS = {"assioma": _client_assioma, "cardio": _client_cardio}
+
+
+def trace_trajet(client):
+    """Trajet de DUREE_TRAJET_S secondes avec une coupure à mi-parcours"""
+    from simulateur import scenario
+    if client == "assioma":
+        pair = scenario.pedale_assioma(periode_ms=None)
+        notifications = [(pair.caracteristique(scenario._uuid(0x2A63)).uuid, 500,
+                          lambda t_ms: scenario.trame_puissance(t_ms, scenario.puissance_rampe(t_ms), 85))]
+        lectures = [scenario._uuid(0x2A19)]
+    else:
+        pair = scenario.ceinture_cardio(periode_ms=None)
+        notifications = [(scenario._uuid(0x2A37), 1000,
+                          lambda t_ms: scenario.trame_cardio(scenario.frequence_rampe(t_ms)))]
+        lectures = []
+    return trace_ble.generer_trajet(pair, DUREE_TRAJET_S, notifications, lectures,
+                                    coupure_s=DUREE_TRAJET_S / 2)
+
+
+def _cout_mesure_allocations():
+    """Octets comptés par tracemalloc pour un appel qui n'alloue rien (à soustraire)"""
+    def vide(code, data):
+        pass
+
+    cout = None
+    for _ in range(5):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        vide(18, ())
+        mesure = tracemalloc.get_traced_memory()[1] - base
+        cout = mesure if cout is None else min(cout, mesure)
+    return cout
+
+
+def _rejouer(fabrique, evenements, allocations):
+    """
+    Rejoue la trace sur un client neuf. Renvoie pour chaque événement
+    (durée IRQ ns, durée traitement ns, octets alloués dans l'IRQ).
+    """
+    tampon_adresse = bytearray(6)
+    tampon_donnees = bytearray(256)
+    with contextlib.redirect_stdout(io.StringIO()):
+        client, irq, traiter, file = fabrique()
+    resultats = []
+    sortie = io.StringIO()
+    cout = _cout_mesure_allocations() if allocations else 0
+    for _, code, arguments in evenements:
+        # Comme la pile BLE: adresses et données en memoryview sur des tampons réutilisés
+        data = []
+        for a in arguments:
+            if isinstance(a, bytes):
+                tampon = tampon_adresse if len(a) == 6 and code != 18 else tampon_donnees
+                tampon[:len(a)] = a
+                data.append(memoryview(tampon)[:len(a)])
+            else:
+                data.append(a)
+        data = tuple(data)
+
+        alloue = 0
+        if allocations:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            irq(code, data)
+            alloue = max(0, tracemalloc.get_traced_memory()[1] - base - cout)
+            duree_irq = 0
+        else:
+            debut = _horodatage_ns()
+            irq(code, data)
+            duree_irq = _horodatage_ns() - debut
+
+        with contextlib.redirect_stdout(sortie):
+            debut = _horodatage_ns()
+            traiter()
+            duree_traitement = _horodatage_ns() - debut
+        sortie.seek(0)
+        sortie.truncate()
+        resultats.append((duree_irq, duree_traitement, alloue))
+    return resultats, file
+
+
+def mesurer(client, evenements):
+    fabrique = CLIENTS[client]
+    temps, file = _rejouer(fabrique, evenements, False)
+    tracemalloc.start()
+    octets, _ = _rejouer(fabrique, evenements, True)
+    tracemalloc.stop()
+    return [(t[0], t[1], o[2]) for t, o in zip(temps, octets)], file
+
+
+def rapport(client, evenements, mesures, file):
+    print(f"\n=== {client}: {len(evenements)} événements, "
+          f"{evenements[-1][0] / 1e6:.0f} s de trace ===")
+    print(f"{'événement':<15}{'nb':>6}{'IRQ moy':>10}{'IRQ max':>10}"
+          f"{'octets moy':>12}{'octets max':>12}{'trait. moy':>12}{'trait. max':>12}")
+    par_code = {}
+    for (_, code, _), m in zip(evenements, mesures):
+        par_code.setdefault(code, []).append(m)
+    for code in sorted(par_code):
+        liste = par_code[code]
+        n = len(liste)
+        print(f"{trace_ble.NOMS.get(code, code):<15}{n:>6}"
+              f"{sum(m[0] for m in liste) / n / 1000:>8.1f}us{max(m[0] for m in liste) / 1000:>8.1f}us"
+              f"{sum(m[2] for m in liste) / n:>12.0f}{max(m[2] for m in liste):>12}"
+              f"{sum(m[1] for m in liste) / n / 1000:>10.1f}us{max(m[1] for m in liste) / 1000:>10.1f}us")
+
+    pire_irq = max(range(len(mesures)), key=lambda i: mesures[i][0])
+    pire_traitement = max(range(len(mesures)), key=lambda i: mesures[i][1])
+    print(f"Pire blocage IRQ: {mesures[pire_irq][0] / 1000:.1f} us "
+          f"(événement {pire_irq}, {trace_ble.NOMS.get(evenements[pire_irq][1])})")
+    print(f"Pire traitement: {mesures[pire_traitement][1] / 1000:.1f} us "
+          f"(événement {pire_traitement}, {trace_ble.NOMS.get(evenements[pire_traitement][1])})")
+    print(f"File d'événements: {file.perdus} perdus, occupation max {file.max_occupation}")
+
+
+def octets_max(evenements, mesures):
+    """Pire allocation dans l'IRQ par type d'événement (nom -> octets)"""
+    maxima = {}
+    for (_, code, _), m in zip(evenements, mesures):
+        nom = trace_ble.NOMS.get(code, str(code))
+        maxima[nom] = max(maxima.get(nom, 0), m[2])
+    return maxima
+
+
+def comparer(client, maxima, reference, marge):
+    """Compare les pires allocations à la référence; renvoie les types en dépassement"""
+    if reference is None:
+        print(f"Allocations: pas de référence pour {client}")
+        return []
+    depassements = []
+    for nom in sorted(maxima):
+        if nom not in reference:
+            print(f"  {nom:<15}{maxima[nom]:>6} octets (sans référence)")
+        elif maxima[nom] > reference[nom] + marge:
+            print(f"  {nom:<15}{maxima[nom]:>6} octets, référence {reference[nom]}: DÉPASSEMENT")
+            depassements.append(nom)
+    if not depassements:
+        print(f"Allocations dans l'IRQ: aucun type au-dessus de la référence ({len(reference)} types)")
+    return depassements
+
+
+def lire_reference(chemin):
+    if not os.path.exists(chemin):
+        return {}
+    with open(chemin) as f:
+        return json.load(f)
+
+
+def ecrire_reference(chemin, reference):
+    with open(chemin, "w") as f:
+        json.dump(reference, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Référence écrite: {chemin}")
+
+
+def principal():
+    parser = argparse.ArgumentParser(description="Banc des gestionnaires d'IRQ BLE")
+    parser.add_argument("--trace", default=None, help="trace .jsonl ou binaire à rejouer")
+    parser.add_argument("--client", choices=sorted(CLIENTS), default=None,
+                        help="client qui reçoit la trace (les deux si absent, trace générée)")
+    parser.add_argument("--sauver", default=None,
+                        help="répertoire où écrire les traces générées (.jsonl et .bin)")
+    parser.add_argument("--reference", default=REFERENCE,
+                        help="octets alloués de référence par type d'événement (.json)")
+    parser.add_argument("--marge", type=int, default=MARGE_OCTETS,
+                        help="octets tolérés au-dessus de la référence")
+    parser.add_argument("--ecrire-reference", action="store_true",
+                        help="remplace la référence par les allocations mesurées")
+    args = parser.parse_args()
+
+    trace = os.path.abspath(args.trace) if args.trace else None
+    sauver = os.path.abspath(args.sauver) if args.sauver else None
+    chemin_reference = os.path.abspath(args.reference)
+    reference = lire_reference(chemin_reference)
+    simulateur.installer()
+    # Le cache GATT et le journal de trajet s'écrivent dans une flash temporaire
+    os.chdir(tempfile.mkdtemp(prefix="bench_irq_"))
+
+    if trace:
+        clients = [args.client or "assioma"]
+    else:
+        clients = [args.client] if args.client else sorted(CLIENTS)
+
+    depassements = []
+    for client in clients:
+        if trace:
+            evenements = trace_ble.lire(trace)
+        else:
+            evenements = trace_trajet(client)
+            if sauver:
+                for extension in (".jsonl", ".bin"):
+                    chemin = os.path.join(sauver, f"trajet_{client}{extension}")
+                    trace_ble.ecrire(chemin, evenements)
+                    print(f"Trace écrite: {chemin} ({os.stat(chemin).st_size} octets)")
+        mesures, file = mesurer(client, evenements)
+        rapport(client, evenements, mesures, file)
+        maxima = octets_max(evenements, mesures)
+        if args.ecrire_reference:
+            reference[client] = maxima
+        else:
+            depassements += comparer(client, maxima, reference.get(client), args.marge)
+
+    simulateur.desinstaller()
+    if args.ecrire_reference:
+        ecrire_reference(chemin_reference, reference)
+    elif depassements:
+        print(f"DÉPASSEMENT des allocations de référence: {', '.join(depassements)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    principal()
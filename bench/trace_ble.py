@@ -0,0 +1,219 @@
+# Traces d'événements BLE (IRQ du rôle central) pour les bancs de rejeu.
+#
+# Un événement: (t_us, code, arguments), les arguments étant des entiers,
+# des bytes ou des bluetooth.UUID, dans l'ordre du tuple `data` de l'IRQ.
+#
+# Format JSONL (lisible): une ligne par événement
+#   {"t": 1500000, "e": 18, "a": [64, 3, "b:2300cc0064a0037c9a"]}
+# les bytes étant préfixés par "b:" et les UUID par "u:" (hexadécimal).
+#
+# Format binaire (compact): en-tête b"BLT1", puis par événement
+#   <I t_us> <B code> <B nb_arguments> et pour chaque argument
+#   b"i" + <i entier> | b"b" + <B longueur> + octets | b"u" + <B longueur> + octets
+import json
+import struct
+
+_ENTETE = b"BLT1"
+
+_IRQ_SCAN_RESULT = 5
+_IRQ_SCAN_DONE = 6
+_IRQ_PERIPHERAL_CONNECT = 7
+_IRQ_PERIPHERAL_DISCONNECT = 8
+_IRQ_GATTC_SERVICE_RESULT = 9
+_IRQ_GATTC_SERVICE_DONE = 10
+_IRQ_GATTC_CHARACTERISTIC_RESULT = 11
+_IRQ_GATTC_CHARACTERISTIC_DONE = 12
+_IRQ_GATTC_READ_RESULT = 15
+_IRQ_GATTC_READ_DONE = 16
+_IRQ_GATTC_WRITE_DONE = 17
+_IRQ_GATTC_NOTIFY = 18
+
+NOMS = {
+    5: "SCAN_RESULT", 6: "SCAN_DONE", 7: "CONNECT", 8: "DISCONNECT",
+    9: "SERVICE_RESULT", 10: "SERVICE_DONE", 11: "CHAR_RESULT", 12: "CHAR_DONE",
+    13: "DESC_RESULT", 14: "DESC_DONE", 15: "READ_RESULT", 16: "READ_DONE",
+    17: "WRITE_DONE", 18: "NOTIFY", 19: "INDICATE",
+}
+
+
+def _est_uuid(valeur):
+    return type(valeur).__name__ == "UUID"
+
+
+def _uuid(octets):
+    import bluetooth
+    return bluetooth.UUID(bytes(octets))
+
+
+# ----- JSONL -----
+def _vers_json(valeur):
+    if isinstance(valeur, int):
+        return valeur
+    if _est_uuid(valeur):
+        return "u:" + bytes(valeur).hex()
+    return "b:" + bytes(valeur).hex()
+
+
+def _depuis_json(valeur):
+    if isinstance(valeur, int):
+        return valeur
+    if valeur.startswith("u:"):
+        return _uuid(bytes.fromhex(valeur[2:]))
+    return bytes.fromhex(valeur[2:])
+
+
+def ecrire_jsonl(chemin, evenements):
+    with open(chemin, "w") as f:
+        for t_us, code, arguments in evenements:
+            f.write(json.dumps({"t": t_us, "e": code, "a": [_vers_json(a) for a in arguments]}))
+            f.write("\n")
+
+
+def lire_jsonl(chemin):
+    evenements = []
+    with open(chemin) as f:
+        for ligne in f:
+            if not ligne.strip():
+                continue
+            e = json.loads(ligne)
+            evenements.append((e["t"], e["e"], tuple(_depuis_json(a) for a in e["a"])))
+    return evenements
+
+
+# ----- Binaire -----
+def ecrire_binaire(chemin, evenements):
+    with open(chemin, "wb") as f:
+        f.write(_ENTETE)
+        for t_us, code, arguments in evenements:
+            f.write(struct.pack("<IBB", t_us & 0xFFFFFFFF, code, len(arguments)))
+            for a in arguments:
+                if isinstance(a, int):
+                    f.write(b"i" + struct.pack("<i", a))
+                else:
+                    octets = bytes(a)
+                    f.write((b"u" if _est_uuid(a) else b"b") + bytes((len(octets),)) + octets)
+
+
+def lire_binaire(chemin):
+    with open(chemin, "rb") as f:
+        donnees = f.read()
+    if donnees[:4] != _ENTETE:
+        raise ValueError("trace BLE binaire invalide")
+    evenements = []
+    o = 4
+    while o + 6 <= len(donnees):
+        t_us, code, n = struct.unpack_from("<IBB", donnees, o)
+        o += 6
+        arguments = []
+        for _ in range(n):
+            etiquette = donnees[o]
+            o += 1
+            if etiquette == 0x69:        # b"i"
+                arguments.append(struct.unpack_from("<i", donnees, o)[0])
+                o += 4
+            else:
+                longueur = donnees[o]
+                octets = bytes(donnees[o + 1:o + 1 + longueur])
+                o += 1 + longueur
+                arguments.append(_uuid(octets) if etiquette == 0x75 else octets)
+        evenements.append((t_us, code, tuple(arguments)))
+    return evenements
+
+
+def lire(chemin):
+    """Lit une trace .jsonl ou binaire (selon l'extension)"""
+    if chemin.endswith(".jsonl"):
+        return lire_jsonl(chemin)
+    return lire_binaire(chemin)
+
+
+def ecrire(chemin, evenements):
+    if chemin.endswith(".jsonl"):
+        ecrire_jsonl(chemin, evenements)
+    else:
+        ecrire_binaire(chemin, evenements)
+
+
+# ----- Génération de traces de trajet -----
+def generer_trajet(pair, duree_s, notifications, lectures=(), nb_voisins=12,
+                   conn_handle=64, coupure_s=None, graine=1):
+    """
+    Trace d'un trajet face au pair simulé `pair` (simulateur.pairs.Peripherique):
+    scan au milieu de `nb_voisins` autres annonceurs, connexion, découverte
+    complète, abonnements, puis `notifications` = [(uuid, période_ms,
+    fabrique(t_ms) -> bytes)] pendant duree_s secondes. `lectures` liste les
+    UUID lus après l'abonnement. Si coupure_s est donné, la liaison tombe à
+    cet instant et est rétablie (handles en cache) une seconde plus tard.
+    """
+    import random
+    hasard = random.Random(graine)
+    evenements = []
+    t = 0
+
+    def ajouter(code, *arguments):
+        evenements.append((t, code, arguments))
+
+    # Scan: chaque voisin annonce ~10 fois par seconde pendant 1,5 s
+    voisins = [bytes(hasard.getrandbits(8) for _ in range(6)) for _ in range(nb_voisins)]
+    for k in range(15):
+        for adresse in voisins:
+            t += hasard.randrange(500, 1500)
+            annonce = bytes((2, 1, 6, 3, 3)) + hasard.getrandbits(16).to_bytes(2, "little")
+            ajouter(_IRQ_SCAN_RESULT, 0, adresse, 0, -40 - hasard.randrange(50), annonce)
+        if k == 14:
+            t += 2000
+            ajouter(_IRQ_SCAN_RESULT, pair.type_adresse, pair.adresse, 0, pair.rssi, pair.annonce)
+    t += 3000
+    ajouter(_IRQ_SCAN_DONE)
+
+    def connexion(complete):
+        nonlocal t
+        t += 30000
+        ajouter(_IRQ_PERIPHERAL_CONNECT, conn_handle, pair.type_adresse, pair.adresse)
+        if complete:
+            t += 30000
+            for s in pair.services:
+                ajouter(_IRQ_GATTC_SERVICE_RESULT, conn_handle, s.debut, s.fin, s.uuid)
+            ajouter(_IRQ_GATTC_SERVICE_DONE, conn_handle, 0)
+            for s in pair.services:
+                t += 30000
+                for c in s.caracteristiques:
+                    ajouter(_IRQ_GATTC_CHARACTERISTIC_RESULT, conn_handle, c.h_definition,
+                            c.h_valeur, c.proprietes, c.uuid)
+                ajouter(_IRQ_GATTC_CHARACTERISTIC_DONE, conn_handle, 0)
+        for s in pair.services:
+            for c in s.caracteristiques:
+                if c.h_cccd:
+                    t += 30000
+                    ajouter(_IRQ_GATTC_WRITE_DONE, conn_handle, c.h_cccd, 0)
+        for uuid in lectures:
+            c = pair.caracteristique(uuid)
+            t += 30000
+            ajouter(_IRQ_GATTC_READ_RESULT, conn_handle, c.h_valeur, c.valeur)
+            ajouter(_IRQ_GATTC_READ_DONE, conn_handle, c.h_valeur, 0)
+
+    connexion(True)
+
+    # Notifications entrelacées, alignées sur l'intervalle de connexion (30 ms)
+    debut = t
+    fin = debut + int(duree_s * 1000000)
+    prochaines = [debut + k * 7000 for k in range(len(notifications))]
+    coupure = debut + int(coupure_s * 1000000) if coupure_s is not None else None
+    while True:
+        k = min(range(len(notifications)), key=lambda i: prochaines[i])
+        t = prochaines[k]
+        if t >= fin:
+            break
+        if coupure is not None and t >= coupure:
+            ajouter(_IRQ_PERIPHERAL_DISCONNECT, conn_handle, pair.type_adresse, pair.adresse)
+            t += 1000000
+            connexion(False)
+            prochaines = [max(p, t) for p in prochaines]
+            coupure = None
+            continue
+        uuid, periode_ms, fabrique = notifications[k]
+        c = pair.caracteristique(uuid)
+        t = (t + 29999) // 30000 * 30000
+        ajouter(_IRQ_GATTC_NOTIFY, conn_handle, c.h_valeur, fabrique(t // 1000))
+        prochaines[k] += periode_ms * 1000
+    return evenements
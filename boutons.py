@@ -0,0 +1,158 @@
+import time
+from array import array
+from micropython import const
+
+from machine import Pin
+
+# États d'un bouton (traitement hors IRQ)
+_RELACHE = const(0)
+_APPUYE = const(1)
+_LONG_FAIT = const(2)           # Appui long déjà signalé, en attente du relâchement
+
+
+class Bouton:
+    """
+    Descripteur d'un bouton câblé vers la masse (entrée en pull-up).
+
+    `action` est appelée pour un appui simple. Si `action_longue` est donnée,
+    elle est appelée dès que l'appui dure `duree_longue_ms` (l'appui simple
+    est alors signalé au relâchement). Si `action_double` est donnée, deux
+    appuis à moins de `delai_double_ms` l'appellent, et l'appui simple
+    attend ce délai. Sans appui long ni double, l'action part dès l'appui.
+
+    Avec niveau=True, le bouton suit un état (levier de frein...): `action`
+    reçoit le niveau de la broche à chaque changement.
+
+    Anti-rebond: la broche est lue une fois qu'aucun front n'est arrivé
+    depuis `rebond_ms`; l'appui est daté du premier front de la rafale.
+    """
+
+    def __init__(self, broche, action, rebond_ms=30, action_longue=None, duree_longue_ms=800,
+                 action_double=None, delai_double_ms=300, niveau=False):
+        self.broche = broche
+        self.action = action
+        self.rebond_ms = rebond_ms
+        self.action_longue = action_longue
+        self.duree_longue_ms = duree_longue_ms
+        self.action_double = action_double
+        self.delai_double_ms = delai_double_ms
+        self.niveau = niveau
+
+        self.etat = _RELACHE
+        self.instable = False     # Fronts reçus, niveau pas encore relu
+        self.t_premier = 0        # Premier et dernier front de la rafale en cours
+        self.t_dernier = 0
+        self.t_appui = 0
+        self.simple_en_attente = False
+        self.t_relache = 0
+
+
+class GestionnaireBoutons:
+    """
+    Boutons pilotés par une table de descripteurs.
+
+    Le gestionnaire d'IRQ (hard) de chaque broche ne fait qu'écrire le numéro
+    du bouton et ticks_ms dans une file préallouée: aucune allocation, aucune
+    action. traiter(), appelée par une tâche, vide la file, filtre les
+    rebonds, détecte appuis longs et doubles et appelle les actions hors
+    contexte d'interruption.
+    """
+
+    def __init__(self, capacite=32):
+        n = capacite + 1
+        self.capacite = capacite
+        self._n = n
+        self._codes = bytearray(n)
+        self._temps = array('I', [0] * n)
+        self._tete = 0      # Écrit par les IRQ
+        self._queue = 0     # Lu par traiter()
+        self.boutons = []
+        self._gestionnaires = []    # Gardés vivants: une fermeture par broche
+
+        # Statistiques
+        self.perdus = 0
+        self.nb_fronts = 0
+        self.max_occupation = 0
+
+    def ajouter(self, bouton):
+        """Ajoute un descripteur et branche l'IRQ de sa broche"""
+        k = len(self.boutons)
+        if k > 255:
+            raise ValueError("trop de boutons")
+        self.boutons.append(bouton)
+
+        def gestionnaire(broche):
+            self._pousser(k)
+
+        self._gestionnaires.append(gestionnaire)
+        bouton.broche.irq(handler=gestionnaire, trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING, hard=True)
+        return bouton
+
+    def _pousser(self, code):
+        i = self._tete
+        suivant = (i + 1) % self._n
+        if suivant == self._queue:
+            self.perdus += 1
+            return
+        self._codes[i] = code
+        self._temps[i] = time.ticks_ms()
+        self._tete = suivant
+        occupation = (suivant - self._queue) % self._n
+        if occupation > self.max_occupation:
+            self.max_occupation = occupation
+
+    def traiter(self):
+        """Vide la file et déclenche les actions (jamais depuis une IRQ)"""
+        while self._queue != self._tete:
+            i = self._queue
+            b = self.boutons[self._codes[i]]
+            t = self._temps[i]
+            self._queue = (i + 1) % self._n
+            self.nb_fronts += 1
+            if not b.instable:
+                b.instable = True
+                b.t_premier = t
+            b.t_dernier = t
+
+        maintenant = time.ticks_ms()
+        for b in self.boutons:
+            if b.instable and time.ticks_diff(maintenant, b.t_dernier) >= b.rebond_ms:
+                b.instable = False
+                self._niveau_stable(b, b.broche.value() == 0, b.t_premier)
+            if b.etat == _APPUYE and b.action_longue is not None \
+                    and time.ticks_diff(maintenant, b.t_appui) >= b.duree_longue_ms:
+                b.etat = _LONG_FAIT
+                b.action_longue()
+            if b.simple_en_attente and time.ticks_diff(maintenant, b.t_relache) > b.delai_double_ms:
+                b.simple_en_attente = False
+                b.action()
+
+    def _niveau_stable(self, b, appuye, t):
+        if appuye == (b.etat != _RELACHE):
+            # Rafale de rebonds revenue à l'état de départ
+            return
+        if b.niveau:
+            b.etat = _APPUYE if appuye else _RELACHE
+            b.action(0 if appuye else 1)
+            return
+
+        if appuye:
+            b.etat = _APPUYE
+            b.t_appui = t
+            if b.action_longue is None and b.action_double is None:
+                b.action()
+            return
+
+        etat = b.etat
+        b.etat = _RELACHE
+        if etat != _APPUYE or (b.action_longue is None and b.action_double is None):
+            # Appui long déjà signalé, ou action simple partie à l'appui
+            return
+        if b.action_double is None:
+            b.action()
+        elif b.simple_en_attente and time.ticks_diff(t, b.t_relache) <= b.delai_double_ms:
+            b.simple_en_attente = False
+            b.action_double()
+        else:
+            b.simple_en_attente = True
+            b.t_relache = t
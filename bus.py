@@ -0,0 +1,98 @@
+from array import array
+
+try:
+    from micropython import const
+except ImportError:
+    # Exécution sur l'hôte (bancs d'essai sous CPython)
+    def const(x):
+        return x
+
+_MASQUE_VERSION = const(0x3FFFFFFF)     # Versions gardées en petits entiers
+
+
+class Bus:
+    """
+    Bus de données à canaux typés: chaque canal porte la dernière valeur
+    publiée (un entier dans l'unité du canal: W, mA, km/h x 100...) et un
+    numéro de version.
+
+    `canaux` est la table des descripteurs (nom, unité); l'indice d'un canal
+    dans la table est son identifiant (constantes CANAL_* de l'appelant).
+    publier() n'incrémente la version que si la valeur change: un capteur
+    peut republier à chaque tour sans réveiller personne. Valeurs et
+    versions sont dans des array préalloués (un flottant est refusé).
+    """
+
+    def __init__(self, canaux):
+        n = len(canaux)
+        self.noms = tuple(c[0] for c in canaux)
+        self.unites = tuple(c[1] for c in canaux)
+        self._valeurs = array('i', [0] * n)
+        self._versions = array('i', [0] * n)    # 0: jamais publié
+        self.version = 0        # Avance à chaque changement, tous canaux confondus
+
+        # Statistiques
+        self.nb_publications = 0
+        self.nb_changements = 0
+
+    def publier(self, canal, valeur):
+        """Publie une valeur; renvoie True si elle a changé"""
+        self.nb_publications += 1
+        if valeur == self._valeurs[canal] and self._versions[canal]:
+            return False
+        self._valeurs[canal] = valeur
+        self._versions[canal] = (self._versions[canal] + 1) & _MASQUE_VERSION or 1
+        self.version = (self.version + 1) & _MASQUE_VERSION
+        self.nb_changements += 1
+        return True
+
+    def valeur(self, canal):
+        return self._valeurs[canal]
+
+    def version_canal(self, canal):
+        return self._versions[canal]
+
+    def rapport(self):
+        print(f"Bus: {self.nb_publications} publications, {self.nb_changements} changements")
+        for k in range(len(self.noms)):
+            print(f"  {self.noms[k]}: {self._valeurs[k]} {self.unites[k]} (v{self._versions[k]})")
+
+
+class Abonnement:
+    """
+    Canaux suivis par un consommateur (une page d'écran, le journal...).
+
+    a_change() est vrai si l'un des canaux a une nouvelle version depuis
+    l'appel précédent. Au repos (version globale du bus inchangée) c'est
+    une seule comparaison.
+    """
+
+    def __init__(self, bus, canaux):
+        self.bus = bus
+        self.canaux = bytes(canaux)
+        self._vues = array('i', [-1] * len(canaux))
+        self._version_bus = -1
+        self.nb_reveils = 0
+
+    def a_change(self):
+        bus = self.bus
+        if bus.version == self._version_bus:
+            return False
+        self._version_bus = bus.version
+        versions = bus._versions
+        vues = self._vues
+        change = False
+        for k in range(len(self.canaux)):
+            v = versions[self.canaux[k]]
+            if v != vues[k]:
+                vues[k] = v
+                change = True
+        if change:
+            self.nb_reveils += 1
+        return change
+
+    def invalider(self):
+        """Le prochain a_change() sera vrai (consommateur à redessiner)"""
+        self._version_bus = -1
+        for k in range(len(self._vues)):
+            self._vues[k] = -1
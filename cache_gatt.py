@@ -0,0 +1,87 @@
+import json
+import os
+from ubinascii import hexlify
+
+import coeurs
+
+FICHIER_CACHE = "gatt_cache.json"
+
+
+class CacheGatt:
+    """
+    Cache en flash des handles GATT découverts, par adresse MAC du pair.
+
+    Pour chaque pair on garde, par service, le handle de valeur et le handle
+    CCCD de chaque caractéristique utile, suivis au besoin de ses propriétés:
+        {"e9b54a3163b5": {"1818": {"2a63": [valeur, cccd]}, "180f": {"2a19": [valeur, cccd, 18]}}}
+    À la reconnexion, le client s'abonne directement avec ces handles et ne
+    relance la découverte complète que si l'écriture sur un handle du cache
+    échoue (l'entrée est alors oubliée).
+    """
+
+    def __init__(self, chemin=FICHIER_CACHE):
+        self.chemin = chemin
+        self._donnees = {}
+        self.nb_succes = 0
+        self.nb_echecs = 0
+        try:
+            with open(chemin) as f:
+                self._donnees = json.load(f)
+        except (OSError, ValueError):
+            # Pas encore de cache, ou fichier illisible: on repart de zéro
+            self._donnees = {}
+
+    @staticmethod
+    def _cle(mac):
+        return hexlify(bytes(mac)).decode()
+
+    def lire(self, mac):
+        """Renvoie {service: {caracteristique: [valeur, cccd, ...]}} ou None"""
+        return self._donnees.get(self._cle(mac))
+
+    def handles(self, mac, service, caracteristique):
+        """Renvoie (valeur, cccd[, propriétés]) pour une caractéristique en cache, ou None"""
+        entree = self.lire(mac)
+        if not entree or service not in entree:
+            return None
+        handles = entree[service].get(caracteristique)
+        if not handles:
+            return None
+        return tuple(handles)
+
+    def enregistrer(self, mac, services):
+        """Mémorise les handles d'un pair (écrit la flash seulement s'ils ont changé)"""
+        cle = self._cle(mac)
+        if self._donnees.get(cle) == services:
+            return
+        self._donnees[cle] = services
+        self._sauver()
+
+    def oublier(self, mac):
+        """Invalide l'entrée d'un pair après un échec d'écriture"""
+        self.nb_echecs += 1
+        if self._donnees.pop(self._cle(mac), None) is not None:
+            self._sauver()
+
+    def _sauver(self):
+        # Écriture dans un fichier temporaire puis renommage: une coupure
+        # d'alimentation ne laisse jamais un cache à moitié écrit
+        temporaire = self.chemin + ".tmp"
+        with coeurs.verrou_flash:
+            try:
+                with open(temporaire, "w") as f:
+                    json.dump(self._donnees, f)
+                os.rename(temporaire, self.chemin)
+            except OSError as e:
+                print(f"Erreur écriture cache GATT: {e}")
+
+
+_partage = None
+
+
+def cache_partage():
+    """Instance unique partagée par les clients BLE (un seul fichier en flash)"""
+    global _partage
+    if _partage is None:
+        _partage = CacheGatt()
+    return _partage
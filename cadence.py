@@ -0,0 +1,115 @@
+import time
+
+try:
+    from micropython import const
+except ImportError:
+    # Exécution sur l'hôte (bancs d'essai sous CPython)
+    def const(x):
+        return x
+
+import cpm
+
+_MASQUE_16 = const(0xFFFF)
+_MASQUE_30 = const(0x3FFFFFFF)   # cpm garde le compteur de roue modulo 2^30
+_TOURS_MAX = const(16)           # Au-delà, on considère une resynchronisation
+_CADENCE_MAX = const(250)        # tr/min, valeurs plus hautes rejetées
+
+
+class MoteurCadence:
+    """
+    Calcule la cadence et la vitesse de roue à partir des compteurs cumulés
+    envoyés dans les notifications Cycling Power Measurement.
+
+    Chaque notification coûte O(1): on ne garde que le dernier couple
+    (compteur, horodatage) de chaque source. Les compteurs 16 bits et les
+    horodatages (1/1024 s pour le pédalier, 1/2048 s pour la roue) sont
+    comparés modulo leur période, ce qui gère les débordements.
+    Une valeur qui n'a pas progressé depuis `delai_perime_ms` retombe à 0.
+    """
+
+    def __init__(self, circonference_mm=2105, delai_perime_ms=3000):
+        self.circonference_mm = circonference_mm
+        self.delai_perime_ms = delai_perime_ms
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        """Oublie l'historique (nouvelle connexion)"""
+        self.cadence = 0             # tr/min
+        self.vitesse_roue = 0        # km/h x 100
+        self.donnees_pedalier = False
+        self.donnees_roue = False
+        self._tours_pedalier = -1
+        self._temps_pedalier = 0
+        self._maj_pedalier = 0       # ticks_ms du dernier tour de pédalier
+        self._tours_roue = -1
+        self._temps_roue = 0
+        self._maj_roue = 0           # ticks_ms du dernier tour de roue
+
+    def mettre_a_jour(self, mesure, maintenant):
+        """Intègre une MesureCPM décodée, reçue à `maintenant` (ticks_ms)"""
+        flags = mesure.flags
+        if flags & cpm.FLAG_PEDALIER:
+            self._pedalier(mesure.tours_pedalier, mesure.temps_pedalier, maintenant)
+        if flags & cpm.FLAG_ROUE:
+            self._roue(mesure.tours_roue, mesure.temps_roue, maintenant)
+        self.verifier(maintenant)
+
+    def _pedalier(self, tours, temps, maintenant):
+        if self._tours_pedalier < 0:
+            self._tours_pedalier = tours
+            self._temps_pedalier = temps
+            self._maj_pedalier = maintenant
+            self.donnees_pedalier = True
+            return
+
+        d_tours = (tours - self._tours_pedalier) & _MASQUE_16
+        d_temps = (temps - self._temps_pedalier) & _MASQUE_16
+        if d_tours == 0 or d_temps == 0:
+            # Notification répétée sans nouveau tour
+            return
+
+        self._tours_pedalier = tours
+        self._temps_pedalier = temps
+        if d_tours > _TOURS_MAX:
+            # Trou dans les données (reconnexion...): on repart de ce point
+            return
+
+        # tr/min = tours * 60 * 1024 / temps, arrondi
+        cadence = (d_tours * 61440 + (d_temps >> 1)) // d_temps
+        if cadence <= _CADENCE_MAX:
+            self.cadence = cadence
+            self._maj_pedalier = maintenant
+
+    def _roue(self, tours, temps, maintenant):
+        if self._tours_roue < 0:
+            self._tours_roue = tours
+            self._temps_roue = temps
+            self._maj_roue = maintenant
+            self.donnees_roue = True
+            return
+
+        d_tours = (tours - self._tours_roue) & _MASQUE_30
+        d_temps = (temps - self._temps_roue) & _MASQUE_16
+        if d_tours == 0 or d_temps == 0:
+            return
+
+        self._tours_roue = tours
+        self._temps_roue = temps
+        if d_tours > _TOURS_MAX:
+            return
+
+        # km/h x 100 = tours * circ_mm * 2048 * 0.36 / temps (2048 * 0.36 ~ 737.3)
+        self.vitesse_roue = d_tours * self.circonference_mm * 7373 // (d_temps * 10)
+        self._maj_roue = maintenant
+
+    def verifier(self, maintenant):
+        """Remet à 0 les valeurs qui n'ont pas progressé depuis trop longtemps"""
+        if self.cadence and time.ticks_diff(maintenant, self._maj_pedalier) > self.delai_perime_ms:
+            self.cadence = 0
+        if self.vitesse_roue and time.ticks_diff(maintenant, self._maj_roue) > self.delai_perime_ms:
+            self.vitesse_roue = 0
+
+    def pedalage_actif(self, maintenant):
+        """Vrai si le pédalier a fait un tour récemment"""
+        self.verifier(maintenant)
+        return self.cadence > 0
@@ -0,0 +1,200 @@
+import time
+from array import array
+
+try:
+    from micropython import const
+except ImportError:
+    # Exécution sur l'hôte (bancs d'essai sous CPython)
+    def const(x):
+        return x
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+_MASQUE_SEQ = const(0x3FFFFFFF)     # Compteur gardé en petit entier (pas d'allocation)
+_ESSAIS_LECTURE = const(4)
+
+
+class _SansVerrou:
+    """Verrou vide quand _thread n'existe pas (un seul fil d'exécution)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+# Le système de fichiers (littlefs) n'est pas réentrant: toute écriture en
+# flash, depuis l'un ou l'autre cœur, se fait sous ce verrou
+verrou_flash = _thread.allocate_lock() if _thread is not None else _SansVerrou()
+
+
+class Instantane:
+    """
+    Boîte aux lettres sans verrou entre les deux cœurs: `nb_champs` entiers
+    32 bits à emplacements fixes (constantes CHAMP_* de l'appelant).
+
+    Un seul écrivain: il remplit le tampon inactif (a_ecrire()), puis
+    publier() incrémente la séquence, ce qui le rend actif. Le lecteur copie
+    le tampon actif et recommence si la séquence a changé pendant la copie
+    (l'écrivain a pu réutiliser ce tampon entre-temps). Ni allocation ni
+    verrou: aucun des deux cœurs n'attend l'autre.
+    """
+
+    def __init__(self, nb_champs):
+        self.nb_champs = nb_champs
+        self._tampons = (array('i', [0] * nb_champs), array('i', [0] * nb_champs))
+        self.seq = 0
+
+        # Statistiques
+        self.nb_publications = 0
+        self.nb_relectures = 0      # Copies recommencées côté lecteur
+        self.nb_echecs = 0          # Lectures abandonnées (écrivain trop rapide)
+
+    def a_ecrire(self):
+        """Tampon inactif, à remplir entièrement avant publier()"""
+        return self._tampons[(self.seq + 1) & 1]
+
+    def publier(self):
+        self.seq = (self.seq + 1) & _MASQUE_SEQ
+        self.nb_publications += 1
+
+    def lire(self, dest):
+        """Copie le dernier instantané publié dans dest; renvoie sa séquence (-1 si échec)"""
+        n = self.nb_champs
+        for _ in range(_ESSAIS_LECTURE):
+            seq = self.seq
+            source = self._tampons[seq & 1]
+            for k in range(n):
+                dest[k] = source[k]
+            if self.seq == seq:
+                return seq
+            self.nb_relectures += 1
+        self.nb_echecs += 1
+        return -1
+
+
+class Gigue:
+    """
+    Écart entre la période nominale d'une boucle et l'intervalle mesuré
+    entre deux passages (µs): maximum et moyenne glissante.
+    """
+
+    def __init__(self, periode_us):
+        self.periode_us = periode_us
+        self._precedent = None
+        self.max_us = 0
+        self._moyenne_x16 = 0   # Moyenne exponentielle (poids 1/16), en 1/16 µs
+        self.nb = 0
+
+    def moyenne_us(self):
+        return self._moyenne_x16 >> 4
+
+    def marquer(self, t_us):
+        precedent = self._precedent
+        self._precedent = t_us
+        if precedent is None:
+            return
+        ecart = abs(time.ticks_diff(t_us, precedent) - self.periode_us)
+        if ecart > self.max_us:
+            self.max_us = ecart
+        self._moyenne_x16 += ecart - (self._moyenne_x16 >> 4)
+        self.nb += 1
+
+    def reinitialiser(self):
+        self._precedent = None
+        self.max_us = 0
+        self._moyenne_x16 = 0
+        self.nb = 0
+
+
+class _TacheCoeur:
+    def __init__(self, nom, fonction, periode_ms, priorite, actif):
+        self.nom = nom
+        self.fonction = fonction
+        self.periode_ms = periode_ms
+        self.priorite = priorite
+        self.actif = actif
+        self.echeance = 0
+        self.nb_executions = 0
+        self.duree_max_us = 0
+        self.retard_max_ms = 0
+
+    def demarrer(self):
+        self.actif = True
+
+    def arreter(self):
+        self.actif = False
+
+
+class Coeur1:
+    """
+    Boucle du second cœur (BLE et capteurs).
+
+    ajouter() a la même signature que Ordonnanceur.ajouter(): main.py déclare
+    les mêmes tâches sur l'un ou l'autre. Pas d'uasyncio ici (sa boucle n'est
+    pas partagée entre cœurs): les tâches dues sont exécutées à tour de rôle
+    par ordre de priorité, puis le cœur dort jusqu'à la prochaine échéance.
+    """
+
+    def __init__(self, pas_ms=5):
+        self.pas_ms = pas_ms
+        self.taches = []
+        self.en_marche = False
+        self.nb_tours = 0
+
+    def ajouter(self, nom, fonction, periode_ms, priorite, actif=True):
+        tache = _TacheCoeur(nom, fonction, periode_ms, priorite, actif)
+        self.taches.append(tache)
+        self.taches.sort(key=lambda t: t.priorite)
+        return tache
+
+    def tour(self, maintenant=None):
+        """Exécute une fois chaque tâche due; renvoie le délai (ms) avant la suivante"""
+        if maintenant is None:
+            maintenant = time.ticks_ms()
+        attente = self.pas_ms
+        for tache in self.taches:
+            if not tache.actif:
+                continue
+            reste = time.ticks_diff(tache.echeance, maintenant)
+            if reste <= 0:
+                if -reste > tache.retard_max_ms:
+                    tache.retard_max_ms = -reste
+                debut = time.ticks_us()
+                try:
+                    tache.fonction()
+                except Exception as e:
+                    print(f"Erreur tâche {tache.nom} (cœur 1): {e}")
+                duree = time.ticks_diff(time.ticks_us(), debut)
+                tache.nb_executions += 1
+                if duree > tache.duree_max_us:
+                    tache.duree_max_us = duree
+                tache.echeance = time.ticks_add(maintenant, tache.periode_ms)
+                reste = tache.periode_ms
+            if reste < attente:
+                attente = reste
+        self.nb_tours += 1
+        return attente
+
+    def _boucle(self):
+        while self.en_marche:
+            attente = self.tour()
+            if attente > 0:
+                time.sleep_ms(attente)
+
+    def lancer(self):
+        """Démarre la boucle sur le second cœur (rend la main immédiatement)"""
+        if _thread is None:
+            raise OSError("_thread indisponible")
+        self.en_marche = True
+        _thread.start_new_thread(self._boucle, ())
+
+    def rapport(self):
+        print(f"Cœur 1: {self.nb_tours} tours")
+        for tache in self.taches:
+            print(f"  {tache.nom}: {tache.nb_executions} exec, max {tache.duree_max_us} us, "
+                  f"retard max {tache.retard_max_ms} ms")
@@ -0,0 +1,207 @@
+import json
+import os
+import time
+from array import array
+
+try:
+    from micropython import const
+except ImportError:
+    # Exécution sur l'hôte (bancs d'essai sous CPython)
+    def const(x):
+        return x
+
+import coeurs
+
+FICHIER_CALIBRATION = "courant_cal.json"
+
+_FRACTION = const(4)        # Bits de fraction du filtre (pas ADC x 16)
+_FRACTION_ZERO = const(12)  # Bits de fraction du zéro suivi lentement
+_PLEINE_ECHELLE = const(65535)
+
+# Calibration au démarrage: moteur à l'arrêt, lectures étalées sur ~64 ms
+_LOG2_CALIBRATION = const(6)
+_NB_CALIBRATION = const(1 << _LOG2_CALIBRATION)
+_ECART_MAX_ZERO_MV = const(100)     # Au-delà, le zéro mesuré n'est pas plausible
+_DISPERSION_MAX_MV = const(30)      # Au-delà, le moteur tourne: pas de calibration
+
+# Suivi de dérive: courant quasi nul et pédale sans puissance
+_SEUIL_REPOS_MA = const(300)
+_DECALAGE_DERIVE = const(8)         # Constante de temps: 256 appels (~50 s à 5 Hz)
+_ECART_SAUVEGARDE = const(1 << _FRACTION_ZERO)   # Un pas ADC
+
+
+class CapteurCourant:
+    """
+    Chaîne d'acquisition de l'ACS712 en virgule fixe.
+
+    echantillonner() fait UNE lecture ADC: appelée par une tâche périodique,
+    les `nb_echantillons` lectures d'une fenêtre sont réparties sur toute la
+    période d'affichage au lieu d'être prises en rafale, ce qui moyenne
+    l'ondulation due au PWM. Les lectures vont dans un tableau 'H' préalloué
+    et tout le filtrage se fait en entiers (aucun flottant, aucune allocation):
+
+    - decalage_ema == 0: moyenne glissante sur les nb_echantillons derniers
+      points (somme courante, nb_echantillons doit être une puissance de 2);
+    - decalage_ema > 0: moyenne exponentielle de coefficient 2^-decalage_ema.
+
+    La conversion en milliampères n'a lieu que dans courant_ma(), quand
+    l'écran ou l'enregistreur lit la valeur: (écart * k) >> 14 avec k en Q12,
+    bornée pour rester dans les petits entiers de MicroPython.
+
+    Le zéro (sortie à courant nul) et la sensibilité viennent du fichier de
+    calibration `chemin` s'il existe, sinon de zero_mv et sensibilite_mv_a.
+    calibrer() mesure le zéro au démarrage, moteur à l'arrêt, et
+    suivre_derive() le corrige lentement pendant les phases de repos. Le zéro
+    n'est réécrit en flash que s'il a bougé d'au moins un pas ADC, et au plus
+    une fois par `intervalle_sauvegarde_ms`.
+    """
+
+    def __init__(self, adc, nb_echantillons=16, decalage_ema=0, zero_mv=2540,
+                 sensibilite_mv_a=66, reference_mv=3300, chemin=None,
+                 intervalle_sauvegarde_ms=600000):
+        log2 = 0
+        while (1 << log2) < nb_echantillons:
+            log2 += 1
+        if (1 << log2) != nb_echantillons:
+            raise ValueError("nb_echantillons doit être une puissance de 2")
+        self.adc = adc
+        self.nb_echantillons = nb_echantillons
+        self.decalage_ema = decalage_ema
+        self.reference_mv = reference_mv
+        self.chemin = chemin
+        self.intervalle_sauvegarde_ms = intervalle_sauvegarde_ms
+        self._log2 = log2
+
+        self.zero_nominal = zero_mv * _PLEINE_ECHELLE // reference_mv
+        zero = self.zero_nominal << _FRACTION_ZERO
+        if chemin:
+            try:
+                with open(chemin) as f:
+                    cal = json.load(f)
+                zero = cal["zero_pas_q12"]
+                sensibilite_mv_a = cal["sensibilite_mv_a"]
+            except (OSError, ValueError, KeyError):
+                # Pas encore calibré: valeurs nominales
+                pass
+        self.sensibilite_mv_a = sensibilite_mv_a
+        self._k = (reference_mv * 1000 * 4096 + _PLEINE_ECHELLE * sensibilite_mv_a // 2) \
+            // (_PLEINE_ECHELLE * sensibilite_mv_a)       # mA par pas ADC, en Q12
+        self._zero = zero                                  # Pas ADC, en Q12
+        self._zero_sauve = zero
+        self._t_sauvegarde = None                          # ticks_ms de la dernière écriture
+
+        self._echantillons = array('H', [zero >> _FRACTION_ZERO] * nb_echantillons)
+        self._reinitialiser_filtre(zero >> _FRACTION_ZERO)
+
+        self.nb_lectures = 0
+        self.nb_sauvegardes = 0
+        self.calibre = False
+
+    def _reinitialiser_filtre(self, valeur):
+        for i in range(self.nb_echantillons):
+            self._echantillons[i] = valeur
+        self._indice = 0
+        self._somme = valeur * self.nb_echantillons
+        self._ema = valeur << _FRACTION
+
+    def _mv_en_pas(self, mv):
+        return mv * _PLEINE_ECHELLE // self.reference_mv
+
+    def echantillonner(self):
+        """Une lecture ADC, rangée dans la fenêtre et intégrée au filtre"""
+        valeur = self.adc.read_u16()
+        i = self._indice
+        self._somme += valeur - self._echantillons[i]
+        self._echantillons[i] = valeur
+        self._indice = (i + 1) & (self.nb_echantillons - 1)
+        if self.decalage_ema:
+            self._ema += ((valeur << _FRACTION) - self._ema) >> self.decalage_ema
+        self.nb_lectures += 1
+
+    def brut(self):
+        """Sortie filtrée en pas ADC x 16 (virgule fixe, 4 bits de fraction)"""
+        if self.decalage_ema:
+            return self._ema
+        return (self._somme << _FRACTION) >> self._log2
+
+    def courant_ma(self):
+        """Courant en mA (signé: négatif si le courant circule en sens inverse)"""
+        zero = self._zero >> (_FRACTION_ZERO - _FRACTION)
+        ecart = (self.brut() - zero) >> 2
+        return (ecart * self._k + 8192) >> 14
+
+    def tension_mv(self):
+        """Tension de sortie du capteur en mV"""
+        return (self.brut() >> _FRACTION) * self.reference_mv // _PLEINE_ECHELLE
+
+    def zero_mv(self):
+        """Zéro courant utilisé, en mV"""
+        return (self._zero >> _FRACTION_ZERO) * self.reference_mv // _PLEINE_ECHELLE
+
+    def calibrer(self):
+        """
+        Mesure le zéro, moteur à l'arrêt (à appeler au démarrage). Refuse la
+        mesure si les lectures sont trop dispersées (moteur en marche) ou trop
+        loin du zéro nominal; le zéro précédent est alors conservé.
+        """
+        somme = 0
+        mini = _PLEINE_ECHELLE
+        maxi = 0
+        for _ in range(_NB_CALIBRATION):
+            valeur = self.adc.read_u16()
+            somme += valeur
+            if valeur < mini:
+                mini = valeur
+            if valeur > maxi:
+                maxi = valeur
+            time.sleep_ms(1)
+        moyenne = somme // _NB_CALIBRATION
+        if maxi - mini > self._mv_en_pas(_DISPERSION_MAX_MV):
+            print(f"Calibration courant refusée: lectures instables ({mini}-{maxi})")
+            return False
+        if abs(moyenne - self.zero_nominal) > self._mv_en_pas(_ECART_MAX_ZERO_MV):
+            print(f"Calibration courant refusée: zéro hors plage ({moyenne})")
+            return False
+
+        self._zero = somme << (_FRACTION_ZERO - _LOG2_CALIBRATION)
+        self._reinitialiser_filtre(moyenne)
+        self.calibre = True
+        self.sauver(forcer=True)
+        return True
+
+    def suivre_derive(self, puissance_pedale):
+        """
+        Suit lentement la dérive du zéro tant que la pédale ne fournit aucune
+        puissance et que le courant mesuré reste proche de zéro.
+        """
+        if puissance_pedale != 0 or abs(self.courant_ma()) >= _SEUIL_REPOS_MA:
+            return
+        mesure = self.brut() << (_FRACTION_ZERO - _FRACTION)
+        self._zero += (mesure - self._zero) >> _DECALAGE_DERIVE
+        self.sauver()
+
+    def sauver(self, forcer=False):
+        """Écrit la calibration en flash (débit d'écriture borné sauf si forcer)"""
+        if not self.chemin:
+            return
+        maintenant = time.ticks_ms()
+        if not forcer:
+            if abs(self._zero - self._zero_sauve) < _ECART_SAUVEGARDE:
+                return
+            if self._t_sauvegarde is not None and \
+                    time.ticks_diff(maintenant, self._t_sauvegarde) < self.intervalle_sauvegarde_ms:
+                return
+        # Fichier temporaire puis renommage, comme le cache GATT
+        temporaire = self.chemin + ".tmp"
+        with coeurs.verrou_flash:
+            try:
+                with open(temporaire, "w") as f:
+                    json.dump({"zero_pas_q12": self._zero,
+                               "sensibilite_mv_a": self.sensibilite_mv_a}, f)
+                os.rename(temporaire, self.chemin)
+            except OSError as e:
+                print(f"Erreur écriture calibration courant: {e}")
+                return
+        self._zero_sauve = self._zero
+        self._t_sauvegarde = maintenant
+        self.nb_sauvegardes += 1
@@ -0,0 +1,168 @@
+try:
+    from micropython import const
+except ImportError:
+    # Exécution sur l'hôte (bancs d'essai sous CPython)
+    def const(x):
+        return x
+
+# Flags de la caractéristique Cycling Power Measurement (0x2A63)
+FLAG_EQUILIBRE = const(0x0001)            # Pedal Power Balance présent
+FLAG_REF_EQUILIBRE = const(0x0002)        # Référence de l'équilibre (gauche)
+FLAG_COUPLE_CUMULE = const(0x0004)        # Accumulated Torque présent
+FLAG_SOURCE_COUPLE = const(0x0008)        # Source du couple (pédalier)
+FLAG_ROUE = const(0x0010)                 # Wheel Revolution Data présent
+FLAG_PEDALIER = const(0x0020)             # Crank Revolution Data présent
+FLAG_FORCES_EXTREMES = const(0x0040)      # Extreme Force Magnitudes présent
+FLAG_COUPLES_EXTREMES = const(0x0080)     # Extreme Torque Magnitudes présent
+FLAG_ANGLES_EXTREMES = const(0x0100)      # Extreme Angles présent
+FLAG_POINT_MORT_HAUT = const(0x0200)      # Top Dead Spot Angle présent
+FLAG_POINT_MORT_BAS = const(0x0400)       # Bottom Dead Spot Angle présent
+FLAG_ENERGIE_CUMULEE = const(0x0800)      # Accumulated Energy présent
+FLAG_COMPENSATION = const(0x1000)         # Offset Compensation Indicator
+
+
+class MesureCPM:
+    """
+    Enregistrement préalloué d'une mesure de puissance.
+
+    Tous les champs sont des petits entiers, mis à jour sur place par
+    decoder_mesure_puissance(). Un champ absent de la dernière notification
+    garde sa valeur précédente: consulter `flags` pour savoir ce qui a été reçu.
+    Unités (spécification Bluetooth):
+      - equilibre: 1/2 %, couple_*: 1/32 N.m, force_*: N
+      - temps_roue: 1/2048 s, temps_pedalier: 1/1024 s
+      - angle_*, point_mort_*: degrés, energie_cumulee: kJ
+    """
+
+    def __init__(self):
+        self.flags = 0
+        self.puissance = 0
+        self.equilibre = 0
+        self.couple_cumule = 0
+        self.tours_roue = 0
+        self.temps_roue = 0
+        self.tours_pedalier = 0
+        self.temps_pedalier = 0
+        self.force_max = 0
+        self.force_min = 0
+        self.couple_max = 0
+        self.couple_min = 0
+        self.angle_max = 0
+        self.angle_min = 0
+        self.point_mort_haut = 0
+        self.point_mort_bas = 0
+        self.energie_cumulee = 0
+        self.nb_mesures = 0
+        self.nb_erreurs = 0
+
+
+def _u16(d, i):
+    return d[i] | (d[i + 1] << 8)
+
+
+def _s16(d, i):
+    v = d[i] | (d[i + 1] << 8)
+    if v & 0x8000:
+        v -= 0x10000
+    return v
+
+
+def decoder_mesure_puissance(data, mesure):
+    """
+    Décode une notification Cycling Power Measurement dans `mesure`.
+
+    `data` peut être un memoryview (cas de l'IRQ BLE), bytes ou bytearray.
+    Le décodage se fait octet par octet, sans tranche ni struct.unpack,
+    pour ne rien allouer. Renvoie False si la trame est tronquée.
+    """
+    n = len(data)
+    if n < 4:
+        mesure.nb_erreurs += 1
+        return False
+
+    flags = _u16(data, 0)
+    mesure.flags = flags
+    mesure.puissance = _s16(data, 2)
+    i = 4
+
+    if flags & FLAG_EQUILIBRE:
+        if i + 1 > n:
+            mesure.nb_erreurs += 1
+            return False
+        mesure.equilibre = data[i]
+        i += 1
+
+    if flags & FLAG_COUPLE_CUMULE:
+        if i + 2 > n:
+            mesure.nb_erreurs += 1
+            return False
+        mesure.couple_cumule = _u16(data, i)
+        i += 2
+
+    if flags & FLAG_ROUE:
+        if i + 6 > n:
+            mesure.nb_erreurs += 1
+            return False
+        # Compteur uint32 gardé modulo 2^30 pour rester un petit entier
+        mesure.tours_roue = (_u16(data, i)
+                             | (data[i + 2] << 16)
+                             | ((data[i + 3] & 0x3F) << 24))
+        mesure.temps_roue = _u16(data, i + 4)
+        i += 6
+
+    if flags & FLAG_PEDALIER:
+        if i + 4 > n:
+            mesure.nb_erreurs += 1
+            return False
+        mesure.tours_pedalier = _u16(data, i)
+        mesure.temps_pedalier = _u16(data, i + 2)
+        i += 4
+
+    if flags & FLAG_FORCES_EXTREMES:
+        if i + 4 > n:
+            mesure.nb_erreurs += 1
+            return False
+        mesure.force_max = _s16(data, i)
+        mesure.force_min = _s16(data, i + 2)
+        i += 4
+
+    if flags & FLAG_COUPLES_EXTREMES:
+        if i + 4 > n:
+            mesure.nb_erreurs += 1
+            return False
+        mesure.couple_max = _s16(data, i)
+        mesure.couple_min = _s16(data, i + 2)
+        i += 4
+
+    if flags & FLAG_ANGLES_EXTREMES:
+        if i + 3 > n:
+            mesure.nb_erreurs += 1
+            return False
+        # Deux valeurs de 12 bits empaquetées sur 3 octets
+        mesure.angle_max = data[i] | ((data[i + 1] & 0x0F) << 8)
+        mesure.angle_min = (data[i + 1] >> 4) | (data[i + 2] << 4)
+        i += 3
+
+    if flags & FLAG_POINT_MORT_HAUT:
+        if i + 2 > n:
+            mesure.nb_erreurs += 1
+            return False
+        mesure.point_mort_haut = _u16(data, i)
+        i += 2
+
+    if flags & FLAG_POINT_MORT_BAS:
+        if i + 2 > n:
+            mesure.nb_erreurs += 1
+            return False
+        mesure.point_mort_bas = _u16(data, i)
+        i += 2
+
+    if flags & FLAG_ENERGIE_CUMULEE:
+        if i + 2 > n:
+            mesure.nb_erreurs += 1
+            return False
+        mesure.energie_cumulee = _u16(data, i)
+        i += 2
+
+    mesure.nb_mesures += 1
+    return True
@@ -0,0 +1,146 @@
+import json
+import os
+import time
+
+try:
+    from micropython import const
+except ImportError:
+    # Exécution sur l'hôte (bancs d'essai sous CPython)
+    def const(x):
+        return x
+
+import coeurs
+
+FICHIER_ENERGIE = "energie.json"
+
+_MA_MS_PAR_UAH_X2 = const(7200)      # 1 µAh = 3600 mA.ms, intégrale trapèze x 2
+_ECART_MAX_MS = const(5000)          # Au-delà, trou dans les mesures: pas d'intégration
+_DISTANCE_MIN_M = const(1000)        # Avant, consommation par défaut pour l'autonomie
+
+
+class CompteurEnergie:
+    """
+    Compteur coulométrique de la batterie: charge (Ah) et énergie (Wh)
+    consommées, état de charge et autonomie restante.
+
+    integrer(courant_ma, maintenant) coûte O(1) par échantillon: l'intervalle
+    vient de ticks_diff entre deux échantillons (intégration par trapèzes),
+    donc la gigue des tâches sous charge BLE ne biaise pas le total. Tout est
+    entier et petit: le reste de chaque pas (moins d'1 µAh) est reporté au
+    pas suivant, sans jamais créer de grand entier. Faute de mesure de la
+    tension du pack, l'énergie est la charge multipliée par `tension_mv`.
+
+    L'état est sauvegardé en flash (fichier temporaire puis renommage) au
+    plus une fois par `intervalle_sauvegarde_ms`, et seulement s'il a changé.
+    """
+
+    def __init__(self, capacite_mah=10000, tension_mv=40000, consommation_mwh_km=10000,
+                 chemin=FICHIER_ENERGIE, intervalle_sauvegarde_ms=60000):
+        self.capacite_mah = capacite_mah
+        self.tension_mv = tension_mv
+        self.consommation_mwh_km = consommation_mwh_km   # Avant d'avoir roulé assez
+        self.chemin = chemin
+        self.intervalle_sauvegarde_ms = intervalle_sauvegarde_ms
+
+        self.uah = 0            # Charge consommée (µAh)
+        self._reste_charge = 0  # mA.ms x 2, < 1 µAh
+        self._dernier_ma = 0
+        self._dernier_ms = None
+        self._uah_sauve = 0
+        self._t_sauvegarde = None
+        self.nb_sauvegardes = 0
+        self.nb_trous = 0
+
+        if chemin:
+            try:
+                with open(chemin) as f:
+                    etat = json.load(f)
+                self.uah = etat["uah"]
+                self._uah_sauve = self.uah
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def reinitialiser(self):
+        """Batterie rechargée: repart de zéro et l'écrit en flash"""
+        self.uah = 0
+        self._reste_charge = 0
+        self.sauver(forcer=True)
+
+    def integrer(self, courant_ma, maintenant):
+        """Intègre un échantillon de courant pris à `maintenant` (ticks_ms)"""
+        precedent = self._dernier_ms
+        self._dernier_ms = maintenant
+        dernier_ma = self._dernier_ma
+        self._dernier_ma = courant_ma
+        if precedent is None:
+            return
+        dt = time.ticks_diff(maintenant, precedent)
+        if dt <= 0:
+            return
+        if dt > _ECART_MAX_MS:
+            # Tâche arrêtée trop longtemps: on ne devine pas ce qui s'est passé
+            self.nb_trous += 1
+            return
+
+        self._reste_charge += (dernier_ma + courant_ma) * dt
+        d_uah = self._reste_charge // _MA_MS_PAR_UAH_X2
+        if d_uah:
+            self._reste_charge -= d_uah * _MA_MS_PAR_UAH_X2
+            self.uah += d_uah
+
+    def mah(self):
+        """Charge consommée en mAh"""
+        return self.uah // 1000
+
+    def mwh(self):
+        """Énergie consommée en mWh"""
+        return self.uah // 1000 * (self.tension_mv // 10) // 100
+
+    def etat_charge(self):
+        """État de charge estimé en % (0 à 100)"""
+        restant = self.capacite_mah - self.uah // 1000
+        if restant <= 0:
+            return 0
+        return restant * 100 // self.capacite_mah
+
+    def autonomie_km(self, distance_m, energie_trajet_mwh):
+        """
+        Autonomie restante en km à la consommation moyenne du trajet
+        (distance_m parcourus pour energie_trajet_mwh consommés), ou à la
+        consommation par défaut tant que le trajet est trop court.
+        """
+        restant_mwh = (self.capacite_mah - self.uah // 1000) * self.tension_mv // 1000
+        if restant_mwh <= 0:
+            return 0
+        if distance_m >= _DISTANCE_MIN_M and energie_trajet_mwh > 0:
+            # mWh/km = énergie x 1000 / distance
+            consommation = energie_trajet_mwh * 1000 // distance_m
+        else:
+            consommation = self.consommation_mwh_km
+        if consommation <= 0:
+            return 0
+        return restant_mwh // consommation
+
+    def sauver(self, forcer=False):
+        """Point de reprise en flash (débit d'écriture borné sauf si forcer)"""
+        if not self.chemin:
+            return
+        maintenant = time.ticks_ms()
+        if not forcer:
+            if self.uah // 1000 == self._uah_sauve // 1000:
+                return
+            if self._t_sauvegarde is not None and \
+                    time.ticks_diff(maintenant, self._t_sauvegarde) < self.intervalle_sauvegarde_ms:
+                return
+        temporaire = self.chemin + ".tmp"
+        with coeurs.verrou_flash:
+            try:
+                with open(temporaire, "w") as f:
+                    json.dump({"uah": self.uah}, f)
+                os.rename(temporaire, self.chemin)
+            except OSError as e:
+                print(f"Erreur écriture énergie: {e}")
+                return
+        self._uah_sauve = self.uah
+        self._t_sauvegarde = maintenant
+        self.nb_sauvegardes += 1
@@ -0,0 +1,211 @@
+import os
+import struct
+import time
+from micropython import const
+
+import coeurs
+
+# Enregistrement binaire de 16 octets:
+#   magic, t (ms depuis le début), puissance (W), cadence (tr/min), fc (bpm),
+#   vitesse (km/h x 100), courant (mA), chrono (s), somme de contrôle
+FORMAT_ENREGISTREMENT = "<BIhBBHhH"
+TAILLE_ENREGISTREMENT = const(16)
+_MAGIC = const(0xA5)
+
+FICHIER_COURANT = "trajet.bin"
+_PREFIXE_ARCHIVE = "trajet_"
+_SUFFIXE_ARCHIVE = ".bin"
+
+
+def _borner(valeur, mini, maxi):
+    if valeur < mini:
+        return mini
+    if valeur > maxi:
+        return maxi
+    return valeur
+
+
+def _somme(buf, debut):
+    total = 0
+    for k in range(debut, debut + TAILLE_ENREGISTREMENT - 1):
+        total += buf[k]
+    return total & 0xFF
+
+
+class Enregistreur:
+    """
+    Enregistreur de trajet: tampon circulaire en RAM, écritures flash par lots.
+
+    echantillonner() range un enregistrement compact dans un tampon préalloué
+    de `capacite` enregistrements (RAM bornée). vider(), appelé depuis une
+    tâche de basse priorité et jamais depuis une IRQ, écrit en une fois les
+    enregistrements en attente dès qu'ils remplissent un lot de `taille_lot`
+    octets (idéalement la taille d'un bloc flash), ou quand le plus ancien
+    attend depuis plus de `age_max_ms`.
+
+    Chaque lot est ajouté par ouverture/écriture/fermeture: sur littlefs un
+    lot est donc soit entièrement présent soit absent après une coupure.
+    Quand le fichier courant dépasse `taille_max`, il est renommé en archive
+    numérotée (renommage atomique) et les archives les plus anciennes au-delà
+    de `nb_archives` sont supprimées.
+
+    Le facteur d'amplification d'écriture est mesuré: octets des blocs flash
+    touchés par chaque écriture divisés par les octets utiles écrits.
+    """
+
+    def __init__(self, capacite=384, taille_lot=4096, age_max_ms=300000,
+                 taille_max=262144, nb_archives=4, repertoire=""):
+        self.capacite = capacite
+        self.taille_lot = taille_lot - taille_lot % TAILLE_ENREGISTREMENT
+        self.age_max_ms = age_max_ms
+        self.taille_max = taille_max
+        self.nb_archives = nb_archives
+        self._repertoire = repertoire
+        self._chemin = self._nom(FICHIER_COURANT)
+
+        self._tampon = bytearray(capacite * TAILLE_ENREGISTREMENT)
+        self._vue = memoryview(self._tampon)
+        self._tete = 0      # Prochain enregistrement à écrire en RAM
+        self._nb = 0        # Enregistrements en attente d'écriture flash
+        self._t0 = time.ticks_ms()
+        self._t_plus_ancien = 0
+
+        try:
+            self._taille_fichier = os.stat(self._chemin)[6]
+        except OSError:
+            self._taille_fichier = 0
+        try:
+            self._bloc = os.statvfs(repertoire or "/")[0]
+        except (OSError, AttributeError):
+            self._bloc = 4096
+
+        # Statistiques
+        self.nb_echantillons = 0
+        self.nb_perdus = 0
+        self.nb_lots = 0
+        self.octets_utiles = 0
+        self.octets_flash = 0
+
+    def _nom(self, fichier):
+        if self._repertoire:
+            return self._repertoire + "/" + fichier
+        return fichier
+
+    def amplification(self):
+        """Octets de blocs flash touchés par octet utile écrit"""
+        if not self.octets_utiles:
+            return 0
+        return self.octets_flash / self.octets_utiles
+
+    def echantillonner(self, puissance, cadence, fc, vitesse_centi, courant_ma, chrono_s):
+        """Ajoute un enregistrement en RAM (aucune écriture flash ici)"""
+        if self._nb >= self.capacite:
+            # Flash en retard: on garde les données déjà en attente
+            self.nb_perdus += 1
+            return False
+
+        maintenant = time.ticks_ms()
+        if self._nb == 0:
+            self._t_plus_ancien = maintenant
+        o = self._tete * TAILLE_ENREGISTREMENT
+        struct.pack_into(FORMAT_ENREGISTREMENT, self._tampon, o,
+                         _MAGIC,
+                         time.ticks_diff(maintenant, self._t0) & 0x3FFFFFFF,
+                         _borner(puissance, -32768, 32767),
+                         _borner(cadence, 0, 255),
+                         _borner(fc, 0, 255),
+                         _borner(vitesse_centi, 0, 65535),
+                         _borner(courant_ma, -32768, 32767),
+                         _borner(chrono_s, 0, 65535))
+        self._tampon[o + TAILLE_ENREGISTREMENT - 1] = _somme(self._tampon, o)
+
+        self._tete = (self._tete + 1) % self.capacite
+        self._nb += 1
+        self.nb_echantillons += 1
+        return True
+
+    def vider(self, forcer=False):
+        """Écrit les lots complets en flash (tout ce qui attend si forcer=True)"""
+        if self._nb == 0:
+            return 0
+        par_lot = self.taille_lot // TAILLE_ENREGISTREMENT
+        ancien = time.ticks_diff(time.ticks_ms(), self._t_plus_ancien) > self.age_max_ms
+        if forcer or ancien:
+            nb = self._nb
+        else:
+            nb = (self._nb // par_lot) * par_lot
+        if nb == 0:
+            return 0
+
+        with coeurs.verrou_flash:
+            if self._taille_fichier and self._taille_fichier + nb * TAILLE_ENREGISTREMENT > self.taille_max:
+                self._rotation()
+
+            # Les enregistrements en attente peuvent chevaucher la fin du tampon
+            debut = (self._tete - self._nb) % self.capacite
+            premier = min(nb, self.capacite - debut)
+            try:
+                with open(self._chemin, "ab") as f:
+                    o = debut * TAILLE_ENREGISTREMENT
+                    f.write(self._vue[o:o + premier * TAILLE_ENREGISTREMENT])
+                    if nb > premier:
+                        f.write(self._vue[0:(nb - premier) * TAILLE_ENREGISTREMENT])
+            except OSError as e:
+                print(f"Erreur écriture trajet: {e}")
+                return 0
+
+        octets = nb * TAILLE_ENREGISTREMENT
+        position = self._taille_fichier
+        blocs = (position + octets - 1) // self._bloc - position // self._bloc + 1
+        self.octets_flash += blocs * self._bloc
+        self.octets_utiles += octets
+        self._taille_fichier += octets
+        self._nb -= nb
+        self._t_plus_ancien = time.ticks_ms()
+        self.nb_lots += 1
+        return nb
+
+    def _archives(self):
+        """Numéros des archives existantes, triés"""
+        numeros = []
+        try:
+            fichiers = os.listdir(self._repertoire) if self._repertoire else os.listdir()
+        except OSError:
+            return numeros
+        for nom in fichiers:
+            if nom.startswith(_PREFIXE_ARCHIVE) and nom.endswith(_SUFFIXE_ARCHIVE):
+                try:
+                    numeros.append(int(nom[len(_PREFIXE_ARCHIVE):-len(_SUFFIXE_ARCHIVE)]))
+                except ValueError:
+                    pass
+        numeros.sort()
+        return numeros
+
+    def _rotation(self):
+        """Archive le fichier courant et supprime les archives en trop"""
+        numeros = self._archives()
+        suivant = numeros[-1] + 1 if numeros else 0
+        try:
+            os.rename(self._chemin, self._nom(f"{_PREFIXE_ARCHIVE}{suivant}{_SUFFIXE_ARCHIVE}"))
+        except OSError as e:
+            print(f"Erreur rotation trajet: {e}")
+            return
+        self._taille_fichier = 0
+        numeros.append(suivant)
+        while len(numeros) > self.nb_archives:
+            try:
+                os.remove(self._nom(f"{_PREFIXE_ARCHIVE}{numeros.pop(0)}{_SUFFIXE_ARCHIVE}"))
+            except OSError:
+                pass
+
+
+def lire(chemin):
+    """Renvoie les enregistrements valides d'un fichier (les corrompus sont ignorés)"""
+    with open(chemin, "rb") as f:
+        donnees = f.read()
+    enregistrements = []
+    for o in range(0, len(donnees) - TAILLE_ENREGISTREMENT + 1, TAILLE_ENREGISTREMENT):
+        if donnees[o] != _MAGIC or donnees[o + TAILLE_ENREGISTREMENT - 1] != _somme(donnees, o):
+            continue
+        enregistrements.append(struct.unpack_from(FORMAT_ENREGISTREMENT, donnees, o)[1:])
+    return enregistrements
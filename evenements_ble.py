@@ -0,0 +1,289 @@
+from micropython import const, schedule
+from array import array
+
+TAILLE_ADRESSE = const(6)
+# Trame Cycling Power Measurement avec tous les champs optionnels: 34 octets.
+# Couvre aussi une annonce legacy (31) et une notification au MTU par défaut (20).
+TAILLE_DONNEES = const(34)
+_AUCUN_UUID = const(0xFF)   # UUID absent de la table du client
+_RESERVE_SCAN = const(4)    # Places gardées pour les événements autres que les annonces
+
+
+def meme_adresse(a, b):
+    """Compare deux adresses MAC (bytes ou memoryview) sans allocation"""
+    for i in range(TAILLE_ADRESSE):
+        if a[i] != b[i]:
+            return False
+    return True
+
+
+class FileEvenements:
+    """
+    File circulaire préallouée d'événements BLE.
+
+    Le gestionnaire d'IRQ n'y copie que des entiers, l'adresse et les données
+    brutes (les memoryview passés par l'IRQ ne sont valides que pendant
+    l'appel), puis planifie `traitement` via micropython.schedule. Le
+    traitement lit les événements dans l'ordre et fait le travail réel
+    (découverte, écritures CCCD, décodage) hors du contexte d'interruption.
+
+    Champs d'un événement: code, a, b, c (entiers 16 bits non signés),
+    d (entier signé, ex. RSSI), adresse, données et UUID.
+
+    L'IRQ réutilise un seul objet UUID pour tous les résultats de découverte:
+    le garder par référence ferait pointer tous les événements en attente
+    vers le dernier UUID reçu. On range donc à la place l'indice de l'UUID
+    dans `uuids`, la table des UUID utiles au client (comparaison sans
+    allocation); un UUID hors table est lu comme None. Des données plus
+    longues que TAILLE_DONNEES sont coupées, comptées dans `tronques` et
+    signalées par tronque(i).
+    """
+
+    def __init__(self, capacite, traitement=None, uuids=()):
+        # Une case reste toujours vide pour distinguer "pleine" de "vide"
+        n = capacite + 1
+        self.capacite = capacite
+        self._n = n
+        self._code = bytearray(n)
+        self._a = array('H', [0] * n)
+        self._b = array('H', [0] * n)
+        self._c = array('H', [0] * n)
+        self._d = array('h', [0] * n)
+        self._adresses = bytearray(n * TAILLE_ADRESSE)
+        self._donnees = bytearray(n * TAILLE_DONNEES)
+        self._longueurs = bytearray(n)
+        self._tronques = bytearray(n)
+        self.uuids = uuids
+        self._uuids = bytearray(n)
+        self._vue_adresses = memoryview(self._adresses)
+        self._vue_donnees = memoryview(self._donnees)
+        self._tete = 0   # Prochaine case à écrire (IRQ uniquement)
+        self._queue = 0  # Prochaine case à lire (traitement uniquement)
+
+        self._traitement = traitement
+        self._planifie = False
+        self._ref_drainer = self._drainer
+
+        # Statistiques
+        self.nb_evenements = 0
+        self.perdus = 0
+        self.tronques = 0
+        self.max_occupation = 0
+
+    def occupation(self):
+        """Nombre d'événements en attente"""
+        return (self._tete - self._queue) % self._n
+
+    def pousser(self, code, a, b, c, d, adresse, donnees, uuid):
+        """
+        Ajoute un événement (appelé depuis l'IRQ, sans allocation).
+        Renvoie False si la file est pleine: l'événement est compté comme perdu.
+        """
+        occupation = (self._tete - self._queue) % self._n
+        if occupation >= self.capacite:
+            self.perdus += 1
+            return False
+
+        i = self._tete
+        self._code[i] = code
+        self._a[i] = a
+        self._b[i] = b
+        self._c[i] = c
+        self._d[i] = d
+
+        u = _AUCUN_UUID
+        if uuid is not None:
+            uuids = self.uuids
+            for k in range(len(uuids)):
+                if uuid == uuids[k]:
+                    u = k
+                    break
+        self._uuids[i] = u
+
+        if adresse is not None:
+            o = i * TAILLE_ADRESSE
+            for k in range(TAILLE_ADRESSE):
+                self._adresses[o + k] = adresse[k]
+
+        longueur = 0
+        tronque = 0
+        if donnees is not None:
+            longueur = len(donnees)
+            if longueur > TAILLE_DONNEES:
+                longueur = TAILLE_DONNEES
+                tronque = 1
+                self.tronques += 1
+            o = i * TAILLE_DONNEES
+            for k in range(longueur):
+                self._donnees[o + k] = donnees[k]
+        self._longueurs[i] = longueur
+        self._tronques[i] = tronque
+
+        self._tete = (i + 1) % self._n
+        self.nb_evenements += 1
+        if occupation + 1 > self.max_occupation:
+            self.max_occupation = occupation + 1
+
+        if self._traitement is not None and not self._planifie:
+            try:
+                schedule(self._ref_drainer, None)
+                self._planifie = True
+            except RuntimeError:
+                # File de micropython.schedule pleine: la boucle principale videra
+                pass
+        return True
+
+    def pousser_annonce(self, code, a, b, d, adresse, donnees):
+        """Comme pousser(), mais garde de la place pour les événements de connexion"""
+        if (self._tete - self._queue) % self._n >= self.capacite - _RESERVE_SCAN:
+            self.perdus += 1
+            return False
+        return self.pousser(code, a, b, 0, d, adresse, donnees, None)
+
+    def _drainer(self, _):
+        self._planifie = False
+        self._traitement()
+
+    # ----- Lecture (hors IRQ) -----
+    def premier(self):
+        """Indice de la case du plus ancien événement, ou -1 si la file est vide"""
+        if self._queue == self._tete:
+            return -1
+        return self._queue
+
+    def liberer(self):
+        """Libère la case lue par premier()"""
+        self._queue = (self._queue + 1) % self._n
+
+    def code(self, i):
+        return self._code[i]
+
+    def a(self, i):
+        return self._a[i]
+
+    def b(self, i):
+        return self._b[i]
+
+    def c(self, i):
+        return self._c[i]
+
+    def d(self, i):
+        return self._d[i]
+
+    def uuid(self, i):
+        """UUID de l'événement pris dans la table du client, ou None"""
+        u = self._uuids[i]
+        return None if u == _AUCUN_UUID else self.uuids[u]
+
+    def tronque(self, i):
+        """Vrai si les données de l'événement ont été coupées à TAILLE_DONNEES"""
+        return self._tronques[i] != 0
+
+    def adresse(self, i):
+        """Adresse MAC de l'événement (vue sur la case, valable jusqu'à liberer())"""
+        o = i * TAILLE_ADRESSE
+        return self._vue_adresses[o:o + TAILLE_ADRESSE]
+
+    def donnees(self, i):
+        """Données de l'événement (vue sur la case, valable jusqu'à liberer())"""
+        o = i * TAILLE_DONNEES
+        return self._vue_donnees[o:o + self._longueurs[i]]
+
+
+_IRQ_PERIPHERAL_CONNECT = const(7)
+_IRQ_PERIPHERAL_DISCONNECT = const(8)
+_IRQ_GATTC_SERVICE_RESULT = const(9)   # Premier événement GATT client (conn_handle en tête)
+_NB_CONNEXIONS = const(4)
+_LIBRE = const(-1)
+
+
+class Aiguillage:
+    """
+    Gestionnaire d'IRQ unique pour plusieurs clients BLE.
+
+    bluetooth.BLE est un singleton et ble.irq() ne garde que le dernier
+    gestionnaire: sans aiguillage, le deuxième client créé rendrait le
+    premier sourd. Les annonces et fins de scan vont à tous les clients
+    (chacun a son filtre). Une connexion va au client qui l'a demandée
+    (accepte_connexion(adresse)), et tous les événements GATT suivants sont
+    aiguillés par conn_handle. Table préallouée, aucune allocation dans
+    l'IRQ. Avec un seul client, les événements lui sont passés directement.
+    """
+
+    def __init__(self, ble):
+        self.ble = ble
+        self.clients = []
+        self._handles = array('i', [_LIBRE] * _NB_CONNEXIONS)
+        self._proprietaires = bytearray(_NB_CONNEXIONS)
+        self.nb_orphelins = 0   # Événements qu'aucun client n'a réclamés
+
+    def ajouter(self, client):
+        """Branche client._irq (le client doit fournir accepte_connexion(adresse))"""
+        self.clients.append(client)
+        self.ble.irq(self._irq)
+
+    def _client_du_handle(self, conn_handle):
+        for k in range(_NB_CONNEXIONS):
+            if self._handles[k] == conn_handle:
+                return k
+        return _LIBRE
+
+    def _client_de_l_adresse(self, adresse):
+        clients = self.clients
+        for k in range(len(clients)):
+            if clients[k].accepte_connexion(adresse):
+                return k
+        return _LIBRE
+
+    def _irq(self, event, data):
+        clients = self.clients
+        if len(clients) == 1:
+            clients[0]._irq(event, data)
+            return
+
+        if event == _IRQ_PERIPHERAL_CONNECT:
+            k = self._client_de_l_adresse(data[2])
+            if k == _LIBRE:
+                self.nb_orphelins += 1
+                return
+            place = self._client_du_handle(_LIBRE)
+            if place != _LIBRE:
+                self._handles[place] = data[0]
+                self._proprietaires[place] = k
+            clients[k]._irq(event, data)
+
+        elif event == _IRQ_PERIPHERAL_DISCONNECT:
+            place = self._client_du_handle(data[0])
+            if place != _LIBRE:
+                self._handles[place] = _LIBRE
+                clients[self._proprietaires[place]]._irq(event, data)
+                return
+            # Tentative de connexion expirée: pas encore de handle
+            k = self._client_de_l_adresse(data[2])
+            if k == _LIBRE:
+                self.nb_orphelins += 1
+                return
+            clients[k]._irq(event, data)
+
+        elif event >= _IRQ_GATTC_SERVICE_RESULT:
+            place = self._client_du_handle(data[0])
+            if place == _LIBRE:
+                self.nb_orphelins += 1
+                return
+            clients[self._proprietaires[place]]._irq(event, data)
+
+        else:
+            # Annonces, fin de scan: chaque client filtre
+            for k in range(len(clients)):
+                clients[k]._irq(event, data)
+
+
+_aiguillage = None
+
+
+def aiguillage_partage(ble):
+    """Aiguillage unique du singleton BLE, partagé par les clients"""
+    global _aiguillage
+    if _aiguillage is None or _aiguillage.ble is not ble:
+        _aiguillage = Aiguillage(ble)
+    return _aiguillage
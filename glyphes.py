@@ -0,0 +1,168 @@
+from array import array
+from micropython import const
+
+import framebuf
+
+# Codes des glyphes (indices dans le cache d'une police)
+CODE_ESPACE = const(10)
+CODE_MOINS = const(11)
+CODE_POINT = const(12)
+_NB_CODES = const(13)
+_INCONNU = const(0xFF)          # Contenu de la position à l'écran inconnu
+
+_CARACTERES = "0123456789 -."
+
+# Segments allumés par chiffre, bits 0 à 6 = a (haut), b (haut droite),
+# c (bas droite), d (bas), e (bas gauche), f (haut gauche), g (milieu)
+_SEGMENTS = (0x3F, 0x06, 0x5B, 0x4F, 0x66, 0x6D, 0x7D, 0x07, 0x7F, 0x6F)
+_SEGMENT_G = const(0x40)
+
+
+class Police:
+    """
+    Cache de glyphes: un FrameBuffer MONO_VLSB par code (chiffres, espace,
+    moins, point), dessiné une fois à la construction par
+    `dessiner(glyphe, code, largeur, hauteur)`. Chaque glyphe couvre tout son
+    rectangle (fond compris): le copier efface l'ancien.
+    """
+
+    def __init__(self, largeur, hauteur, largeur_point, dessiner):
+        self.largeur = largeur
+        self.hauteur = hauteur
+        self.largeur_point = largeur_point
+        self._tampons = []
+        self.glyphes = []
+        for code in range(_NB_CODES):
+            w = self.largeur_code(code)
+            tampon = bytearray(w * ((hauteur + 7) // 8))
+            glyphe = framebuf.FrameBuffer(tampon, w, hauteur, framebuf.MONO_VLSB)
+            dessiner(glyphe, code, w, hauteur)
+            self._tampons.append(tampon)
+            self.glyphes.append(glyphe)
+
+    def largeur_code(self, code):
+        return self.largeur_point if code == CODE_POINT else self.largeur
+
+
+def _dessiner_texte(glyphe, code, w, h):
+    glyphe.text(_CARACTERES[code], 0, 0, 1)
+
+
+def police_texte():
+    """Police 8x8 intégrée de framebuf (mêmes pixels que oled.text)"""
+    return Police(8, 8, 8, _dessiner_texte)
+
+
+def _dessiner_segments(glyphe, code, w, h, e, espace):
+    if code == CODE_POINT:
+        glyphe.fill_rect(0, h - e, e, e, 1)
+        return
+    if code == CODE_ESPACE:
+        return
+    segments = _SEGMENT_G if code == CODE_MOINS else _SEGMENTS[code]
+    l = w - espace                  # Largeur dessinée
+    m = (h - e) // 2                # Haut du segment du milieu
+    bas = h - e - (m + e)           # Hauteur des segments verticaux du bas
+    rects = (
+        (e, 0, l - 2 * e, e),       # a
+        (l - e, e, e, m - e),       # b
+        (l - e, m + e, e, bas),     # c
+        (e, h - e, l - 2 * e, e),   # d
+        (0, m + e, e, bas),         # e
+        (0, e, e, m - e),           # f
+        (e, m, l - 2 * e, e),       # g
+    )
+    for k in range(7):
+        if segments >> k & 1:
+            x, y, rw, rh = rects[k]
+            glyphe.fill_rect(x, y, rw, rh, 1)
+
+
+def police_segments(largeur=14, hauteur=24, epaisseur=3, espace=2):
+    """
+    Grands chiffres façon afficheur 7 segments, de `largeur` x `hauteur`
+    pixels (dont `espace` colonnes vides à droite), segments de `epaisseur`.
+    """
+    def dessiner(glyphe, code, w, h):
+        _dessiner_segments(glyphe, code, w, h, epaisseur, espace)
+    return Police(largeur, hauteur, epaisseur + espace, dessiner)
+
+
+class Champ:
+    """
+    Nombre entier aligné à droite dans `nb_chiffres` positions fixes de
+    l'écran. Avec `decimales`, le point est placé avant les derniers chiffres
+    (valeur 253 avec decimales=1: "25.3"). Au moins `chiffres_min` chiffres
+    sont écrits, complétés par des 0 à gauche (chrono: 5 -> "05"). Une valeur
+    qui ne tient pas s'affiche en tirets.
+
+    Les chiffres sont obtenus par divisions successives dans un bytearray
+    préalloué (aucune chaîne), et seules les positions dont le glyphe a
+    changé depuis l'affichage précédent sont copiées sur l'écran.
+    """
+
+    def __init__(self, ecran, police, x, y, nb_chiffres, decimales=0, chiffres_min=1):
+        self.ecran = ecran
+        self.police = police
+        self.y = y
+        self.nb_chiffres = nb_chiffres
+        self.decimales = decimales
+        self._significatifs = max(chiffres_min, decimales + 1)
+        nb = nb_chiffres + (1 if decimales else 0)
+        self._nb = nb
+        self._point = nb_chiffres - decimales if decimales else -1     # Position du point
+        self._x = array('h', [0] * nb)
+        for k in range(nb):
+            self._x[k] = x
+            x += police.largeur_code(CODE_POINT if k == self._point else 0)
+        self.largeur = x - self._x[0]
+        self._codes = bytearray(nb)
+        self._affiches = bytearray([_INCONNU] * nb)
+        self.nb_glyphes = 0         # Glyphes copiés (statistique)
+
+    def invalider(self):
+        """Écran effacé: tout sera redessiné au prochain afficher()"""
+        for k in range(self._nb):
+            self._affiches[k] = _INCONNU
+
+    def afficher(self, valeur):
+        codes = self._codes
+        point = self._point
+        negatif = valeur < 0
+        if negatif:
+            valeur = -valeur
+        significatifs = self._significatifs
+        k = self._nb - 1
+        n = 0               # Chiffres écrits, de droite à gauche
+        while k >= 0:
+            if k == point:
+                codes[k] = CODE_POINT
+            elif valeur or n < significatifs:
+                codes[k] = valeur % 10
+                valeur //= 10
+                n += 1
+            elif negatif:
+                codes[k] = CODE_MOINS
+                negatif = False
+            else:
+                codes[k] = CODE_ESPACE
+            k -= 1
+        if valeur or negatif:
+            # Trop grand pour le champ
+            for k in range(self._nb):
+                codes[k] = CODE_POINT if k == point else CODE_MOINS
+        self._copier()
+
+    def _copier(self):
+        police = self.police
+        glyphes = police.glyphes
+        ecran = self.ecran
+        codes = self._codes
+        affiches = self._affiches
+        for k in range(self._nb):
+            code = codes[k]
+            if code != affiches[k]:
+                ecran.blit_zone(glyphes[code], self._x[k], self.y,
+                                police.largeur_code(code), police.hauteur)
+                affiches[k] = code
+                self.nb_glyphes += 1
@@ -2,6 +2,9 @@ import bluetooth
 import time
 from micropython import const
 from ubinascii import hexlify
+import evenements_ble
+import cache_gatt
+import annonces
 
 _IRQ_SCAN_RESULT = const(5)
 _IRQ_SCAN_DONE = const(6)
@@ -14,6 +17,9 @@ _IRQ_GATTC_CHARACTERISTIC_DONE = const(12)
 _IRQ_GATTC_WRITE_DONE = const(17)
 _IRQ_GATTC_NOTIFY = const(18)
 
+# 1: trace every scan candidate and GATT step (kept out of the event loop otherwise)
+DEBUG = const(0)
+
 # UUIDs
 UART_SERVICE_UUID = bluetooth.UUID("6E400001-B5A3-F393-E0A9-E50E24DCCA9E")
 UART_TX_CHAR_UUID = bluetooth.UUID("6E400003-B5A3-F393-E0A9-E50E24DCCA9E")
@@ -21,20 +27,57 @@ UART_RX_CHAR_UUID = bluetooth.UUID("6E400002-B5A3-F393-E0A9-E50E24DCCA9E")
 
 HRS_SERVICE_UUID = bluetooth.UUID(0x180D)
 HRS_MEASUREMENT_UUID = bluetooth.UUID(0x2A37)
-print("hello")
+
+# Handle cache keys (service -> characteristic)
+_KEY_UART_SERVICE = "6e400001"
+_KEY_UART_TX = "6e400003"
+_KEY_UART_RX = "6e400002"
+_KEY_HRS_SERVICE = "180d"
+_KEY_HRS_MEASUREMENT = "2a37"
 target_mac = b'\xA0\x9E\x1A\x86\xEC\x33'  # Target MAC address
 
 class BLECentral:
-    def __init__(self):
+    """
+    Heart-rate strap client (HRS 0x2A37, plus the Nordic UART service if
+    present). The last value is kept in heart_rate (BPM) with the ticks_ms
+    of its notification in heart_rate_ms.
+
+    With scan=True the constructor starts a 30 s scan and connects to
+    `target` when it shows up. Otherwise connections are driven through
+    connecter()/start_scan(), the interface reconnexion.GestionnaireReconnexion
+    expects. With auto_drain=False, queued events are only handled when the
+    owner calls process_events() (core 1 in dual-core mode).
+    """
+
+    def __init__(self, target=target_mac, scan=True, auto_drain=True):
         self.ble = bluetooth.BLE()
         self.ble.active(True)
-        self.ble.irq(self._irq)
+        self.target = target
+
+        # BLE events are copied by the IRQ and handled outside interrupt context
+        # (UUIDs are kept as indices into this table: the IRQ's UUID object is reused)
+        self.events = evenements_ble.FileEvenements(
+            16, self.process_events if auto_drain else None,
+            uuids=(UART_SERVICE_UUID, HRS_SERVICE_UUID, UART_RX_CHAR_UUID,
+                   UART_TX_CHAR_UUID, HRS_MEASUREMENT_UUID))
+        self._connect_addr = None  # Address of the gap_connect in progress
+        evenements_ble.aiguillage_partage(self.ble).ajouter(self)
 
         self.conn_handle = None
         self.rx_handle = None
         self.tx_handle = None
         self.hrs_handle = None
         self.cccd_handles = {}
+        self.peer_addr = None
+        self.peer_addr_type = None  # Known once the strap has been seen
+        self.scan_started = False
+        self.heart_rate = 0
+        self.heart_rate_ms = None
+
+        # Discovered handles, kept in flash per peer address
+        self.cache = cache_gatt.cache_partage()
+        self._cached_handles = False
+        self._cache_confirmed = False
         
         # Service discovery tracking
         self.services_of_interest = {
@@ -49,127 +92,282 @@ class BLECentral:
         self._discovering_chars = False
         self._write_pending = False
         self._service_discovery_complete = False
+        self._services_to_discover = []
+        self._cccd_writing = None   # Characteristic whose CCCD write is in flight
+        self._notifying = []        # Characteristics whose notifications were enabled
         self._last_operation_time = 0
+        self._retry_operation = None
+        self._retry_argument = None
+        self._retry_deadline = 0
         
-        print("Scanning...")
-        self.ble.gap_scan(30000, 30000, 30000)
+        # Only new advertisers matching the whitelist or a cycling/HR service
+        # reach the event queue
+        self.scan_filter = annonces.FiltreScan(
+            adresses=(target,),
+            uuids=(annonces.UUID_HEART_RATE, annonces.UUID_CYCLING_POWER, annonces.UUID_CSC),
+        )
 
-    def _irq(self, event, data):
+        if scan:
+            if DEBUG:
+                print("Scanning...")
+            self.start_scan(30000, 30000, 30000)
+
+    # ----- Interface used by reconnexion.GestionnaireReconnexion -----
+    def start_scan(self, duree_ms=10000, interval_us=30000, window_us=30000):
+        if not self.scan_started:
+            self.scan_filter.nouvelle_fenetre()
+            self.ble.gap_scan(duree_ms, interval_us, window_us)
+            self.scan_started = True
+
+    def stop_scan(self):
+        if self.scan_started:
+            self.ble.gap_scan(None)
+            self.scan_started = False
+            self._scan_done = True
+
+    def connecter(self, addr_type, addr, duree_ms=2000):
+        """Direct connection to a known address, without scanning first"""
+        if self._connecting or self.conn_handle is not None:
+            return False
+        self.stop_scan()
         try:
-            if event == _IRQ_SCAN_RESULT:
-                addr_type, addr, adv_type, rssi, adv_data = data
-                print("Found:", hexlify(addr), "RSSI:", rssi)
-                if addr == target_mac and not self._connecting:
-                    print(target_mac)
+            self._connecting = True
+            self._connect_addr = bytes(addr)
+            self.ble.gap_connect(addr_type, addr, duree_ms)
+            return True
+        except OSError as e:
+            print(f"Direct connection failed: {e}")
+            self._connecting = False
+            return False
+
+    def annuler_connexion(self):
+        """Give up a connection attempt in progress"""
+        if self._connecting and self.conn_handle is None:
+            try:
+                self.ble.gap_connect(None)
+            except OSError as e:
+                print(f"Cancel connection failed: {e}")
+            self._connecting = False
+
+    def connexion_en_cours(self):
+        """True while a connection attempt (direct or from a scan result) is pending"""
+        return self._connecting
+
+    def accepte_connexion(self, adresse):
+        """True if a connection event for this address is ours (called from the IRQ)"""
+        return self._connecting and self._connect_addr is not None \
+            and evenements_ble.meme_adresse(adresse, self._connect_addr)
+
+    def _irq(self, event, data):
+        # Interrupt context: only copy the event into the queue
+        queue = self.events
+        if event == _IRQ_SCAN_RESULT:
+            addr_type, addr, adv_type, rssi, adv_data = data
+            if self.scan_filter.accepter(addr, adv_data):
+                if not queue.pousser_annonce(event, addr_type, adv_type, rssi, addr, adv_data):
+                    # Queue full: look at this advertiser again on its next advertisement
+                    self.scan_filter.oublier(addr)
+
+        elif event == _IRQ_PERIPHERAL_CONNECT or event == _IRQ_PERIPHERAL_DISCONNECT:
+            conn_handle, addr_type, addr = data
+            queue.pousser(event, conn_handle, addr_type, 0, 0, addr, None, None)
+
+        elif event == _IRQ_GATTC_SERVICE_RESULT:
+            conn_handle, start_handle, end_handle, uuid = data
+            queue.pousser(event, conn_handle, start_handle, end_handle, 0, None, None, uuid)
+
+        elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
+            conn_handle, def_handle, value_handle, properties, uuid = data
+            queue.pousser(event, conn_handle, value_handle, def_handle, properties, None, None, uuid)
+
+        elif event == _IRQ_GATTC_SERVICE_DONE or event == _IRQ_GATTC_CHARACTERISTIC_DONE:
+            conn_handle, status = data
+            queue.pousser(event, conn_handle, status, 0, 0, None, None, None)
+
+        elif event == _IRQ_GATTC_WRITE_DONE:
+            conn_handle, value_handle, status = data
+            queue.pousser(event, conn_handle, value_handle, status, 0, None, None, None)
+
+        elif event == _IRQ_GATTC_NOTIFY:
+            conn_handle, value_handle, notify_data = data
+            queue.pousser(event, conn_handle, value_handle, 0, 0, None, notify_data, None)
+
+        elif event == _IRQ_SCAN_DONE:
+            queue.pousser(event, 0, 0, 0, 0, None, None, None)
+
+    def process_events(self):
+        """Handle queued BLE events and due retries (outside IRQ context)"""
+        queue = self.events
+        i = queue.premier()
+        while i >= 0:
+            try:
+                self._handle_event(queue, i)
+            except Exception as e:
+                print(f"Error in BLE event handler: {type(e).__name__}: {e}")
+                # Don't reset state on error, just continue
+            queue.liberer()
+            i = queue.premier()
+
+        if self._retry_operation is not None and time.ticks_diff(time.ticks_ms(), self._retry_deadline) >= 0:
+            operation, argument = self._retry_operation, self._retry_argument
+            self._retry_operation = None
+            if argument is None:
+                operation()
+            else:
+                operation(argument)
+
+    def _schedule_retry(self, operation, argument=None, delay_ms=1000):
+        """Retry a GATT operation later instead of sleeping"""
+        self._retry_operation = operation
+        self._retry_argument = argument
+        self._retry_deadline = time.ticks_add(time.ticks_ms(), delay_ms)
+
+    def _handle_event(self, queue, i):
+        event = queue.code(i)
+
+        if event == _IRQ_GATTC_NOTIFY:
+            value_handle = queue.b(i)
+            notify_data = queue.donnees(i)
+            if value_handle == self.hrs_handle:
+                # Parse heart rate data according to BLE spec
+                flags = notify_data[0]
+                if flags & 0x01:  # Check if value is in 16-bit format
+                    bpm = notify_data[1] | (notify_data[2] << 8)
+                else:
+                    bpm = notify_data[1]
+                self.heart_rate = bpm
+                self.heart_rate_ms = time.ticks_ms()
+            elif value_handle == self.tx_handle:
+                if DEBUG:
+                    print(f"[UART] Received: {bytes(notify_data).decode('utf-8', 'replace')}")
+
+        elif event == _IRQ_SCAN_RESULT:
+            addr = queue.adresse(i)
+            if DEBUG:
+                print("Candidate:", hexlify(addr), "RSSI:", queue.d(i))
+            # Results of another client's scan (shared BLE) are not ours to act on
+            if evenements_ble.meme_adresse(addr, self.target) and self.scan_started \
+                    and not self._connecting and self.conn_handle is None:
+                if DEBUG:
                     print("Target found! Connecting...")
-                    self._connecting = True
-                    # Stop scanning before connecting
-                    self.ble.gap_scan(None)
-                    time.sleep_ms(200)  # Increased delay before connecting
-                    self.ble.gap_connect(addr_type, addr)
-
-            elif event == _IRQ_SCAN_DONE:
-                self._scan_done = True
+                self._connecting = True
+                # Stop scanning before connecting
+                self.ble.gap_scan(None)
+                self.scan_started = False
+                self.peer_addr_type = queue.a(i)
+                self._connect_addr = bytes(addr)
+                try:
+                    self.ble.gap_connect(queue.a(i), self._connect_addr)
+                except OSError as e:
+                    print(f"Connection failed: {e}")
+                    self._connecting = False
+
+        elif event == _IRQ_SCAN_DONE:
+            self._scan_done = True
+            self.scan_started = False
+            if DEBUG:
                 print("Scan complete")
 
-            elif event == _IRQ_PERIPHERAL_CONNECT:
-                conn_handle, addr_type, addr = data
-                print("Connected to:", hexlify(addr))
-                self.conn_handle = conn_handle
-                # Wait before discovering services
-                self._last_operation_time = time.ticks_ms()
-                print("Waiting before service discovery...")
-                time.sleep_ms(500)  # Longer delay after connection
+        elif event == _IRQ_PERIPHERAL_CONNECT:
+            if DEBUG:
+                print("Connected to:", hexlify(queue.adresse(i)))
+            self.conn_handle = queue.a(i)
+            self.peer_addr = bytes(queue.adresse(i))
+            self.peer_addr_type = queue.b(i)
+            self._connecting = False
+            self._last_operation_time = time.ticks_ms()
+            # Subscribe right away with cached handles, otherwise run full discovery
+            if not self._subscribe_from_cache():
                 self._start_service_discovery()
 
-            elif event == _IRQ_PERIPHERAL_DISCONNECT:
-                conn_handle, _, _ = data
+        elif event == _IRQ_PERIPHERAL_DISCONNECT:
+            if DEBUG:
                 print("Disconnected")
-                self._reset_state()
+            self._reset_state()
 
-            elif event == _IRQ_GATTC_SERVICE_RESULT:
-                conn_handle, start_handle, end_handle, uuid = data
+        elif event == _IRQ_GATTC_SERVICE_RESULT:
+            uuid = queue.uuid(i)
+            if DEBUG:
                 print(f"Service found: {uuid}")
-                
-                # Check if this is a service we're interested in
-                if uuid in self.services_of_interest:
-                    self.services_of_interest[uuid]["found"] = True
-                    self.services_of_interest[uuid]["start_handle"] = start_handle
-                    self.services_of_interest[uuid]["end_handle"] = end_handle
+
+            # Check if this is a service we're interested in
+            if uuid in self.services_of_interest:
+                self.services_of_interest[uuid]["found"] = True
+                self.services_of_interest[uuid]["start_handle"] = queue.b(i)
+                self.services_of_interest[uuid]["end_handle"] = queue.c(i)
+                if DEBUG:
                     print(f"Service of interest found: {uuid}")
 
-            elif event == _IRQ_GATTC_SERVICE_DONE:
-                conn_handle, status = data
-                print(f"Service discovery complete, status: {status}")
-                self._discovering_services = False
-                self._service_discovery_complete = True
-                
-                # Schedule characteristic discovery with delay
-                print("Scheduling characteristic discovery...")
-                self._last_operation_time = time.ticks_ms()
-                time.sleep_ms(500)  # Wait before discovering characteristics
-                self._discover_characteristics_for_services()
-
-            elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
-                conn_handle, def_handle, value_handle, properties, uuid = data
+        elif event == _IRQ_GATTC_SERVICE_DONE:
+            if DEBUG:
+                print(f"Service discovery complete, status: {queue.b(i)}")
+            self._discovering_services = False
+            self._service_discovery_complete = True
+            self._last_operation_time = time.ticks_ms()
+            self._discover_characteristics_for_services()
+
+        elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
+            uuid = queue.uuid(i)
+            value_handle = queue.b(i)
+            if DEBUG:
                 print(f"Characteristic found: {uuid}, handle: {value_handle}")
-                
-                if uuid == UART_RX_CHAR_UUID:
-                    self.rx_handle = value_handle
+
+            if uuid == UART_RX_CHAR_UUID:
+                self.rx_handle = value_handle
+                if DEBUG:
                     print("UART RX characteristic found, handle:", value_handle)
-                
-                elif uuid == UART_TX_CHAR_UUID:
-                    self.tx_handle = value_handle
+
+            elif uuid == UART_TX_CHAR_UUID:
+                self.tx_handle = value_handle
+                if DEBUG:
                     print("UART TX characteristic found, handle:", value_handle)
-                    # Store CCCD handle
-                    self.cccd_handles[self.tx_handle] = value_handle + 1
-                
-                elif uuid == HRS_MEASUREMENT_UUID:
-                    self.hrs_handle = value_handle
+                # Store CCCD handle
+                self.cccd_handles[self.tx_handle] = value_handle + 1
+
+            elif uuid == HRS_MEASUREMENT_UUID:
+                self.hrs_handle = value_handle
+                if DEBUG:
                     print("Heart Rate characteristic found, handle:", value_handle)
-                    # Store CCCD handle
-                    self.cccd_handles[self.hrs_handle] = value_handle + 1
-            
-            elif event == _IRQ_GATTC_CHARACTERISTIC_DONE:
-                conn_handle, status = data
-                print(f"Characteristic discovery complete, status: {status}")
-                self._discovering_chars = False
-                
-                # Schedule notification setup with delay
-                print("Scheduling notification setup...")
-                self._last_operation_time = time.ticks_ms()
-                time.sleep_ms(1000)  # Longer delay before enabling notifications
-                self._setup_notifications()
-
-            elif event == _IRQ_GATTC_WRITE_DONE:
-                conn_handle, value_handle, status = data
+                # Store CCCD handle
+                self.cccd_handles[self.hrs_handle] = value_handle + 1
+
+        elif event == _IRQ_GATTC_CHARACTERISTIC_DONE:
+            if DEBUG:
+                print(f"Characteristic discovery complete, status: {queue.b(i)}")
+            self._discovering_chars = False
+            self._last_operation_time = time.ticks_ms()
+            if self._services_to_discover:
+                # UART and HRS are separate services: one discovery each
+                self._discover_characteristics_for_service(self._services_to_discover.pop(0))
+                return
+            self._store_handles()
+            self._setup_notifications()
+
+        elif event == _IRQ_GATTC_WRITE_DONE:
+            status = queue.c(i)
+            if DEBUG:
                 print(f"Write completed, status: {status}")
-                self._write_pending = False
-                self._last_operation_time = time.ticks_ms()
-                
-                # Wait before continuing with any pending operations
-                time.sleep_ms(300)
-                
-                # Check if we need to enable more notifications
-                if self._service_discovery_complete:
-                    self._continue_notification_setup()
-
-            elif event == _IRQ_GATTC_NOTIFY:
-                conn_handle, value_handle, notify_data = data
-                if value_handle == self.hrs_handle:
-                    # Parse heart rate data according to BLE spec
-                    flags = notify_data[0]
-                    if flags & 0x01:  # Check if value is in 16-bit format
-                        bpm = int.from_bytes(notify_data[1:3], 'little')
-                    else:
-                        bpm = notify_data[1]
-                    print(f"[Heart Rate] → {bpm} BPM")
-                elif value_handle == self.tx_handle:
-                    print(f"[UART] Received: {notify_data.decode('utf-8', 'replace')}")
-
-        except Exception as e:
-            print(f"Error in IRQ handler: {type(e).__name__}: {e}")
-            # Don't reset state on error, just continue
+            self._write_pending = False
+            self._last_operation_time = time.ticks_ms()
+            if self._cccd_writing is not None:
+                # Done with this CCCD even if it failed: never rewrite it in a loop
+                self._notifying.append(self._cccd_writing)
+                self._cccd_writing = None
+
+            if self._cached_handles:
+                if status != 0:
+                    # A cached handle was rejected: fall back to full discovery
+                    print("Cached handles rejected, running service discovery...")
+                    self._drop_cache()
+                    self._start_service_discovery()
+                    return
+                if not self._cache_confirmed:
+                    self._cache_confirmed = True
+                    self.cache.nb_succes += 1
+
+            # Check if we need to enable more notifications
+            if self._service_discovery_complete:
+                self._continue_notification_setup()
 
     def _reset_state(self):
         """Reset connection state"""
@@ -182,7 +380,16 @@ class BLECentral:
         self._discovering_chars = False
         self._write_pending = False
         self._service_discovery_complete = False
+        self._services_to_discover = []
+        self._cccd_writing = None
+        self._notifying = []
+        self._retry_operation = None
+        self._cached_handles = False
+        self._cache_confirmed = False
         self.cccd_handles = {}
+        self.scan_started = False
+        self.heart_rate = 0
+        self.heart_rate_ms = None
         
         # Reset service tracking
         for service in self.services_of_interest:
@@ -190,13 +397,72 @@ class BLECentral:
             self.services_of_interest[service]["start_handle"] = 0
             self.services_of_interest[service]["end_handle"] = 0
 
+    def _subscribe_from_cache(self):
+        """Subscribe using cached handles; returns False if discovery is needed"""
+        hrs = self.cache.handles(self.peer_addr, _KEY_HRS_SERVICE, _KEY_HRS_MEASUREMENT)
+        tx = self.cache.handles(self.peer_addr, _KEY_UART_SERVICE, _KEY_UART_TX)
+        rx = self.cache.handles(self.peer_addr, _KEY_UART_SERVICE, _KEY_UART_RX)
+        if hrs is None and tx is None:
+            return False
+
+        if hrs is not None:
+            self.hrs_handle = hrs[0]
+            self.cccd_handles[hrs[0]] = hrs[1]
+        if tx is not None:
+            self.tx_handle = tx[0]
+            self.cccd_handles[tx[0]] = tx[1]
+        if rx is not None:
+            self.rx_handle = rx[0]
+
+        self._cached_handles = True
+        self._service_discovery_complete = True
+        self._setup_notifications()
+        if not self._write_pending:
+            # The CCCD write could not even be started
+            self._drop_cache()
+            return False
+        if DEBUG:
+            print("Using cached GATT handles")
+        return True
+
+    def _drop_cache(self):
+        """Forget the cached handles of the connected peer"""
+        self.cache.oublier(self.peer_addr)
+        self._cached_handles = False
+        self._service_discovery_complete = False
+        self._retry_operation = None
+        self.rx_handle = None
+        self.tx_handle = None
+        self.hrs_handle = None
+        self.cccd_handles = {}
+
+    def _store_handles(self):
+        """Save the handles found by discovery to flash"""
+        if not self.peer_addr:
+            return
+        services = {}
+        if self.hrs_handle:
+            services[_KEY_HRS_SERVICE] = {
+                _KEY_HRS_MEASUREMENT: [self.hrs_handle, self.cccd_handles[self.hrs_handle]],
+            }
+        if self.tx_handle or self.rx_handle:
+            uart = {}
+            if self.tx_handle:
+                uart[_KEY_UART_TX] = [self.tx_handle, self.cccd_handles[self.tx_handle]]
+            if self.rx_handle:
+                uart[_KEY_UART_RX] = [self.rx_handle, 0]
+            services[_KEY_UART_SERVICE] = uart
+        if services:
+            self.cache.enregistrer(self.peer_addr, services)
+
     def _start_service_discovery(self):
         """Start discovering services"""
         if not self.conn_handle or self._discovering_services:
             print("Cannot discover services: not connected or already discovering")
             return
             
-        print("Starting service discovery...")
+        if DEBUG:
+            print("Starting service discovery...")
         try:
             self._discovering_services = True
             self.ble.gattc_discover_services(self.conn_handle)
@@ -206,8 +472,7 @@ class BLECentral:
             
             # Retry after a delay
             print("Retrying service discovery in 1 second...")
-            time.sleep_ms(1000)
-            self._start_service_discovery()
+            self._schedule_retry(self._start_service_discovery)
 
     def _discover_characteristics_for_services(self):
         """Discover characteristics for services of interest"""
@@ -222,7 +487,8 @@ class BLECentral:
             print("No services of interest found")
             return
             
-        # Start with the first service
+        # One service at a time: the next one starts when this one is done
+        self._services_to_discover = services_to_discover[1:]
         self._discover_characteristics_for_service(services_to_discover[0])
 
     def _discover_characteristics_for_service(self, service_uuid):
@@ -237,7 +503,8 @@ class BLECentral:
         start_handle = service_info["start_handle"]
         end_handle = service_info["end_handle"]
         
-        print(f"Discovering characteristics for {service_uuid}...")
+        if DEBUG:
+            print(f"Discovering characteristics for {service_uuid}...")
         try:
             self._discovering_chars = True
             self.ble.gattc_discover_characteristics(
@@ -249,31 +516,24 @@ class BLECentral:
             
             # Retry after a delay
             print("Retrying characteristic discovery in 1 second...")
-            time.sleep_ms(1000)
-            self._discover_characteristics_for_service(service_uuid)
+            self._schedule_retry(self._discover_characteristics_for_service, service_uuid)
 
     def _setup_notifications(self):
         """Set up notifications for discovered characteristics"""
         if not self.conn_handle or self._write_pending:
             print("Cannot setup notifications: not connected or write pending")
             return
-            
-        # Start with heart rate if available
-        if self.hrs_handle and self.hrs_handle in self.cccd_handles:
-            self._enable_notifications_for_characteristic(self.hrs_handle)
-        else:
-            # Try UART if available
-            if self.tx_handle and self.tx_handle in self.cccd_handles:
-                self._enable_notifications_for_characteristic(self.tx_handle)
+        self._notifying = []
+        self._continue_notification_setup()
 
     def _continue_notification_setup(self):
-        """Continue setting up notifications after a previous one completes"""
+        """Enable the next notification not yet set up (heart rate first, then UART)"""
         if not self.conn_handle or self._write_pending:
             return
-            
-        # If we've already set up heart rate, try UART
-        if self.hrs_handle and self.tx_handle and self.tx_handle in self.cccd_handles:
-            self._enable_notifications_for_characteristic(self.tx_handle)
+        for char_handle in (self.hrs_handle, self.tx_handle):
+            if char_handle and char_handle in self.cccd_handles and char_handle not in self._notifying:
+                self._enable_notifications_for_characteristic(char_handle)
+                return
 
     def _enable_notifications_for_characteristic(self, char_handle):
         """Enable notifications for a specific characteristic"""
@@ -283,18 +543,20 @@ class BLECentral:
         cccd_handle = self.cccd_handles[char_handle]
         char_name = "UART TX" if char_handle == self.tx_handle else "Heart Rate" if char_handle == self.hrs_handle else "Unknown"
         
-        print(f"Enabling {char_name} notifications (CCCD handle: {cccd_handle})...")
+        if DEBUG:
+            print(f"Enabling {char_name} notifications (CCCD handle: {cccd_handle})...")
         try:
             self._write_pending = True
+            self._cccd_writing = char_handle
             self.ble.gattc_write(self.conn_handle, cccd_handle, b'\x01\x00', 1)
         except OSError as e:
             print(f"Failed to enable {char_name} notifications: {e}")
             self._write_pending = False
+            self._cccd_writing = None
             
             # Retry after a delay
             print(f"Retrying {char_name} notification setup in 1 second...")
-            time.sleep_ms(1000)
-            self._enable_notifications_for_characteristic(char_handle)
+            self._schedule_retry(self._enable_notifications_for_characteristic, char_handle)
 
     def send_uart(self, text):
         """Send data over UART service"""
@@ -318,29 +580,33 @@ class BLECentral:
             return False
 
 
-# Test
-central = BLECentral()
-
-# Wait to connect before sending - using a better approach with timeout
-print("Waiting for connection and service discovery...")
-timeout = 60  # 60 seconds timeout
-start_time = time.time()
-
-while time.time() - start_time < timeout:
-    if central.conn_handle and central.rx_handle:
-        print("Connected and ready, sending test message...")
-        # Wait a bit more to ensure all setup is complete
-        time.sleep(2)
-        central.send_uart("Hello from Central 👋")
-        break
-    time.sleep(1)
-else:
-    print("Failed to connect or discover services within timeout")
-
-# Keep the script running to receive notifications
-print("Listening for notifications (press Ctrl+C to exit)...")
-try:
-    while True:
+# Test: standalone run on the board (mpremote run heartrate.py)
+if __name__ == "__main__":
+    central = BLECentral()
+
+    # Wait to connect before sending - using a better approach with timeout
+    print("Waiting for connection and service discovery...")
+    timeout = 60  # 60 seconds timeout
+    start_time = time.time()
+
+    while time.time() - start_time < timeout:
+        if central.conn_handle and central.rx_handle:
+            print("Connected and ready, sending test message...")
+            # Wait a bit more to ensure all setup is complete
+            time.sleep(2)
+            central.process_events()
+            central.send_uart("Hello from Central 👋")
+            break
+        central.process_events()
         time.sleep(1)
-except KeyboardInterrupt:
-    print("Exiting...")
\ No newline at end of file
+    else:
+        print("Failed to connect or discover services within timeout")
+
+    # Keep the script running to receive notifications
+    print("Listening for notifications (press Ctrl+C to exit)...")
+    try:
+        while True:
+            central.process_events()
+            time.sleep_ms(100)
+    except KeyboardInterrupt:
+        print("Exiting...")
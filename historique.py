@@ -0,0 +1,108 @@
+from array import array
+
+import framebuf
+
+
+class Historique:
+    """
+    Derniers échantillons de plusieurs grandeurs (une par courbe), chacune
+    dans un array('h') circulaire de `capacite` valeurs: mémoire fixe.
+
+    `echelles` donne pour chaque courbe la plage (mini, maxi) affichée.
+    Les valeurs d'un même instant sont posées par ajouter(), puis avancer()
+    passe à l'instant suivant.
+    """
+
+    def __init__(self, capacite, echelles):
+        self.capacite = capacite
+        self.echelles = echelles
+        self._courbes = [array('h', [0] * capacite) for _ in echelles]
+        self._tete = 0      # Instant en cours d'écriture
+        self.nb = 0         # Instants complets disponibles
+
+    def ajouter(self, courbe, valeur):
+        if valeur > 32767:
+            valeur = 32767
+        elif valeur < -32768:
+            valeur = -32768
+        self._courbes[courbe][self._tete] = valeur
+
+    def avancer(self):
+        self._tete = (self._tete + 1) % self.capacite
+        if self.nb < self.capacite:
+            self.nb += 1
+
+    def valeur(self, courbe, age):
+        """Valeur d'il y a `age` instants (0: la plus récente)"""
+        return self._courbes[courbe][(self._tete - 1 - age) % self.capacite]
+
+
+class Graphe:
+    """
+    Courbes d'un Historique tracées dans un FrameBuffer propre à la zone
+    (x, y, largeur, hauteur) de l'écran, une bande horizontale par courbe et
+    une colonne par instant, le plus récent à droite.
+
+    defiler() décale la zone d'une colonne (scroll) et ne trace que la
+    nouvelle colonne: coût constant, quelle que soit la durée affichée.
+    redessiner() retrace tout depuis l'historique (changement de page).
+    """
+
+    def __init__(self, ecran, historique, x, y, largeur, hauteur):
+        self.ecran = ecran
+        self.historique = historique
+        self.x = x
+        self.y = y
+        self.largeur = largeur
+        self.hauteur = hauteur
+        nb = len(historique.echelles)
+        self.hauteur_bande = (hauteur - (nb - 1)) // nb     # Une ligne vide entre deux bandes
+        self._tampon = bytearray(largeur * ((hauteur + 7) // 8))
+        self._fb = framebuf.FrameBuffer(self._tampon, largeur, hauteur, framebuf.MONO_VLSB)
+
+    def y_bande(self, courbe):
+        """Haut de la bande d'une courbe, relatif au graphe"""
+        return courbe * (self.hauteur_bande + 1)
+
+    def _y(self, courbe, valeur):
+        mini, maxi = self.historique.echelles[courbe]
+        if valeur < mini:
+            valeur = mini
+        elif valeur > maxi:
+            valeur = maxi
+        h = self.hauteur_bande - 1
+        return self.y_bande(courbe) + h - (valeur - mini) * h // (maxi - mini)
+
+    def _colonne(self, x, age):
+        # Segment vertical de l'instant précédent à celui-ci: la courbe reste continue
+        historique = self.historique
+        fb = self._fb
+        for courbe in range(len(historique.echelles)):
+            y1 = self._y(courbe, historique.valeur(courbe, age))
+            if age + 1 < historique.nb:
+                y0 = self._y(courbe, historique.valeur(courbe, age + 1))
+            else:
+                y0 = y1
+            if y0 > y1:
+                y0, y1 = y1, y0
+            fb.vline(x, y0, y1 - y0 + 1, 1)
+
+    def _copier(self):
+        self.ecran.blit_zone(self._fb, self.x, self.y, self.largeur, self.hauteur)
+
+    def redessiner(self):
+        self._fb.fill(0)
+        for age in range(min(self.historique.nb, self.largeur)):
+            self._colonne(self.largeur - 1 - age, age)
+        self._copier()
+
+    def defiler(self):
+        """Nouvel instant dans l'historique: décalage d'une colonne vers la gauche"""
+        fb = self._fb
+        x = self.largeur - 1
+        fb.scroll(-1, 0)
+        # scroll() laisse l'ancienne colonne en place
+        fb.vline(x, 0, self.hauteur, 0)
+        if self.historique.nb:
+            self._colonne(x, 0)
+        self._copier()
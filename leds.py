@@ -0,0 +1,297 @@
+import time
+from micropython import schedule
+
+from machine import disable_irq, enable_irq
+
+_ORDRE_DEFAUT = (1, 0, 2, 3)  # Ordre GRB utilisé par le module neopixel
+
+
+class Couche:
+    """
+    Couche de LEDs gérée par le compositeur.
+
+    Chaque couche possède son propre tampon de couleurs (déjà dans l'ordre
+    des octets du ruban) et un masque indiquant les LEDs qu'elle recouvre.
+    Une LED libérée est transparente: la couche de priorité inférieure apparaît.
+    """
+
+    def __init__(self, compositeur, nom):
+        self.nom = nom
+        self._comp = compositeur
+        self._ordre = compositeur.ordre
+        self.buf = bytearray(compositeur.nombre * 3)
+        self.masque = bytearray(compositeur.nombre)
+        self.occupee = False
+
+    def remplir(self, debut, fin, couleur):
+        """Colore les LEDs de debut à fin (inclus, dans n'importe quel ordre)"""
+        if debut > fin:
+            debut, fin = fin, debut
+        buf = self.buf
+        masque = self.masque
+        o0 = self._ordre[0]
+        o1 = self._ordre[1]
+        o2 = self._ordre[2]
+        r = couleur[0]
+        v = couleur[1]
+        b = couleur[2]
+        for i in range(debut, fin + 1):
+            o = i * 3
+            buf[o + o0] = r
+            buf[o + o1] = v
+            buf[o + o2] = b
+            masque[i] = 1
+        self.occupee = True
+        self._comp.modifie = True
+
+    def pixel(self, i, couleur):
+        """Colore une seule LED"""
+        self.remplir(i, i, couleur)
+
+    def copier(self, debut, octets, masque):
+        """
+        Copie une trame précalculée (octets dans l'ordre du ruban, masque de
+        couverture) à partir de la LED debut
+        """
+        n = len(masque)
+        o = debut * 3
+        self.buf[o:o + n * 3] = octets
+        self.masque[debut:debut + n] = masque
+        self.occupee = True
+        self._comp.modifie = True
+
+    def couvrir(self, debut, fin):
+        """Recouvre les LEDs de debut à fin (inclus) avec les couleurs déjà dans la couche"""
+        masque = self.masque
+        for i in range(debut, fin + 1):
+            masque[i] = 1
+        self.occupee = True
+        self._comp.modifie = True
+
+    def liberer(self, debut, fin):
+        """Rend les LEDs de debut à fin (inclus) transparentes"""
+        if debut > fin:
+            debut, fin = fin, debut
+        masque = self.masque
+        for i in range(debut, fin + 1):
+            masque[i] = 0
+        self._comp.modifie = True
+
+    def vider(self):
+        """Rend toute la couche transparente"""
+        if not self.occupee:
+            return
+        masque = self.masque
+        for i in range(len(masque)):
+            masque[i] = 0
+        self.occupee = False
+        self._comp.modifie = True
+
+
+class Compositeur:
+    """
+    Seul écrivain du ruban NeoPixel.
+
+    Les différentes fonctions (clignotants, détresse, bande de frein, feu
+    arrière) ne modifient que leur couche. À chaque trame, le compositeur
+    fusionne les couches par ordre de priorité dans un tampon préalloué et
+    fait un unique np.write(), ou rien du tout si aucune couche n'a changé.
+    """
+
+    def __init__(self, np):
+        self.np = np
+        self.nombre = len(np)
+        self.ordre = getattr(np, "ORDER", _ORDRE_DEFAUT)
+        self.couches = []  # De la priorité la plus basse à la plus haute
+        self._trame = bytearray(self.nombre * 3)
+        self._noir = bytes(self.nombre * 3)
+        self.modifie = True
+        self._en_cours = False
+
+        # Statistiques
+        self.nb_ecritures = 0
+        self.nb_trames_ignorees = 0
+
+    def ajouter_couche(self, nom):
+        """Ajoute une couche au-dessus des couches existantes"""
+        couche = Couche(self, nom)
+        self.couches.append(couche)
+        return couche
+
+    def _composer(self):
+        """Fusionne les couches dans le tampon de trame"""
+        trame = self._trame
+        trame[:] = self._noir
+        for couche in self.couches:
+            if not couche.occupee:
+                continue
+            buf = couche.buf
+            masque = couche.masque
+            for i in range(self.nombre):
+                if masque[i]:
+                    o = i * 3
+                    trame[o] = buf[o]
+                    trame[o + 1] = buf[o + 1]
+                    trame[o + 2] = buf[o + 2]
+
+    def trame(self, timer=None):
+        """Pousse une trame sur le ruban si au moins une couche a changé"""
+        if not self.modifie:
+            self.nb_trames_ignorees += 1
+            return
+        self._en_cours = True
+        # Remis à zéro avant la composition: une couche modifiée pendant la
+        # fusion (feu stop, depuis micropython.schedule) relance une trame
+        while self.modifie:
+            self.modifie = False
+            self._composer()
+            self.np.buf[:] = self._trame
+            self.np.write()
+            self.nb_ecritures += 1
+        self._en_cours = False
+
+    def trame_immediate(self):
+        """
+        Pousse une trame tout de suite, sans attendre la tâche périodique.
+        Si une trame est en cours (code interrompu par micropython.schedule),
+        elle recommence d'elle-même avec la couche modifiée.
+        """
+        if not self._en_cours:
+            self.trame()
+
+    def ecrire_plage(self, debut, fin):
+        """
+        Recompose les seules LEDs de debut à fin (inclus) et les écrit sans
+        attendre. Sans allocation: utilisable depuis une IRQ hard. Les autres
+        LEDs gardent la dernière trame écrite; la couche modifiée relance de
+        toute façon une trame complète à la tâche suivante.
+        """
+        trame = self._trame
+        buf_np = self.np.buf
+        couches = self.couches
+        for i in range(debut, fin + 1):
+            o = i * 3
+            r = v = b = 0
+            k = len(couches) - 1
+            while k >= 0:
+                couche = couches[k]
+                if couche.occupee and couche.masque[i]:
+                    buf = couche.buf
+                    r = buf[o]
+                    v = buf[o + 1]
+                    b = buf[o + 2]
+                    break
+                k -= 1
+            trame[o] = buf_np[o] = r
+            trame[o + 1] = buf_np[o + 1] = v
+            trame[o + 2] = buf_np[o + 2] = b
+        self.np.write()
+        self.nb_ecritures += 1
+
+
+class FeuStop:
+    """
+    Chemin direct du levier de frein vers sa bande de LEDs.
+
+    La trame de la bande (animation d'une seule trame) est copiée une fois
+    pour toutes dans la couche, qui n'appartient qu'au feu stop. L'IRQ
+    (hard) de la broche lit le niveau réel du levier, couvre ou libère la
+    plage et écrit aussitôt la bande avec Compositeur.ecrire_plage():
+    pas d'attente de la tâche des LEDs, du traitement des boutons, ni même
+    de la fin d'un transfert I2C de l'écran en cours (une IRQ hard
+    l'interrompt). Tout y est sans allocation. La couche doit être la
+    dernière ajoutée au compositeur: elle passe devant toutes les autres.
+
+    Les rebonds du levier ne relancent pas d'écriture pendant `rebond_us`
+    après la précédente: l'IRQ planifie alors _apres_irq() par
+    micropython.schedule, qui relit le niveau une fois le code en cours
+    rendu et corrige la bande si besoin (comme verifier(), appelée
+    périodiquement, qui rattrape un front perdu).
+
+    La latence IRQ -> trame écrite est mesurée à chaque écriture depuis
+    l'IRQ et passée à `sur_latence(us)` si défini, hors IRQ.
+    """
+
+    def __init__(self, broche, compositeur, couche, bande, niveau_actif=0, rebond_us=5000):
+        self.broche = broche
+        self.compositeur = compositeur
+        self.couche = couche
+        self.debut = bande.bas
+        self.fin = bande.haut
+        self.niveau_actif = niveau_actif
+        self.rebond_us = rebond_us
+        self.actif = False
+        self.sur_latence = None
+        self._t_ecriture = 0
+        self._latence_a_signaler = False
+        self._planifie = False
+        self._ref_apres_irq = self._apres_irq
+
+        # Statistiques
+        self.nb_fronts = 0
+        self.nb_ecritures_irq = 0
+        self.nb_refus = 0
+        self.nb_rattrapages = 0
+        self.latence_max_us = 0
+        self.derniere_latence_us = 0
+
+        octets, masque = bande.trame(0)
+        couche.copier(self.debut, octets, masque)
+        self._appliquer(broche.value() == niveau_actif)
+        self.compositeur.trame()
+        broche.irq(handler=self._irq, trigger=broche.IRQ_FALLING | broche.IRQ_RISING, hard=True)
+
+    def _appliquer(self, actif):
+        self.actif = actif
+        if actif:
+            self.couche.couvrir(self.debut, self.fin)
+        else:
+            self.couche.vider()
+
+    def _irq(self, broche):
+        t = time.ticks_us()
+        self.nb_fronts += 1
+        actif = broche.value() == self.niveau_actif
+        if actif != self.actif and time.ticks_diff(t, self._t_ecriture) >= self.rebond_us:
+            self._appliquer(actif)
+            self.compositeur.ecrire_plage(self.debut, self.fin)
+            fin = time.ticks_us()
+            self._t_ecriture = fin
+            latence = time.ticks_diff(fin, t)
+            self.derniere_latence_us = latence
+            if latence > self.latence_max_us:
+                self.latence_max_us = latence
+            self.nb_ecritures_irq += 1
+            self._latence_a_signaler = True
+        if self._planifie:
+            return
+        self._planifie = True
+        try:
+            schedule(self._ref_apres_irq, 0)
+        except RuntimeError:
+            # File pleine: verifier() rattrapera
+            self._planifie = False
+            self.nb_refus += 1
+
+    def _apres_irq(self, _):
+        self._planifie = False
+        if self._latence_a_signaler:
+            self._latence_a_signaler = False
+            if self.sur_latence is not None:
+                self.sur_latence(self.derniere_latence_us)
+        self.verifier()
+
+    def verifier(self):
+        """Resynchronise la bande sur le niveau du levier (hors IRQ)"""
+        # IRQ masquées le temps de lire et d'appliquer: un front entre les
+        # deux ne doit pas être écrasé par l'ancien niveau
+        etat = disable_irq()
+        actif = self.broche.value() == self.niveau_actif
+        change = actif != self.actif
+        if change:
+            self._appliquer(actif)
+        enable_irq(etat)
+        if not change:
+            return
+        self.compositeur.trame_immediate()
+        self.nb_rattrapages += 1
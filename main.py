@@ -1,7 +1,14 @@
-from machine import Pin, Timer, I2C, PWM, ADC, WDT
+from machine import Pin, I2C, PWM, ADC, WDT
 import neopixel
+import leds
+import animations
+import ordonnanceur
+import coeurs
+import bus
 import time
-from ssd1306 import SSD1306_I2C
+from array import array
+from affichage import EcranPartiel
+import glyphes
 
 time.sleep(2)
 
@@ -9,13 +16,30 @@ import bluetooth
 from micropython import const
 from ubinascii import hexlify
 import assioma
+import heartrate
+import reconnexion
 import vitesse
+import enregistreur
+import boutons
+import courant
+import energie
+import historique
+import metriques
 
 
 # ----- NeoPixel Configuration -----
 BROCHE_NEO = 14
 NOMBRE_NEO = 52
 np = neopixel.NeoPixel(Pin(15), NOMBRE_NEO)
+PERIODE_TRAME_NEO = 20  # ms entre deux trames du compositeur (50 Hz)
+
+# Un seul écrivain pour le ruban: chaque fonction ne modifie que sa couche
+# (de la priorité la plus basse à la plus haute)
+compositeur = leds.Compositeur(np)
+couche_arriere = compositeur.ajouter_couche("arriere")
+couche_clignotant = compositeur.ajouter_couche("clignotant")
+couche_detresse = compositeur.ajouter_couche("detresse")
+couche_frein = compositeur.ajouter_couche("frein")   # Toujours la dernière: passe devant tout
 
 # Adresse MAC de la pédale Assioma-MX2
 target_mac = b'\xE9\xB5\x4A\x31\x63\xB5'  # E9:B5:4A:31:63:B5
@@ -28,6 +52,32 @@ INDICE_DEBUT_GAUCHE = 19
 INDICE_FIN_GAUCHE = 25
 INDICE_DEBUT_DROIT = 6
 INDICE_FIN_DROIT = 0
+INDICE_DEBUT_FREIN = 7
+INDICE_FIN_FREIN = 18
+
+# Animations précalculées: les motifs sont des tables de niveaux, la
+# correction gamma/luminosité est appliquée une fois à la construction
+LUMINOSITE_NEO = 255
+correction_neo = animations.table_correction(LUMINOSITE_NEO)
+NOMBRE_CLIGNOTANT = INDICE_FIN_GAUCHE - INDICE_DEBUT_GAUCHE + 1
+anim_gauche = animations.Animation(INDICE_DEBUT_GAUCHE, INDICE_FIN_GAUCHE,
+                                   animations.point_mobile(NOMBRE_CLIGNOTANT),
+                                   COULEUR_ALLUME, correction_neo, ordre=compositeur.ordre)
+anim_droit = animations.Animation(INDICE_DEBUT_DROIT, INDICE_FIN_DROIT,
+                                  animations.point_mobile(NOMBRE_CLIGNOTANT),
+                                  COULEUR_ALLUME, correction_neo, ordre=compositeur.ordre)
+# Détresse: les deux côtés (0-6 et 19-25) en noir ou allumés, bande de frein laissée libre
+anim_detresse = animations.Animation(INDICE_FIN_DROIT, INDICE_FIN_GAUCHE,
+                                     animations.clignotement(INDICE_FIN_GAUCHE + 1),
+                                     COULEUR_ALLUME, correction_neo, opaque=True,
+                                     couvertes=bytes(0 if INDICE_DEBUT_FREIN <= k <= INDICE_FIN_FREIN else 1
+                                                     for k in range(INDICE_FIN_GAUCHE + 1)),
+                                     ordre=compositeur.ordre)
+bande_frein = animations.Animation(INDICE_DEBUT_FREIN, INDICE_FIN_FREIN,
+                                   [bytes([255] * (INDICE_FIN_FREIN - INDICE_DEBUT_FREIN + 1))],
+                                   COULEUR_ROUGE, correction_neo, opaque=True, ordre=compositeur.ordre)
+lecteur_clignotant = animations.Lecteur(couche_clignotant)
+lecteur_detresse = animations.Lecteur(couche_detresse)
 
 # ----- Boutons -----
 BROCHE_BOUTON_GAUCHE = 2
@@ -48,6 +98,10 @@ bouton_arriere = Pin(BROCHE_ARRIERE, Pin.IN, Pin.PULL_UP)
 bouton_reed = Pin(BROCHE_REED, Pin.IN, Pin.PULL_UP)
 bouton_phare = Pin(BROCHE_PHARE, Pin.IN, Pin.PULL_UP)
 bouton_chrono = Pin(BROCHE_CHRONO, Pin.IN, Pin.PULL_UP)
+# Feu stop: chemin direct levier -> LEDs 7 à 18, hors de la table des boutons
+feu_stop = leds.FeuStop(frein, compositeur, couche_frein, bande_frein)
+# Capteur de vitesse: IRQ dédiée (hard), hors de la table des boutons
+vitesse.demarrer(bouton_reed)
 
 pwm = PWM(Pin(18), freq=144)
 # ----- LCD (I2C) -----
@@ -59,46 +113,94 @@ I2C_ROWS = 2
 I2C_COLS = 16
 
 i2c = I2C(I2C_NUMMER, sda=Pin(SDA_PIN), scl=Pin(SCL_PIN), freq=400000)
-oled = SSD1306_I2C(128, 64, i2c)
+oled = EcranPartiel(128, 64, i2c)  # N'envoie que les zones modifiées
 
 # ----- Initialisation du capteur de courant ACS712 -----
 BROCHE_ACS712 = 26  # Utiliser GP26 (ADC0)
 adc = ADC(Pin(BROCHE_ACS712))
-
-# ----- Variables pour les mesures de tension -----
-last_voltage = 0
-current_voltage = 40
-current_amperes = 0
-current_battery_voltage = 0
-TENSION_OFFSET = 2.540
-SENSIBILITE = 0.066
+# Valeurs nominales, remplacées par la calibration enregistrée en flash
+TENSION_OFFSET_MV = 2540    # Sortie du capteur à courant nul
+SENSIBILITE_MV_A = 66       # ACS712-30A
+TENSION_BATTERIE = 40       # V, pour la puissance électrique
+# 16 lectures réparties sur ~500 ms (une toutes les 31 ms), moyenne glissante
+NB_ECHANTILLONS_ADC = 16
+PERIODE_ECHANTILLON_ADC = 31
+capteur_courant = courant.CapteurCourant(adc, NB_ECHANTILLONS_ADC, 0,
+                                         TENSION_OFFSET_MV, SENSIBILITE_MV_A,
+                                         chemin=courant.FICHIER_CALIBRATION)
+# Au démarrage le moteur est à l'arrêt: on mesure le zéro du capteur
+if capteur_courant.calibrer():
+    print(f"Zéro courant: {capteur_courant.zero_mv()} mV")
+
+# Compteur coulométrique de la batterie du vélo (état gardé en flash)
+CAPACITE_BATTERIE_MAH = 10000
+compteur_energie = energie.CompteurEnergie(CAPACITE_BATTERIE_MAH, TENSION_BATTERIE * 1000)
+# Consommation moyenne mesurée depuis ce point (démarrage ou batterie rechargée)
+energie_depart_mwh = compteur_energie.mwh()
+distance_depart_m = 0
+distance_trajet_mm = 0
 # ----- Globales -----
-timer1 = Timer()
-timer2 = Timer()
-timer3 = Timer()
-timer4 = Timer()
-timer5 = Timer()  # Nouveau timer pour mesurer la tension
-mode_clignotement = 0
-etat_clignotement = False
-clignotement_detresse = False
-indice_neo = 0
+# Chaque sous-système est une tâche coopérative (voir la section Tâches)
+taches = ordonnanceur.Ordonnanceur()
+
+# ----- Répartition sur les deux cœurs -----
+# Avec DOUBLE_COEUR, le BLE (pédale et cardio) et l'échantillonnage du courant
+# tournent sur le cœur 1 (_thread): un oled.show() lent ne retarde plus les
+# notifications. Le cœur 0 garde écran, LEDs et boutons. Dans les deux modes,
+# les deux côtés n'échangent que des instantanés (coeurs.Instantane).
+DOUBLE_COEUR = False
+coeur1 = coeurs.Coeur1() if DOUBLE_COEUR else None
+cote_capteurs = coeur1 if DOUBLE_COEUR else taches
+PERIODE_BLE = 20 if DOUBLE_COEUR else 100   # Sans micropython.schedule, la tâche vide la file
+PERIODE_PUBLICATION = 50
+PERIODE_LECTURE = 50
+DELAI_CAPTEURS_MS = 3000    # Sans instantané neuf depuis, le watchdog n'est plus nourri
+
+# Instantané capteurs -> écran (seul le côté capteurs l'écrit)
+CHAMP_PUISSANCE = const(0)
+CHAMP_CADENCE = const(1)
+CHAMP_CARDIO = const(2)
+CHAMP_BATTERIE_PEDALE = const(3)
+CHAMP_COURANT_MA = const(4)
+CHAMP_VITESSE_ROUE = const(5)       # km/h x 100, envoyée par le capteur de puissance
+CHAMP_ETAT_BLE = const(6)           # Bits ETAT_*
+CHAMP_RECO_MS = const(7)
+CHAMP_NB_RECO = const(8)
+CHAMP_ATTENTE_MS = const(9)
+CHAMP_EVT_PERDUS = const(10)
+CHAMP_EVT_MAX = const(11)
+CHAMP_CHARGE_MAH = const(12)
+CHAMP_ENERGIE_MWH = const(13)
+CHAMP_ETAT_CHARGE = const(14)
+CHAMP_AUTONOMIE_KM = const(15)
+CHAMP_GATT_EVITES = const(16)       # Lectures de batterie servies par le cache
+NB_CHAMPS_CAPTEURS = const(17)
+ETAT_PEDALE = const(1)
+ETAT_SCAN = const(2)
+ETAT_CARDIO = const(4)
+
+# Instantané écran -> capteurs (seul le côté écran l'écrit)
+CONSIGNE_VITESSE = const(0)         # Vitesse reed, km/h x 100 (scan en mode route)
+CONSIGNE_DISTANCE_M = const(1)      # Distance du trajet, pour l'autonomie
+CONSIGNE_RAZ_ENERGIE = const(2)     # Nombre de remises à zéro demandées
+NB_CHAMPS_CONSIGNES = const(3)
+
+instantane_capteurs = coeurs.Instantane(NB_CHAMPS_CAPTEURS)
+instantane_consignes = coeurs.Instantane(NB_CHAMPS_CONSIGNES)
+lu_capteurs = array('i', [0] * NB_CHAMPS_CAPTEURS)       # Copie du côté écran
+lu_consignes = array('i', [0] * NB_CHAMPS_CONSIGNES)     # Copie du côté capteurs
+gigue_capteurs = coeurs.Gigue(PERIODE_PUBLICATION * 1000)
+gigue_ecran = coeurs.Gigue(PERIODE_LECTURE * 1000)
+seq_capteurs = -1
+t_seq_capteurs = time.ticks_ms()
+demandes_raz_energie = 0    # Côté écran
+raz_energie_faites = 0      # Côté capteurs
 etat_bouton_gauche = 0
 etat_bouton_droit = 0
-etat_bande_rouge = 0
 etat_bande_detresse = 0
 phare_arriere_allumer = False
 phare_avant = 0
 numPage = 0
-delai_rebond = 200
-nombre_impulsions_reed = 0
-temps_dernier_appui_gauche = 0
-temps_dernier_appui_droit = 0
-temps_dernier_appui_rouge = 0
-temps_dernier_appuie_detresse = 0
-temps_dernier_appui_page = 0
-temps_dernier_appui_arriere = 0
-temps_dernier_appui_phare = 0
-temps_dernier_appui_chrono = 0
 last_pedal_activity = 0 
 pedal_timeout = 3000 
 clignotant_actif = False  # Nouvelle variable pour suivre si un clignotant est actif
@@ -108,156 +210,351 @@ etat_chrono = 0
 chrono_start_time = 0
 chrono_elapsed_time = 0
 
-# Variables pour les données de puissance
-current_power = 0
-current_cadence = 0
-current_heartrate = 0
-current_battery = 0
-ble_connected = False
-ble_hr_connected = False
-
-# Variables pour la gestion de reconnexion BLE
-last_ble_check = time.ticks_ms()
-ble_check_interval = 30000  # 30 secondes entre les tentatives de reconnexion
-ble_scan_timeout = 5000     # 5 secondes de scan maximum par tentative
-scan_start_time = 0         # Pour suivre le temps de scan actuel
-is_scanning = False         # Indicateur de scan en cours
+# Côté capteurs: dernière mesure de la pédale
+puissance_pedale = 0
+cadence_pedale = 0
+batterie_pedale = 0
+
+# Côté écran: bus de données alimenté par l'instantané, le capteur reed et le
+# chrono. Les consommateurs (pages, journal) ne travaillent que sur nouvelle version.
+CANAL_PUISSANCE = const(0)
+CANAL_CADENCE = const(1)
+CANAL_CARDIO = const(2)
+CANAL_VITESSE = const(3)
+CANAL_COURANT = const(4)
+CANAL_BATTERIE_PEDALE = const(5)
+CANAL_ETAT_BLE = const(6)
+CANAL_CHRONO = const(7)
+CANAL_ATTENTE_BLE = const(8)
+CANAL_RECO_BLE = const(9)
+CANAL_EVT_PERDUS = const(10)
+CANAL_EVT_MAX = const(11)
+CANAL_DISTANCE = const(12)
+CANAL_CHARGE = const(13)
+CANAL_ENERGIE = const(14)
+CANAL_ETAT_CHARGE = const(15)
+CANAL_AUTONOMIE = const(16)
+CANAL_PUISSANCE_3S = const(17)
+CANAL_PUISSANCE_10S = const(18)
+CANAL_PUISSANCE_30S = const(19)
+CANAL_PUISSANCE_NORMALISEE = const(20)
+CANAL_PUISSANCE_MAX = const(21)
+CANAL_TRAVAIL = const(22)
+CANAL_PART_HUMAINE_30S = const(23)
+CANAL_PART_HUMAINE = const(24)
+donnees = bus.Bus((
+    ("puissance", "W"),
+    ("cadence", "tr/min"),
+    ("cardio", "bpm"),
+    ("vitesse", "km/h x 100"),      # Capteur reed, sinon capteur de puissance
+    ("courant", "mA"),
+    ("batterie_pedale", "%"),
+    ("etat_ble", "bits ETAT_*"),
+    ("chrono", "s"),
+    ("attente_ble", "s"),
+    ("reco_ble", "ms"),
+    ("evt_perdus", "evt"),
+    ("evt_max", "evt"),
+    ("distance", "m"),
+    ("charge", "mAh"),
+    ("energie", "mWh"),
+    ("etat_charge", "%"),
+    ("autonomie", "km"),
+    ("puissance_3s", "W"),
+    ("puissance_10s", "W"),
+    ("puissance_30s", "W"),
+    ("puissance_normalisee", "W"),
+    ("puissance_max", "W"),
+    ("travail", "kJ"),
+    ("part_humaine_30s", "%"),
+    ("part_humaine", "%"),
+))
+# Canaux lus par chaque page (indice = numéro de page) et par le journal
+abonnements_pages = [bus.Abonnement(donnees, canaux) for canaux in (
+    (CANAL_PUISSANCE_3S, CANAL_PUISSANCE, CANAL_PUISSANCE_10S, CANAL_PUISSANCE_30S, CANAL_CADENCE),
+    (CANAL_COURANT, CANAL_PART_HUMAINE_30S),
+    (CANAL_ETAT_BLE, CANAL_ATTENTE_BLE, CANAL_RECO_BLE, CANAL_EVT_PERDUS, CANAL_EVT_MAX),
+    (CANAL_VITESSE, CANAL_DISTANCE),
+    (CANAL_ETAT_BLE, CANAL_BATTERIE_PEDALE),
+    (CANAL_CHRONO,),
+    (CANAL_CHARGE, CANAL_ENERGIE, CANAL_ETAT_CHARGE, CANAL_AUTONOMIE),
+    (),     # Historique: mis à jour par sa propre tâche, à 1 Hz
+    (CANAL_PUISSANCE_NORMALISEE, CANAL_PUISSANCE_MAX, CANAL_TRAVAIL, CANAL_PART_HUMAINE),
+)]
+abonnement_journal = bus.Abonnement(donnees, (CANAL_PUISSANCE, CANAL_CADENCE, CANAL_CARDIO,
+                                              CANAL_VITESSE, CANAL_COURANT))
+
+# Valeurs des pages: glyphes dessinés une fois au démarrage, champs à largeur
+# fixe alignés à droite qui ne recopient que les chiffres changés (aucune chaîne)
+police_texte = glyphes.police_texte()
+police_grande = glyphes.police_segments()       # Chiffres 7 segments de 14 x 24
+champ_puissance = glyphes.Champ(oled, police_grande, 1, 30, 4)
+champ_puissance_inst = glyphes.Champ(oled, police_texte, 96, 30, 4)
+champ_puissance_10s = glyphes.Champ(oled, police_texte, 96, 38, 4)
+champ_puissance_30s = glyphes.Champ(oled, police_texte, 96, 46, 4)
+champ_cadence = glyphes.Champ(oled, police_texte, 65, 56, 3)
+champ_courant = glyphes.Champ(oled, police_texte, 65, 30, 5, decimales=3)
+champ_puissance_elec = glyphes.Champ(oled, police_texte, 81, 40, 4)
+champ_part_humaine_30s = glyphes.Champ(oled, police_texte, 89, 50, 3)
+champ_reco = glyphes.Champ(oled, police_texte, 49, 40, 5)
+champ_attente = glyphes.Champ(oled, police_texte, 65, 40, 3)
+champ_evt_perdus = glyphes.Champ(oled, police_texte, 33, 50, 4)
+champ_evt_max = glyphes.Champ(oled, police_texte, 73, 50, 3)
+champ_vitesse = glyphes.Champ(oled, police_grande, 1, 20, 3, decimales=1)
+champ_trajet = glyphes.Champ(oled, police_texte, 49, 46, 5, decimales=2)
+champ_total = glyphes.Champ(oled, police_texte, 49, 56, 5)
+champ_batterie_pedale = glyphes.Champ(oled, police_texte, 1, 30, 3)
+champ_gatt_evites = glyphes.Champ(oled, police_texte, 1, 50, 6)
+champ_minutes = glyphes.Champ(oled, police_grande, 1, 30, 3, chiffres_min=2)
+champ_secondes = glyphes.Champ(oled, police_grande, 49, 30, 2, chiffres_min=2)
+champ_charge = glyphes.Champ(oled, police_texte, 1, 30, 4, decimales=2)
+champ_energie = glyphes.Champ(oled, police_texte, 65, 30, 4)
+champ_etat_charge = glyphes.Champ(oled, police_texte, 73, 40, 3)
+champ_autonomie = glyphes.Champ(oled, police_texte, 73, 50, 3)
+champ_puissance_normalisee = glyphes.Champ(oled, police_texte, 73, 30, 4)
+champ_puissance_max = glyphes.Champ(oled, police_texte, 73, 38, 4)
+champ_travail = glyphes.Champ(oled, police_texte, 65, 46, 5)
+champ_part_humaine = glyphes.Champ(oled, police_texte, 81, 56, 3)
+# Champs de chaque page (indice = numéro de page), à redessiner avec le cadre
+champs_pages = (
+    (champ_puissance, champ_puissance_inst, champ_puissance_10s, champ_puissance_30s, champ_cadence),
+    (champ_courant, champ_puissance_elec, champ_part_humaine_30s),
+    (champ_reco, champ_attente, champ_evt_perdus, champ_evt_max),
+    (champ_vitesse, champ_trajet, champ_total),
+    (champ_batterie_pedale, champ_gatt_evites),
+    (champ_minutes, champ_secondes),
+    (champ_charge, champ_energie, champ_etat_charge, champ_autonomie),
+    (),
+    (champ_puissance_normalisee, champ_puissance_max, champ_travail, champ_part_humaine),
+)
+cadre_affiche = -1      # Mise en page dessinée (page << 3 | variante), -1: aucune
+NB_PAGES = 9
+PAGE_HISTORIQUE = 7
+PAGE_METRIQUES = 8
+
+# Historique des dernières secondes (un échantillon par seconde), tracé sur
+# la page PAGE_HISTORIQUE: une bande par courbe, échelles fixes
+COURBE_PUISSANCE = const(0)
+COURBE_CARDIO = const(1)
+COURBE_COURANT = const(2)
+DUREE_HISTORIQUE_S = 112    # Une colonne par seconde à droite des étiquettes
+historique_courbes = historique.Historique(DUREE_HISTORIQUE_S, (
+    (0, 500),       # Puissance, W
+    (40, 200),      # Cardio, bpm
+    (0, 30000),     # Courant, mA
+))
+graphe_historique = historique.Graphe(oled, historique_courbes, 128 - DUREE_HISTORIQUE_S, 20,
+                                      DUREE_HISTORIQUE_S, 44)
+
+# Moyennes glissantes 3/10/30 s, puissance normalisée, travail et part
+# humaine de la sortie: un échantillon par seconde, mémoire fixe
+metriques_puissance = metriques.MetriquesPuissance((3, 10, 30))
+
+# Enregistrement du trajet: échantillons en RAM, écriture flash par blocs de 4 Ko
+PERIODE_ENREGISTREMENT = 1000  # ms entre deux échantillons
+SILENCE_MAX_JOURNAL_MS = 10000  # Échantillon forcé si rien n'a changé depuis
+journal = enregistreur.Enregistreur()
+t_dernier_echantillon = time.ticks_ms()
 
 
 # Créer une instance de AssiomaBLEClient
-assioma_client = assioma.AssiomaBLEClient()
+# (en double cœur, la file d'événements est vidée par le cœur 1, pas par micropython.schedule)
+assioma_client = assioma.AssiomaBLEClient(drainage_auto=not DOUBLE_COEUR)
+# Connexion directe vers l'adresse connue, puis scan avec backoff
+reconnexion_ble = reconnexion.GestionnaireReconnexion(assioma_client, assioma.target_mac)
+# Ceinture cardio: même singleton BLE, événements aiguillés par conn_handle
+cardio_client = heartrate.BLECentral(heartrate.target_mac, scan=False, auto_drain=not DOUBLE_COEUR)
+reconnexion_cardio = reconnexion.GestionnaireReconnexion(cardio_client, heartrate.target_mac)
+CARDIO_PERIME_MS = 5000     # Sans notification depuis, la fréquence cardiaque n'est plus affichée
 
 # ----- Fonctions -----
-def clignoter(timer):
-    global indice_neo, etat_clignotement
-
-    if etat_clignotement:
-        np[indice_neo] = COULEUR_ALLUME
-    else:
-        np[indice_neo] = COULEUR_ETEINT
-
-    np.write()
-    if mode_clignotement == 0:
-        passer_neo_gauche()
-    else:
-        passer_neo_droit()
-    etat_clignotement = not etat_clignotement
-
 def Phare_arrière():
     if phare_arriere_allumer:
-        for i in range(26):
-            np[26+i] = COULEUR_ROUGE
+        couche_arriere.remplir(26, 51, COULEUR_ROUGE)
     else:
-        for i in range(26):
-            np[26+i] = COULEUR_ETEINT
-    np.write()
-
-def passer_neo_gauche():
-    global indice_neo, etat_clignotement
-    np[indice_neo] = COULEUR_ETEINT
-    indice_neo += 1
-    if indice_neo > INDICE_FIN_GAUCHE:
-        indice_neo = INDICE_DEBUT_GAUCHE
-    etat_clignotement = False
-
-def passer_neo_droit():
-    global indice_neo, etat_clignotement
-    np[indice_neo] = COULEUR_ETEINT
-    indice_neo -= 1
-    if indice_neo < INDICE_FIN_DROIT:
-        indice_neo = INDICE_DEBUT_DROIT
-    etat_clignotement = False
-
-def eteindre_led(debut, fin):
-    for i in range(min(debut, fin), max(debut, fin) + 1):
-        np[i] = COULEUR_ETEINT
-    np.write()
-
-# Fonction pour lire l'ADC avec plusieurs échantillons pour réduire le bruit
-def lire_adc(num_samples=5):
-    total = 0
-    for _ in range(num_samples):
-        total += adc.read_u16()
-    
-    avg_value = total / num_samples
-    tension = (avg_value / 65535) * 3.3
-    
-    # Calculer le courant à partir de la tension
-    courant = (tension - TENSION_OFFSET) / SENSIBILITE
-    courant = abs(courant)
-    
-    return tension, courant
-
-# Fonction pour mettre à jour périodiquement la mesure de tension
-def mise_a_jour_tension(timer):
-    global current_voltage, current_amperes, current_battery_voltage
-    current_voltage, current_amperes = lire_adc()
-    # Calculer la tension de la batterie (Courant * 40V)
-    current_battery_voltage = current_amperes * 40
-
-def calculer_tension_batterie():
-    """
-    Calcule la tension de la batterie basée sur le courant mesuré
-    Tension batterie = Courant * 40V
-    """
-    global current_amperes, current_battery_voltage
-    current_battery_voltage = current_amperes * 40
-    return current_battery_voltage
+        couche_arriere.vider()
+
+def courant_ma():
+    """Courant moteur en mA (conversion faite à la lecture seulement, côté capteurs)"""
+    return abs(capteur_courant.courant_ma())
+
+def distance_m():
+    """Distance du trajet: capteur reed, sinon estimée avec la vitesse de la pédale"""
+    if vitesse.distance_trajet_m:
+        return vitesse.distance_trajet_m
+    return distance_trajet_mm // 1000
+
+def echantillonner_courant():
+    # Une lecture ADC, intégrée par le compteur d'énergie à son horodatage
+    capteur_courant.echantillonner()
+    compteur_energie.integrer(courant_ma(), time.ticks_ms())
+
+def variante_page(numPage):
+    """Mise en page du moment: le cadre n'est redessiné que si elle change"""
+    variante = 0
+    if numPage == 2:
+        etat = donnees.valeur(CANAL_ETAT_BLE)
+        if etat & ETAT_PEDALE:
+            variante = 1 if donnees.valeur(CANAL_RECO_BLE) else 0
+        else:
+            variante = 2 if etat & ETAT_SCAN else 3
+    elif numPage == 4:
+        variante = 0 if donnees.valeur(CANAL_ETAT_BLE) & ETAT_PEDALE else 1
+    return numPage << 3 | variante
 
-def ecran_page(numPage):
-    global current_power, current_battery, ble_connected, is_scanning, current_voltage, current_battery_voltage
-    
-    # Mise à jour des données depuis le module assioma
-    if assioma_client.conn_handle is not None:
-        current_power = assioma_client.get_current_power()
-        current_battery = assioma_client.get_battery_level()
-        ble_connected = True
-    else:
-        ble_connected = False
-    
-    # On efface le contenu précédent dans la zone d'affichage des données
+def cadre_page(numPage, variante):
+    # Textes fixes de la page: dessinés une fois, les champs s'écrivent par-dessus
     oled.fill_rect(0, 20, 128, 44, 0)
-    
+    for champ in champs_pages[numPage]:
+        champ.invalider()
+
     if numPage == 0:
-        oled.text("Puissance mec:", 1, 20, 1)
-        oled.text(f"{current_power} Watts", 1, 30, 1)
+        # Grands chiffres: moyenne 3 s, plus lisible que la valeur instantanée
+        oled.text("Puissance 3s:", 1, 20, 1)
+        oled.text("W", 60, 46, 1)
+        oled.text("Ins", 72, 30, 1)
+        oled.text("10s", 72, 38, 1)
+        oled.text("30s", 72, 46, 1)
+        oled.text("Cadence", 1, 56, 1)
+        oled.text("rpm", 97, 56, 1)
 
     elif numPage == 1:
         oled.text("Puissance elec:", 1, 20, 1)
-        oled.text(f"Courant: {current_amperes:.3f}A", 1, 30, 1)
-        # Ajouter l'affichage de la tension de la batterie
-        oled.text(f"Puissance: {current_battery_voltage:.1f}W", 1, 40, 1)
-        
+        oled.text("Courant:", 1, 30, 1)
+        oled.text("A", 113, 30, 1)
+        oled.text("Puissance", 1, 40, 1)
+        oled.text("W", 113, 40, 1)
+        oled.text("Humain 30s", 1, 50, 1)
+        oled.text("%", 113, 50, 1)
+
     elif numPage == 2:
         # Affiche l'état de connexion BLE
         oled.text("BLE Status:", 1, 20, 1)
-        if ble_connected:
+        if variante <= 1:
             oled.text("Assioma: OK", 1, 30, 1)
+            if variante == 1:
+                # Durée de la dernière reconnexion
+                oled.text("Reco:", 1, 40, 1)
+                oled.text("ms", 89, 40, 1)
+        elif variante == 2:
+            oled.text("Recherche...", 1, 30, 1)
         else:
-            if is_scanning:
-                oled.text("Recherche...", 1, 30, 1)
-            else:
-                oled.text("Assioma: Deconnecte", 1, 30, 1)
-                oled.text("Attente 30s...", 1, 40, 1)
-        
+            oled.text("Assioma: Deconnecte", 1, 30, 1)
+            oled.text("Attente", 1, 40, 1)
+            oled.text("s...", 89, 40, 1)
+        # Santé de la file d'événements BLE (perdus / occupation maximale)
+        oled.text("Evt:", 1, 50, 1)
+        oled.text("p", 65, 50, 1)
+        oled.text("max", 97, 50, 1)
+
     elif numPage == 3:
-        speed = vitesse.current_speed if hasattr(vitesse, 'current_speed') else 0
-        # Nouvelle page pour afficher la vitesse
-        oled.text("Vitesse:", 1, 20, 1)
-        oled.text(f"{speed:.2f} km/h", 1, 30, 1)
+        oled.text("km/h", 52, 36, 1)
+        oled.text("Trajet", 1, 46, 1)
+        oled.text("km", 105, 46, 1)
+        oled.text("Total", 1, 56, 1)
+        oled.text("km", 105, 56, 1)
 
     elif numPage == 4:
         oled.text("Batterie pedale:", 1, 20, 1)
-        if ble_connected:
-            oled.text(f"{current_battery}%", 1, 30, 1)
+        if variante == 0:
+            oled.text("%", 25, 30, 1)
+            oled.text("GATT evites:", 1, 40, 1)
         else:
             oled.text("Non disponible", 1, 30, 1)
+
     elif numPage == 5:
         oled.text("Chrono:", 1, 20, 1)
-        minutes = int(chrono_elapsed_time // 60)
-        secondes = int(chrono_elapsed_time % 60)
-        oled.text(f"{minutes:02d}:{secondes:02d}", 1, 30, 1)
-    
+        # Deux-points entre les grands chiffres des minutes et des secondes
+        oled.fill_rect(43, 36, 3, 3, 1)
+        oled.fill_rect(43, 45, 3, 3, 1)
+
+    elif numPage == 6:
+        oled.text("Batterie velo:", 1, 20, 1)
+        oled.text("Ah", 41, 30, 1)
+        oled.text("Wh", 97, 30, 1)
+        oled.text("Charge", 1, 40, 1)
+        oled.text("%", 97, 40, 1)
+        oled.text("Autonomie", 1, 50, 1)
+        oled.text("km", 97, 50, 1)
+
+    elif numPage == PAGE_HISTORIQUE:
+        # Étiquettes à gauche de chaque bande, puis les courbes depuis l'historique
+        for courbe, etiquette in ((COURBE_PUISSANCE, "W"), (COURBE_CARDIO, "FC"), (COURBE_COURANT, "A")):
+            y = graphe_historique.y + graphe_historique.y_bande(courbe)
+            oled.text(etiquette, 0, y + (graphe_historique.hauteur_bande - 8) // 2, 1)
+        graphe_historique.redessiner()
+
+    elif numPage == PAGE_METRIQUES:
+        oled.text("Sortie:", 1, 20, 1)
+        oled.text("NP", 1, 30, 1)
+        oled.text("W", 105, 30, 1)
+        oled.text("Max", 1, 38, 1)
+        oled.text("W", 105, 38, 1)
+        oled.text("Travail", 1, 46, 1)
+        oled.text("kJ", 105, 46, 1)
+        oled.text("Humain", 1, 56, 1)
+        oled.text("%", 105, 56, 1)
+
+def ecran_page(numPage):
+    # Les données viennent de l'instantané (tâche "instantane"), jamais des clients BLE
+    global cadre_affiche
+    variante = variante_page(numPage)
+    if variante != cadre_affiche:
+        cadre_page(numPage, variante & 7)
+        cadre_affiche = variante
+    variante &= 7
+
+    if numPage == 0:
+        champ_puissance.afficher(donnees.valeur(CANAL_PUISSANCE_3S))
+        champ_puissance_inst.afficher(donnees.valeur(CANAL_PUISSANCE))
+        champ_puissance_10s.afficher(donnees.valeur(CANAL_PUISSANCE_10S))
+        champ_puissance_30s.afficher(donnees.valeur(CANAL_PUISSANCE_30S))
+        champ_cadence.afficher(donnees.valeur(CANAL_CADENCE))
+
+    elif numPage == 1:
+        ma = abs(donnees.valeur(CANAL_COURANT))
+        champ_courant.afficher(ma)
+        # Puissance électrique = courant x tension batterie
+        champ_puissance_elec.afficher(ma * TENSION_BATTERIE // 1000)
+        champ_part_humaine_30s.afficher(donnees.valeur(CANAL_PART_HUMAINE_30S))
+
+    elif numPage == 2:
+        if variante == 1:
+            champ_reco.afficher(donnees.valeur(CANAL_RECO_BLE))
+        elif variante == 3:
+            champ_attente.afficher(donnees.valeur(CANAL_ATTENTE_BLE))
+        champ_evt_perdus.afficher(donnees.valeur(CANAL_EVT_PERDUS))
+        champ_evt_max.afficher(donnees.valeur(CANAL_EVT_MAX))
+
+    elif numPage == 3:
+        # Grands chiffres au dixième de km/h, trajet au centième de km
+        champ_vitesse.afficher(donnees.valeur(CANAL_VITESSE) // 10)
+        champ_trajet.afficher(donnees.valeur(CANAL_DISTANCE) // 10)
+        champ_total.afficher(vitesse.odometre_m // 1000)
+
+    elif numPage == 4:
+        if variante == 0:
+            champ_batterie_pedale.afficher(donnees.valeur(CANAL_BATTERIE_PEDALE))
+            # Statistique non suivie par l'abonnement: à jour au prochain redessin
+            champ_gatt_evites.afficher(lu_capteurs[CHAMP_GATT_EVITES])
+
+    elif numPage == 5:
+        chrono = donnees.valeur(CANAL_CHRONO)
+        champ_minutes.afficher(chrono // 60)
+        champ_secondes.afficher(chrono % 60)
+
+    elif numPage == 6:
+        champ_charge.afficher(donnees.valeur(CANAL_CHARGE) // 10)
+        champ_energie.afficher(donnees.valeur(CANAL_ENERGIE) // 1000)
+        champ_etat_charge.afficher(donnees.valeur(CANAL_ETAT_CHARGE))
+        champ_autonomie.afficher(donnees.valeur(CANAL_AUTONOMIE))
+
+    elif numPage == PAGE_METRIQUES:
+        champ_puissance_normalisee.afficher(donnees.valeur(CANAL_PUISSANCE_NORMALISEE))
+        champ_puissance_max.afficher(donnees.valeur(CANAL_PUISSANCE_MAX))
+        champ_travail.afficher(donnees.valeur(CANAL_TRAVAIL))
+        champ_part_humaine.afficher(donnees.valeur(CANAL_PART_HUMAINE))
+
     # Important: Appeler show() après avoir modifié l'affichage
     oled.show()
     
@@ -271,7 +568,6 @@ def ecran_clignotant():
         oled.fill_rect(107, 2, 10, 10, 1)
         oled.text("D", 108, 1, 0)
         oled.text("G", 2, 1, 0)
-        oled.show()
     else:
         if etat_bouton_gauche == 1:
             oled.fill_rect(1, 1, 10, 10, 1)
@@ -286,7 +582,7 @@ def ecran_clignotant():
             oled.fill_rect(107, 1, 11, 11, 0)
     
     if phare_avant == 0:
-        oled.fill_rect(30, 1, 20, 20, 0)
+        oled.fill_rect(30, 1, 20, 19, 0)
     else:
         oled.fill_rect(30, 1, 16, 10, 1)
         oled.text("PF", 31, 2, 0)
@@ -295,67 +591,49 @@ def ecran_clignotant():
         oled.fill_rect(70, 1, 16, 10, 1)
         oled.text("PR", 71, 2, 0)
     else:
-        oled.fill_rect(70, 1, 20, 20, 0)
+        oled.fill_rect(70, 1, 20, 19, 0)
         oled.text("PR", 71, 2, 0)
         
     oled.show()
 
-def pedale_info(timer):
-    global current_battery, current_power, last_pedal_activity
+def pedale_info(timer=None):
+    # Côté capteurs: ne touche que puissance_pedale, cadence_pedale, batterie_pedale
+    global batterie_pedale, puissance_pedale, cadence_pedale, last_pedal_activity
     
     current_time = time.ticks_ms()
     
     if assioma_client.conn_handle is not None:
-        assioma_client.read_battery_level()
-        current_battery = assioma_client.get_battery_level()
+        # Valeur en cache: une lecture GATT seulement quand elle a expiré
+        batterie_pedale = assioma_client.get_battery_level()
         
-        # Lire la puissance actuelle
+        # Lire la puissance et la cadence actuelles
         new_power = assioma_client.get_current_power()
+        cadence_pedale = assioma_client.get_current_cadence()
+        
+        # L'activité vient des tours de pédalier; la puissance ne sert
+        # d'indice que si la pédale n'envoie pas les données du pédalier
+        if assioma_client.cadence.donnees_pedalier:
+            actif = assioma_client.cadence.pedalage_actif(current_time)
+        else:
+            actif = new_power > 0
         
-        # Si la puissance est supérieure à 0, mettre à jour le timestamp d'activité
-        if new_power > 0:
-            current_power = new_power
+        if actif:
+            puissance_pedale = new_power
             last_pedal_activity = current_time
         else:
             # Vérifier si il n'y a pas eu d'activité depuis 3 secondes
             if time.ticks_diff(current_time, last_pedal_activity) > pedal_timeout:
-                current_power = 0
+                puissance_pedale = 0
             # Sinon, garder la dernière valeur de puissance
         
+        # Pédale au repos: le moteur doit être coupé, on suit la dérive du zéro courant
+        if not actif:
+            capteur_courant.suivre_derive(new_power)
+        
     else:
-        # Si pas de connexion, remettre la puissance à 0
-        current_power = 0
-    
-    wdt.feed()
-
-def gerer_feux_detresse(timer):
-    global clignotement_detresse
-    if clignotement_detresse:
-        for i in range(0, 7):
-            np[i] = COULEUR_ALLUME
-        for i in range(19, 26):
-            np[i] = COULEUR_ALLUME
-    else:
-        for i in range(0, 7):
-            np[i] = COULEUR_ETEINT
-        for i in range(19, 26):
-            np[i] = COULEUR_ETEINT
-    if etat_bande_detresse == False:
-        for i in range(0, 7):
-            np[i] = COULEUR_ETEINT
-        for i in range(19, 26):
-            np[i] = COULEUR_ETEINT
-    np.write()
-    clignotement_detresse = not clignotement_detresse
-
-def gerer_bande_rouge(timer):
-    if etat_bande_rouge == 1:
-        for i in range(7, 19):
-            np[i] = COULEUR_ROUGE
-    else:
-        for i in range(7, 19):
-            np[i] = COULEUR_ETEINT
-    np.write()
+        # Si pas de connexion, remettre la puissance et la cadence à 0
+        puissance_pedale = 0
+        cadence_pedale = 0
 
 def allumer_phare():
     if phare_avant == 1:
@@ -367,173 +645,321 @@ def allumer_phare():
     else:
         pwm.duty_u16(0)
 
-# Nouvelle fonction pour gérer les tentatives de connexion BLE
+# Gestion des tentatives de connexion BLE (côté capteurs)
 def gerer_connexion_ble():
-    global last_ble_check, is_scanning, scan_start_time, ble_connected
-    
     current_time = time.ticks_ms()
     
-    # Vérifier si nous sommes connectés
-    if assioma_client.conn_handle is not None:
-        ble_connected = True
-        is_scanning = False
-        return True
-    else:
-        ble_connected = False
-    
-    # Si un scan est en cours, vérifier s'il a expiré
-    if is_scanning:
-        if time.ticks_diff(current_time, scan_start_time) > ble_scan_timeout:
-            # Le scan a duré trop longtemps, on l'arrête
-            assioma_client.stop_scan()
-            is_scanning = False
-            last_ble_check = current_time  # Réinitialiser le timer de contrôle
-    
-    # Si aucun scan n'est en cours et qu'il est temps de vérifier à nouveau
-    elif time.ticks_diff(current_time, last_ble_check) > ble_check_interval:
-        print("Démarrage d'un nouveau scan BLE")
-        assioma_client.stop_scan()  # S'assurer qu'aucun scan précédent n'est actif
-        time.sleep_ms(100)          # Court délai pour stabilisation
-        assioma_client.start_scan()
-        is_scanning = True
-        scan_start_time = current_time
-    
-    return False
-
-def mettre_a_jour_chronometre(timer):
+    # En roulant (pédalage récent ou roue qui tourne), le scan de secours
+    # utilise un faible rapport cyclique
+    en_route = (time.ticks_diff(current_time, last_pedal_activity) < 60000
+                or lu_consignes[CONSIGNE_VITESSE] > 0)
+    connectee = reconnexion_ble.mettre_a_jour(current_time, en_route)
+    # Un seul scan à la fois: la ceinture cardio ne cherche que pendant que la
+    # pédale est connectée, ou quand sa prochaine tentative est assez loin
+    if connectee or reconnexion_ble.attente_restante_ms(current_time) > reconnexion.DUREE_SCAN_MS:
+        reconnexion_cardio.mettre_a_jour(current_time, en_route)
+    return connectee
+
+def mettre_a_jour_chronometre(timer=None):
     global chrono_elapsed_time, chrono_start_time
     chrono_elapsed_time = time.time() - chrono_start_time
+    donnees.publier(CANAL_CHRONO, int(chrono_elapsed_time))
+
+# ----- Actions des boutons -----
+# Appelées par la tâche "boutons" (jamais depuis une IRQ), voir la table plus bas
+def clignotant_gauche():
+    global etat_bouton_gauche, etat_bouton_droit, clignotant_actif
+    if etat_bande_detresse:
+        return
+    if etat_bouton_gauche == 0:
+        etat_bouton_gauche = 1
+        etat_bouton_droit = 0  # Éteindre l'autre clignotant
+        lecteur_clignotant.jouer(anim_gauche)
+        tache_clignotant.demarrer()
+        clignotant_actif = True
+    else:
+        etat_bouton_gauche = 0
+        tache_clignotant.arreter()
+        lecteur_clignotant.arreter()
+        clignotant_actif = False
+    ecran_clignotant()
+
+def clignotant_droit():
+    global etat_bouton_gauche, etat_bouton_droit, clignotant_actif
+    if etat_bande_detresse:
+        return
+    if etat_bouton_droit == 0:
+        etat_bouton_droit = 1
+        etat_bouton_gauche = 0  # Éteindre l'autre clignotant
+        lecteur_clignotant.jouer(anim_droit)
+        tache_clignotant.demarrer()
+        clignotant_actif = True
+    else:
+        etat_bouton_droit = 0
+        tache_clignotant.arreter()
+        lecteur_clignotant.arreter()
+        clignotant_actif = False
+    ecran_clignotant()
+
+def afficher_page(page):
+    global numPage, cadre_affiche
+    numPage = page
+    cadre_affiche = -1
+    # Versions courantes vues: la tâche "ecran" ne redessinera que sur changement
+    abonnements_pages[page].a_change()
+    oled.fill(0)
+    ecran_clignotant()
+    ecran_page(numPage)
+
+def page_suivante():
+    afficher_page((numPage + 1) % NB_PAGES)
+
+def page_appui_long():
+    # Sur la page batterie vélo: batterie rechargée. Sur la page sortie: nouvelle
+    # sortie. Ailleurs: retour à la page 0.
+    global demandes_raz_energie
+    if numPage == 6:
+        # Le compteur appartient au côté capteurs: demande passée par l'instantané
+        demandes_raz_energie += 1
+    elif numPage == PAGE_METRIQUES:
+        metriques_puissance.raz()
+    else:
+        afficher_page(0)
 
-def gerer_boutons(bouton):
-    global etat_bouton_gauche, etat_bouton_droit, mode_clignotement
-    global indice_neo, etat_clignotement, timer1, etat_bande_rouge
-    global etat_bande_detresse, temps_dernier_appui_gauche, temps_dernier_appui_droit
-    global temps_dernier_appui_rouge, temps_dernier_appuie_detresse, temps_dernier_appui_page
-    global numPage, timer2, temps_dernier_appui_arriere, phare_arriere_allumer, phare_avant
-    global temps_dernier_appui_phare, clignotant_actif, temps_dernier_appui_chrono
+def feux_detresse():
+    global etat_bande_detresse, etat_bouton_gauche, etat_bouton_droit
+    global clignotant_actif
+    etat_bande_detresse = 1 - etat_bande_detresse
+    if etat_bande_detresse == 1:
+        lecteur_detresse.jouer(anim_detresse)
+        tache_detresse.demarrer()
+        etat_bouton_droit = 0
+        etat_bouton_gauche = 0
+        if clignotant_actif:
+            tache_clignotant.arreter()
+            lecteur_clignotant.arreter()
+            clignotant_actif = False
+    else:
+        tache_detresse.arreter()
+        lecteur_detresse.arreter()
+    ecran_clignotant()
+
+def phare_arriere():
+    global phare_arriere_allumer
+    phare_arriere_allumer = 1 - phare_arriere_allumer
+    Phare_arrière()
+    ecran_clignotant()
+
+def phare_suivant():
+    global phare_avant
+    if phare_avant < 3:
+        phare_avant += 1
+    else:
+        phare_avant = 0
+    allumer_phare()
+    ecran_clignotant()
+
+def phare_eteint():
+    global phare_avant
+    phare_avant = 0
+    allumer_phare()
+    ecran_clignotant()
+
+def chrono_marche_arret():
     global chrono_elapsed_time, chrono_start_time, etat_chrono
-    temps_actuel = time.ticks_ms()
-    # Clignotant Gauche
-    if bouton == bouton_gauche and etat_bande_detresse == 0:
-        if time.ticks_diff(temps_actuel, temps_dernier_appui_gauche) > delai_rebond:
-            temps_dernier_appui_gauche = temps_actuel
-            if etat_bouton_gauche == 0:
-                etat_bouton_gauche = 1
-                etat_bouton_droit = 0  # Éteindre l'autre clignotant
-                mode_clignotement = 0
-                indice_neo = INDICE_DEBUT_GAUCHE
-                etat_clignotement = True
-                timer1.init(freq=4, mode=Timer.PERIODIC, callback=clignoter)
-                clignotant_actif = True
-                
-            else:
-                etat_bouton_gauche = 0
-                etat_clignotement = False
-                timer1.deinit()
-                eteindre_led(INDICE_DEBUT_GAUCHE, INDICE_FIN_GAUCHE)
-                clignotant_actif = False
-            ecran_clignotant()
-            
-    # Clignotant Droit
-    elif bouton == bouton_droit and etat_bande_detresse == 0:
-        if time.ticks_diff(temps_actuel, temps_dernier_appui_droit) > delai_rebond:
-            temps_dernier_appui_droit = temps_actuel
-            if etat_bouton_droit == 0:
-                etat_bouton_droit = 1
-                etat_bouton_gauche = 0  # Éteindre l'autre clignotant
-                mode_clignotement = 1
-                indice_neo = INDICE_DEBUT_DROIT
-                etat_clignotement = True
-                timer1.init(freq=4, mode=Timer.PERIODIC, callback=clignoter)
-                clignotant_actif = True
-               
-            else:
-                etat_bouton_droit = 0
-                etat_clignotement = False
-                timer1.deinit()
-                eteindre_led(INDICE_FIN_DROIT, INDICE_DEBUT_DROIT)
-                clignotant_actif = False
-            ecran_clignotant()
-
-    elif bouton == bouton_page:
-        if time.ticks_diff(temps_actuel, temps_dernier_appui_page) > delai_rebond:
-            # Lecture des informations de pédale à chaque changement de page
-            if assioma_client.conn_handle is not None:
-                assioma_client.read_battery_level()
-                current_battery = assioma_client.get_battery_level()
-                
-            temps_dernier_appui_page = temps_actuel
-            numPage += 1
-            oled.fill(0)
-            ecran_clignotant()
-            if numPage == 6:
-                numPage = 0
-            ecran_page(numPage)
-
-    # Bande rouge
-    elif bouton == frein:
-        timer2.init(freq=6, mode=Timer.PERIODIC, callback=gerer_bande_rouge)
-        temps_dernier_appui_rouge = temps_actuel
-        etat_bande_rouge ^= 1
-        
-    # Feux de détresse
-    elif bouton == bouton_feux_detresse:
-        if time.ticks_diff(temps_actuel, temps_dernier_appuie_detresse) > delai_rebond:
-            temps_dernier_appuie_detresse = temps_actuel
-            etat_bande_detresse = 1 - etat_bande_detresse
-            if etat_bande_detresse == 1:
-                timer1.init(freq=5, mode=Timer.PERIODIC, callback=gerer_feux_detresse)
-                etat_bouton_droit = 0
-                etat_bouton_gauche = 0
-                if clignotant_actif:
-                    timer1.deinit()
-                    eteindre_led(INDICE_DEBUT_GAUCHE, INDICE_FIN_GAUCHE)
-                    eteindre_led(INDICE_FIN_DROIT, INDICE_DEBUT_DROIT)
-                    clignotant_actif = False
-            else:
-                etat_clignotement = False
-                gerer_feux_detresse(timer1)
-                timer1.deinit()
-            ecran_clignotant()
-            
-    elif bouton == bouton_arriere:
-        if time.ticks_diff(temps_actuel, temps_dernier_appui_arriere) > delai_rebond:
-            temps_dernier_appui_arriere = temps_actuel
-            phare_arriere_allumer = 1 - phare_arriere_allumer
-            Phare_arrière()
-            ecran_clignotant()
-
-    elif bouton == bouton_phare:
-        if time.ticks_diff(temps_actuel, temps_dernier_appui_phare) > delai_rebond:
-            temps_dernier_appui_phare = temps_actuel
-            if phare_avant < 3:
-                phare_avant += 1
-            else:
-                phare_avant = 0
-            allumer_phare()
-            ecran_clignotant()
-
-    elif bouton == bouton_chrono:
-        if time.ticks_diff(temps_actuel, temps_dernier_appui_chrono) > delai_rebond:
-            temps_dernier_appui_chrono = temps_actuel
-            etat_chrono = 1 - etat_chrono
-            if etat_chrono:
-                chrono_start_time = time.time()
-                chrono_elapsed_time = 0
-                timer4.init(freq=1, mode=Timer.PERIODIC, callback=mettre_a_jour_chronometre)
-            else:
-                timer4.deinit()
-
-# Configure les interruptions des boutons
-bouton_droit.irq(handler=lambda pin: gerer_boutons(pin), trigger=Pin.IRQ_FALLING)
-bouton_gauche.irq(handler=lambda pin: gerer_boutons(pin), trigger=Pin.IRQ_FALLING)
-frein.irq(handler=lambda pin: gerer_boutons(pin), trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING)
-bouton_feux_detresse.irq(handler=lambda pin: gerer_boutons(pin), trigger=Pin.IRQ_FALLING)
-bouton_page.irq(handler=lambda pin: gerer_boutons(pin), trigger=Pin.IRQ_FALLING)
-bouton_arriere.irq(handler=lambda pin: gerer_boutons(pin), trigger=Pin.IRQ_FALLING)
-bouton_reed.irq(handler=lambda pin: gerer_boutons(pin), trigger=Pin.IRQ_FALLING)
-bouton_phare.irq(handler=lambda pin: gerer_boutons(pin), trigger=Pin.IRQ_FALLING)
-bouton_chrono.irq(handler=lambda pin: gerer_boutons(pin), trigger=Pin.IRQ_FALLING)
+    etat_chrono = 1 - etat_chrono
+    if etat_chrono:
+        chrono_start_time = time.time() - chrono_elapsed_time
+        tache_chrono.demarrer()
+    else:
+        tache_chrono.arreter()
+
+def chrono_remise_a_zero():
+    global chrono_elapsed_time, chrono_start_time
+    chrono_start_time = time.time()
+    chrono_elapsed_time = 0
+    donnees.publier(CANAL_CHRONO, 0)
+
+def nourrir_watchdog():
+    # Côté capteurs bloqué (plus d'instantané neuf): on laisse le watchdog redémarrer
+    if time.ticks_diff(time.ticks_ms(), t_seq_capteurs) < DELAI_CAPTEURS_MS:
+        wdt.feed()
+
+def gerer_ble():
+    # Événements BLE restés en file (si micropython.schedule était saturé),
+    # ou toute la file en double cœur
+    assioma_client.traiter_evenements()
+    cardio_client.process_events()
+    gerer_connexion_ble()
+
+def publier_instantane():
+    """Côté capteurs: consignes du côté écran, puis nouvel instantané des mesures"""
+    global raz_energie_faites, energie_depart_mwh, distance_depart_m
+    gigue_capteurs.marquer(time.ticks_us())
+    if instantane_consignes.lire(lu_consignes) >= 0 and \
+            lu_consignes[CONSIGNE_RAZ_ENERGIE] != raz_energie_faites:
+        raz_energie_faites = lu_consignes[CONSIGNE_RAZ_ENERGIE]
+        compteur_energie.reinitialiser()
+        # Consommation de l'autonomie: repart de la recharge, pas du démarrage
+        energie_depart_mwh = compteur_energie.mwh()
+        distance_depart_m = lu_consignes[CONSIGNE_DISTANCE_M]
+
+    maintenant = time.ticks_ms()
+    etat = 0
+    if assioma_client.conn_handle is not None:
+        etat |= ETAT_PEDALE
+    if reconnexion_ble.en_scan():
+        etat |= ETAT_SCAN
+    cardio = 0
+    if cardio_client.conn_handle is not None:
+        etat |= ETAT_CARDIO
+        if cardio_client.heart_rate_ms is not None and \
+                time.ticks_diff(maintenant, cardio_client.heart_rate_ms) < CARDIO_PERIME_MS:
+            cardio = cardio_client.heart_rate
+
+    t = instantane_capteurs.a_ecrire()
+    t[CHAMP_PUISSANCE] = puissance_pedale
+    t[CHAMP_CADENCE] = cadence_pedale
+    t[CHAMP_CARDIO] = cardio
+    t[CHAMP_BATTERIE_PEDALE] = batterie_pedale
+    t[CHAMP_COURANT_MA] = courant_ma()
+    t[CHAMP_VITESSE_ROUE] = assioma_client.cadence.vitesse_roue
+    t[CHAMP_ETAT_BLE] = etat
+    t[CHAMP_RECO_MS] = reconnexion_ble.dernier_ms
+    t[CHAMP_NB_RECO] = reconnexion_ble.nb_reconnexions
+    t[CHAMP_ATTENTE_MS] = reconnexion_ble.attente_restante_ms(maintenant)
+    t[CHAMP_EVT_PERDUS] = assioma_client.evenements.perdus
+    t[CHAMP_EVT_MAX] = assioma_client.evenements.max_occupation
+    t[CHAMP_CHARGE_MAH] = compteur_energie.mah()
+    t[CHAMP_ENERGIE_MWH] = compteur_energie.mwh()
+    t[CHAMP_ETAT_CHARGE] = compteur_energie.etat_charge()
+    t[CHAMP_AUTONOMIE_KM] = compteur_energie.autonomie_km(lu_consignes[CONSIGNE_DISTANCE_M] - distance_depart_m,
+                                                          compteur_energie.mwh() - energie_depart_mwh)
+    t[CHAMP_GATT_EVITES] = assioma_client.batterie.lectures_evitees()
+    instantane_capteurs.publier()
+
+def lire_instantane():
+    """Côté écran: dernier instantané publié sur le bus, puis consignes vers le côté capteurs"""
+    global seq_capteurs, t_seq_capteurs
+    gigue_ecran.marquer(time.ticks_us())
+    seq = instantane_capteurs.lire(lu_capteurs)
+    if seq >= 0 and seq != seq_capteurs:
+        seq_capteurs = seq
+        t_seq_capteurs = time.ticks_ms()
+        # Le bus ne change de version que pour les valeurs qui ont bougé
+        donnees.publier(CANAL_PUISSANCE, lu_capteurs[CHAMP_PUISSANCE])
+        donnees.publier(CANAL_CADENCE, lu_capteurs[CHAMP_CADENCE])
+        donnees.publier(CANAL_CARDIO, lu_capteurs[CHAMP_CARDIO])
+        donnees.publier(CANAL_COURANT, lu_capteurs[CHAMP_COURANT_MA])
+        donnees.publier(CANAL_BATTERIE_PEDALE, lu_capteurs[CHAMP_BATTERIE_PEDALE])
+        donnees.publier(CANAL_ETAT_BLE, lu_capteurs[CHAMP_ETAT_BLE])
+        donnees.publier(CANAL_ATTENTE_BLE, lu_capteurs[CHAMP_ATTENTE_MS] // 1000)
+        donnees.publier(CANAL_RECO_BLE, lu_capteurs[CHAMP_RECO_MS] if lu_capteurs[CHAMP_NB_RECO] else 0)
+        donnees.publier(CANAL_EVT_PERDUS, lu_capteurs[CHAMP_EVT_PERDUS])
+        donnees.publier(CANAL_EVT_MAX, lu_capteurs[CHAMP_EVT_MAX])
+        donnees.publier(CANAL_CHARGE, lu_capteurs[CHAMP_CHARGE_MAH])
+        donnees.publier(CANAL_ENERGIE, lu_capteurs[CHAMP_ENERGIE_MWH])
+        donnees.publier(CANAL_ETAT_CHARGE, lu_capteurs[CHAMP_ETAT_CHARGE])
+        donnees.publier(CANAL_AUTONOMIE, lu_capteurs[CHAMP_AUTONOMIE_KM])
+    # Pas de capteur reed: vitesse de roue envoyée par le capteur de puissance
+    donnees.publier(CANAL_VITESSE, vitesse.vitesse_centi or lu_capteurs[CHAMP_VITESSE_ROUE])
+    distance = distance_m()
+    donnees.publier(CANAL_DISTANCE, distance)
+
+    c = instantane_consignes.a_ecrire()
+    c[CONSIGNE_VITESSE] = vitesse.vitesse_centi
+    c[CONSIGNE_DISTANCE_M] = distance
+    c[CONSIGNE_RAZ_ENERGIE] = demandes_raz_energie
+    instantane_consignes.publier()
+
+def calculer_metriques():
+    # Puissance électrique = courant x tension batterie, comme sur la page 1
+    electrique_w = abs(donnees.valeur(CANAL_COURANT)) * TENSION_BATTERIE // 1000
+    m = metriques_puissance
+    m.echantillonner(donnees.valeur(CANAL_PUISSANCE), electrique_w, time.ticks_ms())
+    donnees.publier(CANAL_PUISSANCE_3S, m.moyenne(3))
+    donnees.publier(CANAL_PUISSANCE_10S, m.moyenne(10))
+    donnees.publier(CANAL_PUISSANCE_30S, m.moyenne(30))
+    donnees.publier(CANAL_PUISSANCE_NORMALISEE, m.puissance_normalisee())
+    donnees.publier(CANAL_PUISSANCE_MAX, m.max_w)
+    donnees.publier(CANAL_TRAVAIL, m.travail_kj())
+    donnees.publier(CANAL_PART_HUMAINE_30S, m.part_humaine())
+    donnees.publier(CANAL_PART_HUMAINE, m.part_humaine_sortie())
+
+def echantillonner_historique():
+    historique_courbes.ajouter(COURBE_PUISSANCE, donnees.valeur(CANAL_PUISSANCE))
+    historique_courbes.ajouter(COURBE_CARDIO, donnees.valeur(CANAL_CARDIO))
+    historique_courbes.ajouter(COURBE_COURANT, abs(donnees.valeur(CANAL_COURANT)))
+    historique_courbes.avancer()
+    if numPage == PAGE_HISTORIQUE:
+        # Page visible: une colonne de plus, le reste du graphe défile
+        graphe_historique.defiler()
+        oled.show()
+
+def rafraichir_ecran():
+    # Rien de neuf sur les canaux de la page: ni redessin ni transfert I2C
+    if abonnements_pages[numPage].a_change():
+        ecran_page(numPage)
+
+def enregistrer_trajet():
+    global distance_trajet_mm, t_dernier_echantillon
+    # Uniquement en RAM: l'écriture flash est faite par la tâche "flash"
+    vitesse_centi = vitesse.vitesse_centi
+    if not vitesse_centi:
+        vitesse_centi = lu_capteurs[CHAMP_VITESSE_ROUE]
+        # Sans reed, distance estimée avec la vitesse du capteur de puissance
+        # (km/h x 100 -> mm/ms: / 360)
+        distance_trajet_mm += vitesse_centi * PERIODE_ENREGISTREMENT // 360
+    # Les enregistrements sont datés: rien de neuf, pas d'échantillon (sauf un
+    # de temps en temps pour que le trajet reste continu à l'arrêt)
+    maintenant = time.ticks_ms()
+    if not abonnement_journal.a_change() and \
+            time.ticks_diff(maintenant, t_dernier_echantillon) < SILENCE_MAX_JOURNAL_MS:
+        return
+    t_dernier_echantillon = maintenant
+    journal.echantillonner(donnees.valeur(CANAL_PUISSANCE), donnees.valeur(CANAL_CADENCE),
+                           donnees.valeur(CANAL_CARDIO), vitesse_centi,
+                           donnees.valeur(CANAL_COURANT), donnees.valeur(CANAL_CHRONO))
+
+def ecrire_trajet():
+    journal.vider()
+
+# ----- Tâches -----
+# Périodes en ms. Sous charge, seules les tâches PRIORITE_BASSE (écran) ralentissent.
+taches.ajouter("watchdog", nourrir_watchdog, 1000, ordonnanceur.PRIORITE_CRITIQUE)
+taches.ajouter("leds", compositeur.trame, PERIODE_TRAME_NEO, ordonnanceur.PRIORITE_CRITIQUE)
+taches.ajouter("frein", feu_stop.verifier, 100, ordonnanceur.PRIORITE_CRITIQUE)
+tache_clignotant = taches.ajouter("clignotant", lecteur_clignotant.avancer, 250, ordonnanceur.PRIORITE_HAUTE, actif=False)
+tache_detresse = taches.ajouter("detresse", lecteur_detresse.avancer, 200, ordonnanceur.PRIORITE_HAUTE, actif=False)
+taches.ajouter("instantane", lire_instantane, PERIODE_LECTURE, ordonnanceur.PRIORITE_HAUTE)
+# Côté capteurs: cœur 1 en double cœur, sinon les mêmes tâches sur l'ordonnanceur
+cote_capteurs.ajouter("ble", gerer_ble, PERIODE_BLE, ordonnanceur.PRIORITE_HAUTE)
+cote_capteurs.ajouter("publication", publier_instantane, PERIODE_PUBLICATION, ordonnanceur.PRIORITE_HAUTE)
+cote_capteurs.ajouter("pedale", pedale_info, 100, ordonnanceur.PRIORITE_NORMALE)
+cote_capteurs.ajouter("adc", echantillonner_courant, PERIODE_ECHANTILLON_ADC, ordonnanceur.PRIORITE_NORMALE)
+cote_capteurs.ajouter("energie", compteur_energie.sauver, 10000, ordonnanceur.PRIORITE_BASSE)
+taches.ajouter("vitesse", vitesse.mettre_a_jour, 250, ordonnanceur.PRIORITE_NORMALE)
+taches.ajouter("odometre", vitesse.sauver, 10000, ordonnanceur.PRIORITE_BASSE)
+tache_chrono = taches.ajouter("chrono", mettre_a_jour_chronometre, 1000, ordonnanceur.PRIORITE_NORMALE, actif=False)
+taches.ajouter("ecran", rafraichir_ecran, 100, ordonnanceur.PRIORITE_BASSE)
+taches.ajouter("trajet", enregistrer_trajet, PERIODE_ENREGISTREMENT, ordonnanceur.PRIORITE_NORMALE)
+taches.ajouter("historique", echantillonner_historique, 1000, ordonnanceur.PRIORITE_BASSE)
+taches.ajouter("metriques", calculer_metriques, 1000, ordonnanceur.PRIORITE_NORMALE)
+taches.ajouter("flash", ecrire_trajet, 5000, ordonnanceur.PRIORITE_BASSE)
+
+# ----- Table des boutons -----
+# L'IRQ de chaque broche ne fait que dater le front; la tâche "boutons" filtre
+# les rebonds et appelle l'action. Appui long / double: sans nouvelle broche.
+gestion_boutons = boutons.GestionnaireBoutons()
+gestion_boutons.ajouter(boutons.Bouton(bouton_gauche, clignotant_gauche))
+gestion_boutons.ajouter(boutons.Bouton(bouton_droit, clignotant_droit))
+gestion_boutons.ajouter(boutons.Bouton(bouton_feux_detresse, feux_detresse))
+gestion_boutons.ajouter(boutons.Bouton(bouton_page, page_suivante, action_longue=page_appui_long))
+gestion_boutons.ajouter(boutons.Bouton(bouton_arriere, phare_arriere))
+gestion_boutons.ajouter(boutons.Bouton(bouton_phare, phare_suivant, action_double=phare_eteint))
+gestion_boutons.ajouter(boutons.Bouton(bouton_chrono, chrono_marche_arret,
+                                       action_longue=chrono_remise_a_zero))
+taches.ajouter("boutons", gestion_boutons.traiter, 10, ordonnanceur.PRIORITE_HAUTE)
 
 
 # Initialisation de l'écran
@@ -542,24 +968,9 @@ ecran_clignotant()
 ecran_page(numPage)
 
 wdt = WDT(timeout=8000)
-# Démarrer le scan BLE dès le départ
-assioma_client.start_scan()
-is_scanning = True
-scan_start_time = time.ticks_ms()
-
-# Configuration du timer pour la mise à jour périodique des données de la pédale
-timer3.init(freq=10, mode=Timer.PERIODIC, callback=pedale_info)  # Mise à jour toutes les 5 secondes
+# Le scan BLE démarre au premier passage de la tâche "ble"
 
-# Configuration du timer pour la mise à jour périodique de la tension
-timer5.init(freq=0.5, mode=Timer.PERIODIC, callback=mise_a_jour_tension)  # Mise à jour toutes les 0.5 secondes
-
-# ----- Boucle principale -----a
-while True:
-    # Gestion de la connexion BLE
-    gerer_connexion_ble()
-    
-    # Mise à jour de l'écran
-    ecran_page(numPage)
-    
-    wdt.feed()
-    time.sleep_ms(100)  # Un petit délai pour éviter de surcharger le processeur
\ No newline at end of file
+# ----- Boucle principale -----
+if DOUBLE_COEUR:
+    coeur1.lancer()
+taches.lancer()
\ No newline at end of file
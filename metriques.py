@@ -0,0 +1,135 @@
+import time
+from array import array
+
+try:
+    from micropython import const
+except ImportError:
+    # Exécution sur l'hôte (bancs d'essai sous CPython)
+    def const(x):
+        return x
+
+_PUISSANCE_MAX_W = const(2000)      # Bornage: (W² >> 7)² reste un petit entier
+_DECALAGE_CARRE = const(7)
+_ECART_MAX_MS = const(5000)         # Au-delà, trou dans les mesures: pas de travail compté
+
+
+def _racine(n):
+    """Racine carrée entière (Newton), sans flottant"""
+    if n < 2:
+        return n
+    x = n
+    y = (x + 1) // 2
+    while y < x:
+        x = y
+        y = (x + n // x) // 2
+    return x
+
+
+class MetriquesPuissance:
+    """
+    Métriques de puissance glissantes, un échantillon par seconde.
+
+    Les dernières secondes de puissance humaine (pédale) et électrique
+    (moteur, courant ACS712 x tension) sont gardées dans des array('h')
+    circulaires de la taille de la plus longue fenêtre; chaque fenêtre de
+    `fenetres` (en s, croissantes) a sa somme courante, mise à jour en O(1)
+    par échantillon (la valeur qui entre moins celle qui sort).
+
+    Puissance normalisée: moyenne sur la sortie de la puissance moyenne de
+    la plus longue fenêtre (30 s) à la puissance 4, puis racine quatrième.
+    La moyenne est tenue en entiers avec son reste, comme le compteur
+    d'énergie: mémoire fixe et aucun grand entier, même après des heures.
+    """
+
+    def __init__(self, fenetres=(3, 10, 30)):
+        self.fenetres = fenetres
+        self.capacite = fenetres[-1]
+        self._humaine = array('h', [0] * self.capacite)
+        self._electrique = array('h', [0] * self.capacite)
+        self._sommes = array('i', [0] * len(fenetres))
+        self.raz()
+
+    def raz(self):
+        """Nouvelle sortie: tout repart de zéro"""
+        for k in range(self.capacite):
+            self._humaine[k] = 0
+            self._electrique[k] = 0
+        for k in range(len(self.fenetres)):
+            self._sommes[k] = 0
+        self._somme_electrique = 0      # Sur la plus longue fenêtre
+        self._tete = 0
+        self.nb = 0                     # Échantillons reçus
+        self.max_w = 0
+        self._moyenne_4 = 0             # Moyenne de ((p30² >> 7)²)...
+        self._reste_4 = 0               # ...et son reste, < _nb_4
+        self._nb_4 = 0
+        self.joules_humains = 0
+        self.joules_electriques = 0
+        self._reste_mj_humains = 0
+        self._reste_mj_electriques = 0
+        self._dernier_ms = None
+
+    def echantillonner(self, puissance_w, electrique_w, maintenant):
+        """Ajoute l'échantillon pris à `maintenant` (ticks_ms)"""
+        puissance_w = min(max(puissance_w, 0), _PUISSANCE_MAX_W)
+        electrique_w = min(max(electrique_w, 0), 32767)
+
+        # Fenêtres glissantes: l'emplacement à écrire contient le plus ancien
+        tete = self._tete
+        capacite = self.capacite
+        humaine = self._humaine
+        for k in range(len(self.fenetres)):
+            self._sommes[k] += puissance_w - humaine[(tete - self.fenetres[k]) % capacite]
+        self._somme_electrique += electrique_w - self._electrique[tete]
+        humaine[tete] = puissance_w
+        self._electrique[tete] = electrique_w
+        self._tete = (tete + 1) % capacite
+        self.nb += 1
+        if puissance_w > self.max_w:
+            self.max_w = puissance_w
+
+        # Puissance normalisée, dès que la fenêtre de 30 s est pleine
+        if self.nb >= capacite:
+            p = self._sommes[-1] // capacite
+            carre = (p * p + (1 << (_DECALAGE_CARRE - 1))) >> _DECALAGE_CARRE
+            self._nb_4 += 1
+            d, self._reste_4 = divmod(self._reste_4 + carre * carre - self._moyenne_4, self._nb_4)
+            self._moyenne_4 += d
+
+        # Travail: puissance x intervalle réel entre deux échantillons
+        precedent = self._dernier_ms
+        self._dernier_ms = maintenant
+        if precedent is None:
+            return
+        dt = time.ticks_diff(maintenant, precedent)
+        if dt <= 0 or dt > _ECART_MAX_MS:
+            return
+        j, self._reste_mj_humains = divmod(puissance_w * dt + self._reste_mj_humains, 1000)
+        self.joules_humains += j
+        j, self._reste_mj_electriques = divmod(electrique_w * dt + self._reste_mj_electriques, 1000)
+        self.joules_electriques += j
+
+    def moyenne(self, duree_s):
+        """Puissance moyenne (W) sur une des `fenetres`"""
+        k = self.fenetres.index(duree_s)
+        n = min(self.nb, duree_s)
+        return self._sommes[k] // n if n else 0
+
+    def puissance_normalisee(self):
+        # p⁴ = ((p² >> 7)²) << 14, donc p = racine(racine(moyenne) << 7)
+        return _racine(_racine(self._moyenne_4) << _DECALAGE_CARRE)
+
+    def travail_kj(self):
+        return self.joules_humains // 1000
+
+    def part_humaine(self):
+        """Part humaine (%) de la puissance totale sur la plus longue fenêtre"""
+        total = self._sommes[-1] + self._somme_electrique
+        return self._sommes[-1] * 100 // total if total else 0
+
+    def part_humaine_sortie(self):
+        """Part humaine (%) du travail total depuis le début de la sortie"""
+        total = self.joules_humains + self.joules_electriques
+        if total < 100:
+            return 0
+        return min(100, self.joules_humains // (total // 100))
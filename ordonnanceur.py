@@ -0,0 +1,149 @@
+import time
+from micropython import const
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+# Priorités: plus le nombre est petit, plus la tâche est importante
+PRIORITE_CRITIQUE = const(0)   # Watchdog, feux: jamais ralenties
+PRIORITE_HAUTE = const(1)      # BLE, clignotants
+PRIORITE_NORMALE = const(2)    # Capteurs
+PRIORITE_BASSE = const(3)      # Écran: première à être ralentie sous charge
+
+_FACTEUR_MAX = const(8)        # Ralentissement maximal d'une tâche dégradable
+_PERIODE_SUPERVISION = const(1000)
+
+
+async def _dormir(ms):
+    if hasattr(asyncio, "sleep_ms"):
+        await asyncio.sleep_ms(ms)
+    else:
+        await asyncio.sleep(ms / 1000)
+
+
+class Tache:
+    """Sous-système exécuté périodiquement par l'ordonnanceur"""
+
+    def __init__(self, nom, fonction, periode_ms, priorite, actif=True):
+        self.nom = nom
+        self.fonction = fonction
+        self.periode_ms = periode_ms
+        self.priorite = priorite
+        self.actif = actif
+        self.facteur = 1          # Multiplicateur de période quand la tâche est dégradée
+        self._relance = False
+
+        # Statistiques
+        self.nb_executions = 0
+        self.nb_depassements = 0
+        self.duree_max_us = 0
+        self.retard_max_ms = 0
+        self._duree_totale_us = 0
+
+    def demarrer(self):
+        """Active la tâche; elle s'exécute au prochain passage de l'ordonnanceur"""
+        self.actif = True
+        self._relance = True
+
+    def arreter(self):
+        """Désactive la tâche (elle reste planifiée mais ne fait rien)"""
+        self.actif = False
+
+    def duree_moyenne_us(self):
+        if not self.nb_executions:
+            return 0
+        return self._duree_totale_us // self.nb_executions
+
+
+class Ordonnanceur:
+    """
+    Ordonnanceur coopératif basé sur uasyncio.
+
+    Chaque tâche a une période et une priorité. À chaque exécution, on mesure
+    le retard au démarrage et la durée; une tâche qui démarre avec plus de
+    `tolerance_ms` de retard ou qui dure plus que sa période compte un
+    dépassement. Si des tâches plus prioritaires que PRIORITE_BASSE ont
+    dépassé pendant la dernière seconde, les tâches de PRIORITE_BASSE voient
+    leur période doubler (jusqu'à x8); elles reviennent progressivement à
+    leur période nominale quand la charge disparaît.
+    """
+
+    def __init__(self, tolerance_ms=10):
+        self.tolerance_ms = tolerance_ms
+        self.taches = []
+        self._depassements_prioritaires = 0
+
+    def ajouter(self, nom, fonction, periode_ms, priorite, actif=True):
+        """Déclare une tâche; renvoie l'objet Tache pour la démarrer/arrêter"""
+        tache = Tache(nom, fonction, periode_ms, priorite, actif)
+        self.taches.append(tache)
+        return tache
+
+    async def _boucle(self, tache):
+        echeance = time.ticks_ms()
+        while True:
+            if tache._relance:
+                tache._relance = False
+                echeance = time.ticks_ms()
+
+            if tache.actif:
+                retard = time.ticks_diff(time.ticks_ms(), echeance)
+                debut = time.ticks_us()
+                try:
+                    tache.fonction()
+                except Exception as e:
+                    print(f"Erreur tâche {tache.nom}: {e}")
+                duree = time.ticks_diff(time.ticks_us(), debut)
+
+                tache.nb_executions += 1
+                tache._duree_totale_us += duree
+                if duree > tache.duree_max_us:
+                    tache.duree_max_us = duree
+                if retard > tache.retard_max_ms:
+                    tache.retard_max_ms = retard
+                if retard > self.tolerance_ms or duree > tache.periode_ms * 1000:
+                    tache.nb_depassements += 1
+                    if tache.priorite < PRIORITE_BASSE:
+                        self._depassements_prioritaires += 1
+
+            echeance = time.ticks_add(echeance, tache.periode_ms * tache.facteur)
+            attente = time.ticks_diff(echeance, time.ticks_ms())
+            if attente < 0:
+                # En retard: on repart de maintenant plutôt que de rattraper
+                echeance = time.ticks_ms()
+                attente = 0
+            await _dormir(attente)
+
+    async def _superviser(self):
+        """Ralentit les tâches de basse priorité quand les autres prennent du retard"""
+        while True:
+            await _dormir(_PERIODE_SUPERVISION)
+            charge = self._depassements_prioritaires > 0
+            self._depassements_prioritaires = 0
+            for tache in self.taches:
+                if tache.priorite < PRIORITE_BASSE:
+                    continue
+                if charge:
+                    if tache.facteur < _FACTEUR_MAX:
+                        tache.facteur *= 2
+                elif tache.facteur > 1:
+                    tache.facteur //= 2
+
+    async def _principal(self):
+        # Les tâches les plus prioritaires sont créées (donc réveillées) en premier
+        for tache in sorted(self.taches, key=lambda t: t.priorite):
+            asyncio.create_task(self._boucle(tache))
+        await self._superviser()
+
+    def lancer(self):
+        """Démarre la boucle d'événements (ne rend pas la main)"""
+        asyncio.run(self._principal())
+
+    def rapport(self):
+        """Affiche les statistiques de chaque tâche"""
+        for tache in self.taches:
+            print(f"{tache.nom}: {tache.nb_executions} exec, moy {tache.duree_moyenne_us()} us, "
+                  f"max {tache.duree_max_us} us, retard max {tache.retard_max_ms} ms, "
+                  f"{tache.nb_depassements} dépassements, x{tache.facteur}")
@@ -0,0 +1,174 @@
+import time
+import random
+from micropython import const
+
+# États du moteur de reconnexion
+ETAT_CONNECTE = const(0)
+ETAT_DIRECT = const(1)      # gap_connect direct vers l'adresse connue
+ETAT_SCAN = const(2)        # Scan de secours
+ETAT_ATTENTE = const(3)     # Attente (backoff) avant la tentative suivante
+
+# Connexion directe: courte, la pédale est normalement juste à côté
+DUREE_DIRECTE_MS = const(1500)
+DUREE_SCAN_MS = const(5000)
+# Connexion lancée depuis un résultat de scan: abandonnée passé ce délai
+DELAI_CONNEXION_MS = const(3000)
+
+# Paramètres de scan (µs). À l'arrêt: cycle plein pour retrouver vite.
+# En roulant: ~10 % du temps radio pour laisser la place aux notifications.
+SCAN_INTERVALLE_PLEIN = const(30000)
+SCAN_FENETRE_PLEIN = const(30000)
+SCAN_INTERVALLE_ROUTE = const(320000)
+SCAN_FENETRE_ROUTE = const(30000)
+
+BACKOFF_INITIAL_MS = const(250)
+BACKOFF_MAX_MS = const(30000)
+
+
+class GestionnaireReconnexion:
+    """
+    Rétablit la liaison avec un pair BLE dont l'adresse est connue.
+
+    Après une perte de liaison, on tente d'abord une connexion directe
+    (gap_connect) vers l'adresse connue, puis un scan si elle échoue. Entre
+    deux cycles, l'attente croît exponentiellement (avec une part aléatoire
+    pour ne pas se synchroniser sur l'annonce du pair) et repart de zéro dès
+    que la liaison est rétablie. Le scan utilise un faible rapport cyclique
+    quand le vélo roule. Une connexion lancée par le client sur un résultat
+    de scan a elle aussi une échéance: passé DELAI_CONNEXION_MS, elle est
+    annulée et le cycle reprend avec backoff. Le temps de reconnexion est
+    mesuré à chaque retour.
+
+    Le client doit fournir: conn_handle, peer_addr_type, scan_started,
+    connexion_en_cours(), connecter(), annuler_connexion(), start_scan() et
+    stop_scan().
+    """
+
+    def __init__(self, client, adresse):
+        self.client = client
+        self.adresse = adresse
+        # Premier passage: scan immédiat (le type d'adresse n'est pas encore connu)
+        self.etat = ETAT_ATTENTE
+        self.tentative = 0
+        self._echeance = time.ticks_ms()
+        self._debut_scan_initial = True
+        self._t_perte = time.ticks_ms()
+        self._connexion_vue = False     # Connexion du client en cours pendant le scan
+
+        # Statistiques de temps de reconnexion (ms)
+        self.nb_reconnexions = 0
+        self.nb_directes = 0
+        self.nb_connexions_expirees = 0
+        self.dernier_ms = 0
+        self.min_ms = 0
+        self.max_ms = 0
+        self._total_ms = 0
+
+    def moyenne_ms(self):
+        if not self.nb_reconnexions:
+            return 0
+        return self._total_ms // self.nb_reconnexions
+
+    def en_scan(self):
+        return self.etat == ETAT_SCAN
+
+    def attente_restante_ms(self, maintenant):
+        """Temps avant la prochaine tentative (0 si une tentative est en cours)"""
+        if self.etat != ETAT_ATTENTE:
+            return 0
+        return max(0, time.ticks_diff(self._echeance, maintenant))
+
+    def _backoff(self):
+        attente = BACKOFF_INITIAL_MS << min(self.tentative, 7)
+        if attente > BACKOFF_MAX_MS:
+            attente = BACKOFF_MAX_MS
+        # Gigue: jusqu'à +50 %
+        return attente + random.getrandbits(16) % (attente // 2 + 1)
+
+    def _tenter_direct(self, maintenant):
+        if self.client.peer_addr_type is None:
+            # Type d'adresse inconnu tant qu'on n'a jamais vu le pair: scan
+            return False
+        if not self.client.connecter(self.client.peer_addr_type, self.adresse, DUREE_DIRECTE_MS):
+            return False
+        self.etat = ETAT_DIRECT
+        # Marge pour recevoir l'événement de fin de tentative
+        self._echeance = time.ticks_add(maintenant, DUREE_DIRECTE_MS + 500)
+        return True
+
+    def _lancer_scan(self, maintenant, en_route):
+        self.client.stop_scan()
+        if en_route:
+            self.client.start_scan(DUREE_SCAN_MS, SCAN_INTERVALLE_ROUTE, SCAN_FENETRE_ROUTE)
+        else:
+            self.client.start_scan(DUREE_SCAN_MS, SCAN_INTERVALLE_PLEIN, SCAN_FENETRE_PLEIN)
+        self.etat = ETAT_SCAN
+        self._connexion_vue = False
+        self._echeance = time.ticks_add(maintenant, DUREE_SCAN_MS)
+
+    def _attendre(self, maintenant):
+        self.etat = ETAT_ATTENTE
+        self._echeance = time.ticks_add(maintenant, self._backoff())
+        self.tentative += 1
+
+    def mettre_a_jour(self, maintenant, en_route=False):
+        """À appeler périodiquement; renvoie True si la liaison est établie"""
+        client = self.client
+
+        if client.conn_handle is not None:
+            if self.etat != ETAT_CONNECTE:
+                duree = time.ticks_diff(maintenant, self._t_perte)
+                if not self._debut_scan_initial:
+                    self.nb_reconnexions += 1
+                    if self.etat == ETAT_DIRECT:
+                        self.nb_directes += 1
+                    self.dernier_ms = duree
+                    self._total_ms += duree
+                    if duree > self.max_ms:
+                        self.max_ms = duree
+                    if self.min_ms == 0 or duree < self.min_ms:
+                        self.min_ms = duree
+                    print(f"Reconnexion BLE en {duree} ms")
+                self._debut_scan_initial = False
+                self.etat = ETAT_CONNECTE
+                self.tentative = 0
+            return True
+
+        if self.etat == ETAT_CONNECTE:
+            # Liaison perdue: connexion directe immédiate
+            self._t_perte = maintenant
+            self.tentative = 0
+            if not self._tenter_direct(maintenant):
+                self._lancer_scan(maintenant, en_route)
+
+        elif self.etat == ETAT_DIRECT:
+            if not client.connexion_en_cours():
+                # Tentative directe terminée sans liaison
+                self._lancer_scan(maintenant, en_route)
+            elif time.ticks_diff(maintenant, self._echeance) >= 0:
+                client.annuler_connexion()
+                self._lancer_scan(maintenant, en_route)
+
+        elif self.etat == ETAT_SCAN:
+            if client.connexion_en_cours():
+                # Le pair a été vu: la connexion est en cours, avec sa propre échéance
+                if not self._connexion_vue:
+                    self._connexion_vue = True
+                    self._echeance = time.ticks_add(maintenant, DELAI_CONNEXION_MS)
+                elif time.ticks_diff(maintenant, self._echeance) >= 0:
+                    # Tentative perdue: on l'annule (gap_connect(None)) et on repart
+                    print("Connexion BLE sans réponse, abandon")
+                    client.annuler_connexion()
+                    self.nb_connexions_expirees += 1
+                    self._attendre(maintenant)
+                return False
+            if time.ticks_diff(maintenant, self._echeance) >= 0 or not client.scan_started:
+                client.stop_scan()
+                self._attendre(maintenant)
+
+        elif self.etat == ETAT_ATTENTE:
+            if time.ticks_diff(maintenant, self._echeance) >= 0:
+                if not self._tenter_direct(maintenant):
+                    self._lancer_scan(maintenant, en_route)
+
+        return False
@@ -0,0 +1,88 @@
+# Simulation sur l'hôte (CPython) du firmware MicroPython du vélo.
+#
+# Les modules propres à la carte (machine, bluetooth, neopixel, ssd1306,
+# framebuf, micropython, ubinascii, uasyncio) sont remplacés par des
+# équivalents pilotés par une horloge virtuelle déterministe, et time reçoit
+# ticks_ms/ticks_us/sleep_ms. main.py, assioma.py et heartrate.py tournent
+# sans modification. Depuis la racine du dépôt:
+#     python -m simulateur --duree 120
+import importlib
+import os
+import sys
+import time
+
+from simulateur.horloge import horloge, FinSimulation, ResetWatchdog  # noqa: F401
+
+_MODULES = ("micropython", "ubinascii", "framebuf", "machine", "neopixel",
+            "ssd1306", "bluetooth", "uasyncio")
+
+_originaux_time = {}
+
+
+def _installer_time():
+    remplacements = {
+        "ticks_ms": horloge.ticks_ms,
+        "ticks_us": horloge.ticks_us,
+        "ticks_cpu": horloge.ticks_us,
+        "ticks_add": horloge.ticks_add,
+        "ticks_diff": horloge.ticks_diff,
+        "sleep_ms": lambda ms: horloge.dormir_us(int(ms) * 1000),
+        "sleep_us": lambda us: horloge.dormir_us(int(us)),
+        "sleep": lambda s: horloge.dormir_us(int(s * 1000000)),
+        "time": lambda: 1700000000 + horloge.secondes(),
+    }
+    for nom, fonction in remplacements.items():
+        if nom not in _originaux_time:
+            _originaux_time[nom] = getattr(time, nom, None)
+        setattr(time, nom, fonction)
+
+
+def installer(decalage_ms=0, facteur_cpu=0):
+    """
+    Remplace les modules de la carte et remet la simulation à zéro.
+
+    decalage_ms: valeur initiale de ticks_ms (proche de 2^30 pour tester
+    le passage à zéro des compteurs); facteur_cpu: voir Horloge.
+    """
+    horloge.reinitialiser(decalage_ms, facteur_cpu)
+    for nom in _MODULES:
+        module = importlib.import_module("simulateur." + nom)
+        sys.modules[nom] = module
+        if hasattr(module, "reinitialiser"):
+            module.reinitialiser()
+    _installer_time()
+
+
+def desinstaller():
+    """Rend à CPython ses modules et son module time"""
+    for nom in _MODULES:
+        sys.modules.pop(nom, None)
+    for nom, fonction in _originaux_time.items():
+        if fonction is None:
+            delattr(time, nom)
+        else:
+            setattr(time, nom, fonction)
+    _originaux_time.clear()
+
+
+def executer_script(chemin, duree_s):
+    """
+    Exécute un script du firmware (main.py, heartrate.py) pendant duree_s
+    secondes virtuelles. Renvoie l'espace de noms du script, même s'il ne
+    s'est pas terminé (cas normal: la boucle principale ne rend pas la main).
+    """
+    chemin = os.path.abspath(chemin)
+    repertoire = os.path.dirname(chemin)
+    if repertoire not in sys.path:
+        sys.path.insert(0, repertoire)
+    horloge.limite_us = horloge.us + int(duree_s * 1000000)
+    espace = {"__name__": "__main__", "__file__": chemin}
+    with open(chemin) as f:
+        code = compile(f.read(), chemin, "exec")
+    try:
+        exec(code, espace)
+        # Script terminé avant la limite: on laisse vivre les événements restants
+        horloge.executer()
+    except FinSimulation as e:
+        espace["__fin__"] = e
+    return espace
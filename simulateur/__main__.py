@@ -0,0 +1,143 @@
+# Lance un script du firmware sur l'hôte avec le banc simulé du vélo.
+#   python -m simulateur --duree 120
+#   python -m simulateur --script heartrate.py --duree 30
+#   python -m simulateur --coupure 20:10 --appui 8@5 --appui 2@12
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import simulateur
+from simulateur.horloge import horloge, ResetWatchdog
+
+_RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _rapport(espace, pedale, cardio, ecran, duree_reelle):
+    from simulateur import bluetooth, machine, neopixel, micropython
+
+    print("\n===== Rapport de simulation =====")
+    print(f"Temps simulé: {horloge.us / 1e6:.1f} s en {duree_reelle:.1f} s réelles, "
+          f"{horloge.nb_evenements} événements, {horloge.nb_exceptions} exceptions")
+    fin = espace.get("__fin__")
+    if isinstance(fin, ResetWatchdog):
+        print(f"RESET WATCHDOG: {fin}")
+
+    wdt = machine.WDT.actif
+    if wdt is not None:
+        print(f"Watchdog: {wdt.nb_nourri} fois, écart max {wdt.ecart_max_ms} ms / {wdt.timeout_ms} ms")
+
+    ble = bluetooth.BLE()
+    evenements = ", ".join(f"{code}:{n}" for code, n in sorted(ble.nb_irq.items()))
+    print(f"BLE: {ble.nb_connexions} connexions, IRQ par code {{{evenements}}}")
+    for pair in (pedale, cardio):
+        print(f"  {pair.nom}: {pair.nb_annonces} annonces, {pair.nb_notifications} notifications, "
+              f"{pair.nb_notifications_perdues} perdues (non abonné ou hors portée)")
+    print(f"micropython.schedule: {micropython.nb_schedule} appels, {micropython.nb_schedule_refuses} refusés")
+
+    for ruban in neopixel.NeoPixel.instances:
+        print(f"NeoPixel: {ruban.nb_ecritures} trames, écart max {ruban.ecart_max_us // 1000} ms")
+    feu = espace.get("feu_stop")
+    if feu is not None:
+        print(f"Feu stop: {feu.nb_fronts} fronts, {feu.nb_ecritures_irq} écritures depuis l'IRQ, "
+              f"latence max {feu.latence_max_us} us, {feu.nb_rattrapages} rattrapages")
+
+    client = espace.get("assioma_client")
+    if client is not None and hasattr(client, "batterie"):
+        b = client.batterie
+        print(f"Batterie pédale: {b.niveau_pct}%, {b.nb_demandes} demandes, {b.nb_lectures} lectures GATT, "
+              f"{b.nb_notifications} notifications, {b.lectures_evitees()} lectures évitées, "
+              f"{'abonné' if b.abonne else f'validité {b.ttl_ms // 1000} s'}")
+
+    instantane = espace.get("instantane_capteurs")
+    if instantane is not None:
+        capteurs = espace["gigue_capteurs"]
+        ecran_ = espace["gigue_ecran"]
+        print(f"Instantané: {instantane.nb_publications} publications, {instantane.nb_relectures} relectures, "
+              f"gigue capteurs max {capteurs.max_us} us (moy {capteurs.moyenne_us()}), "
+              f"écran max {ecran_.max_us} us (moy {ecran_.moyenne_us()}), "
+              f"dernier: {espace['donnees'].valeur(espace['CANAL_PUISSANCE'])} W, "
+              f"{espace['donnees'].valeur(espace['CANAL_CARDIO'])} bpm")
+    donnees = espace.get("donnees")
+    if donnees is not None:
+        reveils = ", ".join(str(a.nb_reveils) for a in espace["abonnements_pages"])
+        print(f"Bus: {donnees.nb_publications} publications, {donnees.nb_changements} changements, "
+              f"réveils par page [{reveils}], journal {espace['abonnement_journal'].nb_reveils}")
+
+    oled = espace.get("oled")
+    if oled is not None:
+        identique = bytes(ecran.gram) == bytes(oled.buffer)
+        print(f"Écran: {ecran.octets_donnees} octets de données, RAM écran "
+              f"{'identique au' if identique else 'DIFFÉRENTE du'} framebuffer")
+
+    taches = espace.get("taches")
+    if taches is not None and hasattr(taches, "rapport"):
+        print("Tâches:")
+        taches.rapport()
+
+
+def principal():
+    parser = argparse.ArgumentParser(description="Simulation du firmware sur l'hôte")
+    parser.add_argument("--script", default=os.path.join(_RACINE, "main.py"))
+    parser.add_argument("--duree", type=float, default=60, help="secondes simulées")
+    parser.add_argument("--courant", type=float, default=1.5, help="courant moteur (A)")
+    parser.add_argument("--coupure", action="append", default=[],
+                        help="DEBUT:DUREE en s, la pédale sort de portée")
+    parser.add_argument("--vitesse", type=float, default=0,
+                        help="vitesse de la roue (km/h) vue par le capteur reed")
+    parser.add_argument("--appui", action="append", default=[],
+                        help="BROCHE@INSTANT_S, appui bref sur un bouton")
+    parser.add_argument("--decalage-ms", type=int, default=0,
+                        help="valeur initiale de ticks_ms (ex: 1073000000 pour le retour à zéro)")
+    parser.add_argument("--facteur-cpu", type=float, default=0,
+                        help="temps réel d'exécution x facteur ajouté au temps simulé")
+    parser.add_argument("--flash", default=None, help="répertoire servant de flash (temporaire sinon)")
+    parser.add_argument("--trace", action="store_true", help="affiche le journal des événements")
+    parser.add_argument("--enregistrer-trace", default=None,
+                        help="fichier .jsonl ou binaire recevant les IRQ BLE (voir bench.trace_ble)")
+    args = parser.parse_args()
+
+    simulateur.installer(args.decalage_ms, args.facteur_cpu)
+    from simulateur import scenario
+
+    if args.trace:
+        horloge.journal = []
+    pedale, cardio, ecran = scenario.velo(args.courant)
+    if args.enregistrer_trace:
+        from simulateur import bluetooth
+        bluetooth.BLE().trace = []
+        trace = os.path.abspath(args.enregistrer_trace)
+    for coupure in args.coupure:
+        debut, duree = coupure.split(":")
+        pedale.hors_portee(int(float(debut) * 1000), int(float(duree) * 1000))
+    if args.vitesse:
+        scenario.roue(args.vitesse)
+    for appui in args.appui:
+        broche, instant = appui.split("@")
+        scenario.appuyer(int(broche), int(float(instant) * 1000))
+
+    flash = args.flash or tempfile.mkdtemp(prefix="flash_")
+    script = os.path.abspath(args.script)
+    os.chdir(flash)
+    print(f"Flash simulée: {flash}")
+
+    debut = time.perf_counter()
+    espace = simulateur.executer_script(script, args.duree)
+    duree_reelle = time.perf_counter() - debut
+
+    if args.enregistrer_trace:
+        sys.path.insert(0, _RACINE)
+        from bench import trace_ble
+        trace_ble.ecrire(trace, bluetooth.BLE().trace)
+        print(f"Trace BLE: {len(bluetooth.BLE().trace)} événements dans {trace}")
+
+    if horloge.journal is not None:
+        for t_us, source, texte in horloge.journal:
+            print(f"{t_us / 1000:10.1f} ms  {source:8} {texte}")
+    _rapport(espace, pedale, cardio, ecran, duree_reelle)
+    simulateur.desinstaller()
+
+
+if __name__ == "__main__":
+    principal()
@@ -0,0 +1,409 @@
+# Module `bluetooth` de substitution: rôle central et radio simulée
+import random
+
+from simulateur.horloge import horloge
+from simulateur.pairs import FLAG_NOTIFY, FLAG_INDICATE, FLAG_WRITE, FLAG_WRITE_NO_RESPONSE  # noqa: F401
+from simulateur.pairs import FLAG_READ  # noqa: F401
+
+FLAG_BROADCAST = 0x0001
+
+_IRQ_SCAN_RESULT = 5
+_IRQ_SCAN_DONE = 6
+_IRQ_PERIPHERAL_CONNECT = 7
+_IRQ_PERIPHERAL_DISCONNECT = 8
+_IRQ_GATTC_SERVICE_RESULT = 9
+_IRQ_GATTC_SERVICE_DONE = 10
+_IRQ_GATTC_CHARACTERISTIC_RESULT = 11
+_IRQ_GATTC_CHARACTERISTIC_DONE = 12
+_IRQ_GATTC_DESCRIPTOR_RESULT = 13
+_IRQ_GATTC_DESCRIPTOR_DONE = 14
+_IRQ_GATTC_READ_RESULT = 15
+_IRQ_GATTC_READ_DONE = 16
+_IRQ_GATTC_WRITE_DONE = 17
+_IRQ_GATTC_NOTIFY = 18
+
+_EALREADY = 114
+_ENOTCONN = 107
+_EBUSY = 16
+
+_CONN_INVALIDE = 0xFFFF
+_PREMIER_HANDLE = 64            # BTstack (Pico W) numérote les liaisons à partir de 0x40
+_ADV_IND = 0
+
+_UUID_CCCD = 0x2902
+_UUID_BROUILLE = b"\xee\xee"     # UUID réutilisé, après l'appel du handler
+
+
+class UUID:
+    def __init__(self, valeur):
+        if isinstance(valeur, UUID):
+            self._octets = valeur._octets
+        elif isinstance(valeur, int):
+            if not 0 <= valeur <= 0xFFFF:
+                raise ValueError("invalid UUID")
+            self._octets = valeur.to_bytes(2, "little")
+        elif isinstance(valeur, str):
+            chiffres = valeur.replace("-", "")
+            if len(chiffres) != 32:
+                raise ValueError("invalid UUID")
+            self._octets = bytes.fromhex(chiffres)[::-1]
+        else:
+            octets = bytes(valeur)
+            if len(octets) not in (2, 4, 16):
+                raise ValueError("invalid UUID")
+            self._octets = octets
+
+    def __eq__(self, autre):
+        return isinstance(autre, UUID) and self._octets == autre._octets
+
+    def __hash__(self):
+        return hash(self._octets)
+
+    def __bytes__(self):
+        return self._octets
+
+    def __repr__(self):
+        if len(self._octets) == 2:
+            return f"UUID(0x{int.from_bytes(self._octets, 'little'):04x})"
+        h = self._octets[::-1].hex()
+        return f"UUID('{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}')"
+
+
+class BLE:
+    """
+    Radio BLE simulée (rôle central uniquement), singleton comme sur la carte:
+    tous les appels à BLE() renvoient le même objet, et un seul handler
+    d'IRQ est actif à la fois.
+
+    Les annonces des pairs ne sont reçues que pendant la fenêtre de scan;
+    les réponses GATT et les notifications arrivent au prochain événement de
+    connexion (intervalle de connexion fixe). Une seule opération GATT peut
+    être en cours par liaison. Les adresses et données passées au handler
+    sont des memoryview sur des tampons réutilisés, et l'UUID d'un résultat
+    de découverte est un objet unique réutilisé, comme sur la carte; tous
+    sont brouillés après l'appel: un client qui les garde au lieu de les
+    copier lit des données fausses.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            instance = super().__new__(cls)
+            instance._initialiser()
+            cls._instance = instance
+        return cls._instance
+
+    def _initialiser(self):
+        self._actif = False
+        self._handler = None
+        self.pairs = []
+        self.intervalle_connexion_us = 30000
+        self.supervision_us = 2000000
+        self._hasard = random.Random(1)
+
+        self._scan = False
+        self._scan_generation = 0
+        self._scan_debut = 0
+        self._scan_intervalle = 1
+        self._scan_fenetre = 1
+
+        self._connexion_attendue = None   # (adresse, generation)
+        self._connexion_generation = 0
+        self._prochain_handle = _PREMIER_HANDLE
+        self.connexions = {}              # handle -> [pair, début_us]
+        self._operation = set()           # Handles avec une opération GATT en cours
+
+        self._tampon_adresse = bytearray(6)
+        self._tampon_donnees = bytearray(256)
+        self._uuid = UUID(_UUID_BROUILLE)
+
+        # Liste de (t_us, code, arguments) si l'enregistrement de trace est actif
+        self.trace = None
+
+        # Statistiques
+        self.nb_irq = {}
+        self.nb_connexions = 0
+
+    # ----- Configuration -----
+    def active(self, etat=None):
+        if etat is None:
+            return self._actif
+        self._actif = bool(etat)
+        return self._actif
+
+    def config(self, *args, **kwargs):
+        if args and args[0] == "mac":
+            return (0, b"\x28\xcd\xc1\x00\x00\x01")
+        if args:
+            return None
+
+    def irq(self, handler):
+        self._handler = handler
+
+    def gap_advertise(self, *args, **kwargs):
+        pass
+
+    # ----- Livraison des événements -----
+    def _livrer(self, evenement, donnees):
+        if not self._actif or self._handler is None:
+            return
+        self.nb_irq[evenement] = self.nb_irq.get(evenement, 0) + 1
+        horloge.tracer("ble", f"irq {evenement}")
+        if self.trace is not None:
+            self.trace.append((horloge.us, evenement,
+                               tuple(bytes(a) if isinstance(a, memoryview) else
+                                     UUID(a) if isinstance(a, UUID) else a for a in donnees)))
+        try:
+            self._handler(evenement, donnees)
+        finally:
+            # Les tampons ne sont valides que pendant l'appel
+            for i in range(len(self._tampon_adresse)):
+                self._tampon_adresse[i] = 0xEE
+            for i in range(len(self._tampon_donnees)):
+                self._tampon_donnees[i] = 0xEE
+            self._uuid._octets = _UUID_BROUILLE
+
+    def _adresse(self, adresse):
+        self._tampon_adresse[:] = adresse
+        return memoryview(self._tampon_adresse)
+
+    def _donnees(self, octets):
+        n = len(octets)
+        self._tampon_donnees[:n] = octets
+        return memoryview(self._tampon_donnees)[:n]
+
+    def _uuid_irq(self, uuid):
+        self._uuid._octets = bytes(uuid)
+        return self._uuid
+
+    def _plus_tard(self, delai_us, evenement, fabrique):
+        """Livre l'événement plus tard; fabrique() construit le tuple au moment de la livraison"""
+        horloge.dans(delai_us, lambda: self._livrer(evenement, fabrique()))
+
+    def _prochain_evenement_connexion(self, handle):
+        debut = self.connexions[handle][1]
+        ci = self.intervalle_connexion_us
+        ecoule = horloge.us - debut
+        return (ecoule // ci + 1) * ci - ecoule
+
+    # ----- Pairs simulés -----
+    def ajouter_pair(self, pair):
+        pair.radio = self
+        self.pairs.append(pair)
+        phase = 3000 + 7000 * (len(self.pairs) - 1)
+        horloge.dans(phase, lambda: self._annonce(pair))
+
+    def _annonce(self, pair):
+        # Délai aléatoire de 0 à 10 ms ajouté par la couche liaison à chaque annonce
+        horloge.dans(pair.intervalle_annonce_us + self._hasard.randrange(10000),
+                     lambda: self._annonce(pair))
+        if not pair.a_portee or pair.connexion is not None:
+            return
+        pair.nb_annonces += 1
+
+        attendue = self._connexion_attendue
+        if attendue is not None and attendue[0] == pair.adresse and self._actif:
+            self._etablir(pair)
+            return
+
+        if self._scan and (horloge.us - self._scan_debut) % self._scan_intervalle < self._scan_fenetre:
+            self._livrer(_IRQ_SCAN_RESULT, (pair.type_adresse, self._adresse(pair.adresse),
+                                            _ADV_IND, pair.rssi, self._donnees(pair.annonce)))
+
+    def _etablir(self, pair):
+        self._connexion_attendue = None
+        handle = self._prochain_handle
+        self._prochain_handle += 1
+        self.connexions[handle] = [pair, horloge.us]
+        pair.connexion = handle
+        pair.abonnements.clear()
+        self.nb_connexions += 1
+        self._plus_tard(1250, _IRQ_PERIPHERAL_CONNECT,
+                        lambda: (handle, pair.type_adresse, self._adresse(pair.adresse)))
+
+    def _rompre(self, handle, delai_us):
+        pair = self.connexions.pop(handle)[0]
+        pair.connexion = None
+        pair.abonnements.clear()
+        self._operation.discard(handle)
+        self._plus_tard(delai_us, _IRQ_PERIPHERAL_DISCONNECT,
+                        lambda: (handle, pair.type_adresse, self._adresse(pair.adresse)))
+
+    def hors_portee(self, pair):
+        """Le pair ne répond plus: la liaison tombe après le délai de supervision"""
+        handle = pair.connexion
+        if handle is None:
+            return
+
+        def verifier():
+            if not pair.a_portee and pair.connexion == handle:
+                self._rompre(handle, 0)
+
+        horloge.dans(self.supervision_us, verifier)
+
+    def notification(self, pair, car):
+        handle = pair.connexion
+        if not pair.a_portee:
+            pair.nb_notifications_perdues += 1
+            return
+        valeur = car.valeur
+        self._plus_tard(self._prochain_evenement_connexion(handle), _IRQ_GATTC_NOTIFY,
+                        lambda: (handle, car.h_valeur, self._donnees(valeur)))
+
+    # ----- GAP -----
+    def gap_scan(self, duree_ms, interval_us=1280000, window_us=11250, active=False):
+        if duree_ms is None:
+            if self._scan:
+                self._scan = False
+                self._scan_generation += 1
+                self._plus_tard(0, _IRQ_SCAN_DONE, lambda: ())
+            return
+        self._scan = True
+        self._scan_generation += 1
+        self._scan_debut = horloge.us
+        self._scan_intervalle = max(1, interval_us)
+        self._scan_fenetre = min(window_us, self._scan_intervalle)
+        if duree_ms > 0:
+            generation = self._scan_generation
+
+            def fin():
+                if self._scan and self._scan_generation == generation:
+                    self._scan = False
+                    self._livrer(_IRQ_SCAN_DONE, ())
+
+            horloge.dans(duree_ms * 1000, fin)
+
+    def gap_connect(self, addr_type, addr=None, scan_duration_ms=2000, *args):
+        if addr_type is None:
+            # Annulation de la tentative en cours
+            self._connexion_attendue = None
+            return
+        if self._connexion_attendue is not None:
+            raise OSError(_EALREADY)
+        if self._scan:
+            raise OSError(_EBUSY)
+        self._connexion_generation += 1
+        generation = self._connexion_generation
+        adresse = bytes(addr)
+        self._connexion_attendue = (adresse, generation)
+
+        def expiration():
+            attendue = self._connexion_attendue
+            if attendue is not None and attendue[1] == generation:
+                self._connexion_attendue = None
+                self._livrer(_IRQ_PERIPHERAL_DISCONNECT,
+                             (_CONN_INVALIDE, addr_type, self._adresse(adresse)))
+
+        horloge.dans(scan_duration_ms * 1000, expiration)
+
+    def gap_disconnect(self, conn_handle):
+        if conn_handle not in self.connexions:
+            return False
+        self._rompre(conn_handle, self.intervalle_connexion_us)
+        return True
+
+    # ----- Client GATT -----
+    def _debuter_operation(self, conn_handle):
+        if conn_handle not in self.connexions:
+            raise OSError(_ENOTCONN)
+        if conn_handle in self._operation:
+            raise OSError(_EALREADY)
+        self._operation.add(conn_handle)
+        return self.connexions[conn_handle][0]
+
+    def _terminer(self, conn_handle, evenements):
+        """Livre une suite d'événements au prochain événement de connexion"""
+        delai = self._prochain_evenement_connexion(conn_handle)
+
+        def livrer():
+            if conn_handle not in self.connexions:
+                return
+            self._operation.discard(conn_handle)
+            for evenement, fabrique in evenements:
+                self._livrer(evenement, fabrique())
+
+        horloge.dans(delai, livrer)
+
+    def gattc_discover_services(self, conn_handle, uuid=None):
+        pair = self._debuter_operation(conn_handle)
+        evenements = []
+        for s in pair.services:
+            if uuid is None or s.uuid == uuid:
+                evenements.append((_IRQ_GATTC_SERVICE_RESULT,
+                                   lambda s=s: (conn_handle, s.debut, s.fin, self._uuid_irq(s.uuid))))
+        evenements.append((_IRQ_GATTC_SERVICE_DONE, lambda: (conn_handle, 0)))
+        self._terminer(conn_handle, evenements)
+
+    def gattc_discover_characteristics(self, conn_handle, start_handle, end_handle, uuid=None):
+        pair = self._debuter_operation(conn_handle)
+        evenements = []
+        for s in pair.services:
+            for c in s.caracteristiques:
+                if start_handle <= c.h_definition <= end_handle and (uuid is None or c.uuid == uuid):
+                    evenements.append((_IRQ_GATTC_CHARACTERISTIC_RESULT,
+                                       lambda c=c: (conn_handle, c.h_definition, c.h_valeur,
+                                                    c.proprietes, self._uuid_irq(c.uuid))))
+        evenements.append((_IRQ_GATTC_CHARACTERISTIC_DONE, lambda: (conn_handle, 0)))
+        self._terminer(conn_handle, evenements)
+
+    def gattc_discover_descriptors(self, conn_handle, start_handle, end_handle):
+        pair = self._debuter_operation(conn_handle)
+        evenements = []
+        for s in pair.services:
+            for c in s.caracteristiques:
+                if c.h_cccd and start_handle <= c.h_cccd <= end_handle:
+                    evenements.append((_IRQ_GATTC_DESCRIPTOR_RESULT,
+                                       lambda c=c: (conn_handle, c.h_cccd, self._uuid_irq(UUID(_UUID_CCCD)))))
+        evenements.append((_IRQ_GATTC_DESCRIPTOR_DONE, lambda: (conn_handle, 0)))
+        self._terminer(conn_handle, evenements)
+
+    def gattc_read(self, conn_handle, value_handle):
+        pair = self._debuter_operation(conn_handle)
+        car = pair.par_handle(value_handle)
+        if car is None or car.h_valeur != value_handle or not car.proprietes & FLAG_READ:
+            self._terminer(conn_handle, [(_IRQ_GATTC_READ_DONE, lambda: (conn_handle, value_handle, 1))])
+            return
+        valeur = car.valeur
+        self._terminer(conn_handle, [
+            (_IRQ_GATTC_READ_RESULT, lambda: (conn_handle, value_handle, self._donnees(valeur))),
+            (_IRQ_GATTC_READ_DONE, lambda: (conn_handle, value_handle, 0)),
+        ])
+
+    def gattc_write(self, conn_handle, value_handle, data, mode=0):
+        if mode == 0:
+            if conn_handle not in self.connexions:
+                raise OSError(_ENOTCONN)
+            pair = self.connexions[conn_handle][0]
+        else:
+            pair = self._debuter_operation(conn_handle)
+        donnees = bytes(data)
+        car = pair.par_handle(value_handle)
+        statut = 0
+        if car is None:
+            statut = 1      # Handle invalide
+        elif value_handle == car.h_cccd:
+            if len(donnees) >= 1 and donnees[0] & 0x03:
+                pair.abonnements.add(car.h_valeur)
+            else:
+                pair.abonnements.discard(car.h_valeur)
+        elif car.proprietes & (FLAG_WRITE | FLAG_WRITE_NO_RESPONSE):
+            car.valeur = donnees
+            if car.sur_ecriture is not None:
+                car.sur_ecriture(pair, donnees)
+        else:
+            statut = 3      # Écriture non permise
+        if mode != 0:
+            self._terminer(conn_handle, [(_IRQ_GATTC_WRITE_DONE, lambda: (conn_handle, value_handle, statut))])
+
+    def gattc_exchange_mtu(self, conn_handle):
+        pass
+
+
+def ajouter_pair(pair):
+    """Ajoute un périphérique simulé à portée de la radio"""
+    BLE().ajouter_pair(pair)
+
+
+def reinitialiser():
+    BLE._instance = None
@@ -0,0 +1,166 @@
+# Module `framebuf` de substitution (formats monochromes) pour la simulation
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+RGB565 = 1
+GS2_HMSB = 5
+GS4_HMSB = 2
+GS8 = 6
+
+
+def _motif(caractere):
+    """Motif 8x8 déterministe d'un caractère (la police réelle n'est pas embarquée).
+
+    Chaque caractère donne des colonnes différentes, ce qui suffit pour
+    simuler les octets envoyés à l'écran; le texte lui-même est relevé
+    dans FrameBuffer.textes."""
+    code = ord(caractere)
+    if caractere == " ":
+        return (0,) * 8
+    return tuple(((code * (k + 3) * 37) >> 2) & 0x7F for k in range(7)) + (0,)
+
+
+class FrameBuffer:
+    """
+    Version Python du FrameBuffer C de MicroPython.
+
+    Comme en C, les primitives n'appellent jamais d'autres méthodes
+    publiques: une sous-classe qui surcharge pixel() ou hline() ne voit
+    donc pas ses surcharges appelées par fill_rect() ou text().
+    """
+
+    def __init__(self, buffer, width, height, format, stride=None):
+        self._buf = buffer
+        self._w = width
+        self._h = height
+        self._format = format
+        self._stride = stride if stride is not None else width
+        self.textes = []
+
+    # ----- Accès aux pixels -----
+    def _lire(self, x, y):
+        if self._format == MONO_VLSB:
+            return (self._buf[(y >> 3) * self._stride + x] >> (y & 7)) & 1
+        if self._format == MONO_HLSB:
+            octet = self._buf[(y * self._stride + x) >> 3]
+            return (octet >> (7 - (x & 7))) & 1
+        if self._format == MONO_HMSB:
+            octet = self._buf[(y * self._stride + x) >> 3]
+            return (octet >> (x & 7)) & 1
+        raise ValueError("format non simulé")
+
+    def _ecrire(self, x, y, c):
+        if self._format == MONO_VLSB:
+            i = (y >> 3) * self._stride + x
+            masque = 1 << (y & 7)
+        elif self._format == MONO_HLSB:
+            i = (y * self._stride + x) >> 3
+            masque = 0x80 >> (x & 7)
+        elif self._format == MONO_HMSB:
+            i = (y * self._stride + x) >> 3
+            masque = 1 << (x & 7)
+        else:
+            raise ValueError("format non simulé")
+        if c:
+            self._buf[i] |= masque
+        else:
+            self._buf[i] &= ~masque & 0xFF
+
+    def _rect_plein(self, x, y, w, h, c):
+        x0 = max(0, x)
+        y0 = max(0, y)
+        x1 = min(self._w, x + w)
+        y1 = min(self._h, y + h)
+        for yy in range(y0, y1):
+            for xx in range(x0, x1):
+                self._ecrire(xx, yy, c)
+
+    # ----- API framebuf -----
+    def fill(self, c):
+        if self._format == MONO_VLSB and self._stride == self._w:
+            octet = 0xFF if c else 0
+            for i in range(len(self._buf)):
+                self._buf[i] = octet
+        else:
+            self._rect_plein(0, 0, self._w, self._h, c)
+        if not c:
+            self.textes = []
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self._w and 0 <= y < self._h):
+            return None
+        if c is None:
+            return self._lire(x, y)
+        self._ecrire(x, y, c)
+
+    def fill_rect(self, x, y, w, h, c):
+        self._rect_plein(x, y, w, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self._rect_plein(x, y, w, h, c)
+            return
+        self._rect_plein(x, y, w, 1, c)
+        self._rect_plein(x, y + h - 1, w, 1, c)
+        self._rect_plein(x, y, 1, h, c)
+        self._rect_plein(x + w - 1, y, 1, h, c)
+
+    def hline(self, x, y, w, c):
+        self._rect_plein(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self._rect_plein(x, y, 1, h, c)
+
+    def line(self, x0, y0, x1, y1, c):
+        dx = abs(x1 - x0)
+        dy = -abs(y1 - y0)
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        erreur = dx + dy
+        while True:
+            if 0 <= x0 < self._w and 0 <= y0 < self._h:
+                self._ecrire(x0, y0, c)
+            if x0 == x1 and y0 == y1:
+                break
+            e2 = 2 * erreur
+            if e2 >= dy:
+                erreur += dy
+                x0 += sx
+            if e2 <= dx:
+                erreur += dx
+                y0 += sy
+
+    def text(self, s, x, y, c=1):
+        self.textes.append((s, x, y))
+        for n, caractere in enumerate(s):
+            for k, colonne in enumerate(_motif(caractere)):
+                xx = x + 8 * n + k
+                if not 0 <= xx < self._w:
+                    continue
+                for bit in range(8):
+                    if colonne >> bit & 1 and 0 <= y + bit < self._h:
+                        self._ecrire(xx, y + bit, c)
+
+    def scroll(self, dx, dy):
+        copie = [[self._lire(x, y) for x in range(self._w)] for y in range(self._h)]
+        for y in range(self._h):
+            for x in range(self._w):
+                xs = x - dx
+                ys = y - dy
+                if 0 <= xs < self._w and 0 <= ys < self._h:
+                    self._ecrire(x, y, copie[ys][xs])
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        for ys in range(fbuf._h):
+            yy = y + ys
+            if not 0 <= yy < self._h:
+                continue
+            for xs in range(fbuf._w):
+                xx = x + xs
+                if not 0 <= xx < self._w:
+                    continue
+                c = fbuf._lire(xs, ys)
+                if palette is not None:
+                    c = palette._lire(c, 0)
+                if c != key:
+                    self._ecrire(xx, yy, c)
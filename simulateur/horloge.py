@@ -0,0 +1,168 @@
+import heapq
+import time as _time_hote
+import traceback
+
+# Les compteurs ticks_ms/ticks_us de MicroPython reviennent à zéro après 2^30
+_PERIODE_TICKS = 1 << 30
+_MASQUE_TICKS = _PERIODE_TICKS - 1
+_DEMI_PERIODE = _PERIODE_TICKS // 2
+
+
+class FinSimulation(BaseException):
+    """Levée quand la durée simulée est atteinte (hérite de BaseException
+    pour traverser les `except Exception` du code embarqué)"""
+
+
+class ResetWatchdog(FinSimulation):
+    """Le watchdog n'a pas été nourri à temps: la carte aurait redémarré"""
+
+
+class Horloge:
+    """
+    Horloge virtuelle déterministe et file d'événements de la simulation.
+
+    Le temps n'avance que lorsqu'on passe à l'événement suivant: le code
+    embarqué s'exécute en un temps virtuel nul (sauf si `facteur_cpu` est
+    non nul: le temps réel de chaque exécution, multiplié par ce facteur,
+    est alors ajouté au temps virtuel). Deux sortes d'événements:
+      - les interruptions (BLE, broches, timers, micropython.schedule), qui
+        peuvent s'exécuter pendant un time.sleep_ms() bloquant;
+      - les reprises de tâches uasyncio, exécutées seulement par la boucle.
+    Parmi les interruptions, les événements `materiel` (fronts sur les
+    broches) interrompent aussi le temps passé dans un appel bloquant ou
+    dans le calcul (occuper_us): leurs IRQ hard s'y exécutent comme sur la
+    carte, les IRQ soft restent planifiées après.
+    À instant égal, les événements s'exécutent dans leur ordre de création.
+    """
+
+    def __init__(self, decalage_ms=0, facteur_cpu=0):
+        self.us = 0
+        self.limite_us = None
+        self.decalage_ms = decalage_ms
+        self.facteur_cpu = facteur_cpu
+        self._file = []
+        self._sequence = 0
+        self.journal = None   # Liste de (t_us, source, texte) si la trace est active
+
+        # Statistiques
+        self.nb_evenements = 0
+        self.nb_exceptions = 0
+
+    def reinitialiser(self, decalage_ms=0, facteur_cpu=0):
+        """Repart de t=0 avec une file vide (les modules gardent la même instance)"""
+        self.__init__(decalage_ms, facteur_cpu)
+
+    # ----- Temps au format MicroPython -----
+    def ticks_ms(self):
+        return (self.us // 1000 + self.decalage_ms) & _MASQUE_TICKS
+
+    def ticks_us(self):
+        return (self.us + self.decalage_ms * 1000) & _MASQUE_TICKS
+
+    @staticmethod
+    def ticks_add(ticks, delta):
+        return (ticks + delta) & _MASQUE_TICKS
+
+    @staticmethod
+    def ticks_diff(fin, debut):
+        return ((fin - debut + _DEMI_PERIODE) & _MASQUE_TICKS) - _DEMI_PERIODE
+
+    def secondes(self):
+        return self.us // 1000000
+
+    # ----- File d'événements -----
+    def planifier(self, instant_us, fonction, tache=False, materiel=False):
+        """Exécute fonction() à l'instant donné (jamais dans le passé)"""
+        if instant_us < self.us:
+            instant_us = self.us
+        self._sequence += 1
+        heapq.heappush(self._file, (instant_us, self._sequence, tache, fonction, materiel))
+
+    def dans(self, delai_us, fonction, tache=False, materiel=False):
+        self.planifier(self.us + delai_us, fonction, tache, materiel)
+
+    def tracer(self, source, texte):
+        if self.journal is not None:
+            self.journal.append((self.us, source, texte))
+
+    def _appeler(self, fonction):
+        self.nb_evenements += 1
+        debut = _time_hote.perf_counter()
+        try:
+            fonction()
+        except FinSimulation:
+            raise
+        except Exception:
+            # Comme sur la carte: l'exception est affichée, le système continue
+            self.nb_exceptions += 1
+            traceback.print_exc()
+        if self.facteur_cpu:
+            self.occuper_us(int((_time_hote.perf_counter() - debut) * 1e6 * self.facteur_cpu))
+
+    def _verifier_limite(self, instant_us):
+        if self.limite_us is not None and instant_us > self.limite_us:
+            self.us = max(self.us, self.limite_us)
+            raise FinSimulation()
+
+    def executer(self, arret=None):
+        """Boucle principale: exécute les événements jusqu'à la limite (ou arret())"""
+        while self._file:
+            if arret is not None and arret():
+                return
+            instant, _, _, fonction, _ = heapq.heappop(self._file)
+            self._verifier_limite(instant)
+            if instant > self.us:
+                self.us = instant
+            self._appeler(fonction)
+        self._verifier_limite(self.limite_us if self.limite_us is not None else self.us)
+
+    def dormir_us(self, duree_us):
+        """time.sleep bloquant: seules les interruptions avancent pendant l'attente"""
+        cible = self.us + max(0, duree_us)
+        reportes = []
+        try:
+            while self._file and self._file[0][0] <= cible:
+                entree = heapq.heappop(self._file)
+                if entree[2]:
+                    reportes.append(entree)
+                    continue
+                self._verifier_limite(entree[0])
+                if entree[0] > self.us:
+                    self.us = entree[0]
+                self._appeler(entree[3])
+            self._verifier_limite(cible)
+            if cible > self.us:
+                self.us = cible
+        finally:
+            for entree in reportes:
+                heapq.heappush(self._file, entree)
+
+
+    def occuper_us(self, duree_us):
+        """
+        Temps passé par le processeur (calcul, transfert I2C ou NeoPixel):
+        seuls les événements matériels l'interrompent, et le temps qu'ils
+        prennent le prolonge d'autant.
+        """
+        cible = self.us + max(0, duree_us)
+        reportes = []
+        try:
+            while self._file and self._file[0][0] <= cible:
+                entree = heapq.heappop(self._file)
+                if not entree[4]:
+                    reportes.append(entree)
+                    continue
+                self._verifier_limite(entree[0])
+                if entree[0] > self.us:
+                    self.us = entree[0]
+                avant = self.us
+                self._appeler(entree[3])
+                cible += self.us - avant
+            if cible > self.us:
+                self.us = cible
+        finally:
+            for entree in reportes:
+                heapq.heappush(self._file, entree)
+
+
+horloge = Horloge()
@@ -0,0 +1,302 @@
+# Module `machine` de substitution (rp2) pour la simulation sur l'hôte
+from simulateur.horloge import horloge, ResetWatchdog
+import simulateur.micropython as _micropython
+
+
+def freq(*args):
+    return 125000000
+
+
+def unique_id():
+    return b"\xe6\x61\x38\x10\x43\x2b\x5c\x2f"
+
+
+def reset():
+    raise ResetWatchdog()
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(etat=0):
+    pass
+
+
+def idle():
+    pass
+
+
+class _EtatBroche:
+    __slots__ = ("niveau", "mode", "pull", "handler", "trigger", "hard", "nb_irq")
+
+    def __init__(self):
+        self.niveau = 0
+        self.mode = -1
+        self.pull = -1
+        self.handler = None
+        self.trigger = 0
+        self.hard = False
+        self.nb_irq = 0
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    # État partagé par toutes les instances d'une même broche
+    broches = {}
+
+    def __init__(self, id, mode=-1, pull=-1, value=None, **kwargs):
+        self.id = id
+        etat = Pin.broches.get(id)
+        if etat is None:
+            etat = Pin.broches[id] = _EtatBroche()
+        self._etat = etat
+        self.init(mode, pull, value)
+
+    def init(self, mode=-1, pull=-1, value=None, **kwargs):
+        etat = self._etat
+        if mode != -1:
+            etat.mode = mode
+        if pull != -1:
+            etat.pull = pull
+            if etat.mode == Pin.IN:
+                etat.niveau = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            etat.niveau = 1 if value else 0
+
+    def value(self, v=None):
+        if v is None:
+            return self._etat.niveau
+        self._etat.niveau = 1 if v else 0
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def low(self):
+        self.value(0)
+
+    def high(self):
+        self.value(1)
+
+    def toggle(self):
+        self.value(not self._etat.niveau)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._etat.handler = handler
+        self._etat.trigger = trigger
+        self._etat.hard = hard
+
+    # Sur le RP2040, Pin(n) renvoie toujours le même objet: les handlers
+    # comparent la broche reçue aux broches globales
+    def __eq__(self, autre):
+        return isinstance(autre, Pin) and autre.id == self.id
+
+    def __hash__(self):
+        return self.id
+
+    def __repr__(self):
+        return f"Pin(GPIO{self.id})"
+
+
+def forcer_broche(id, niveau):
+    """Pilotage externe d'une broche (bouton, capteur): déclenche son IRQ sur front"""
+    etat = Pin.broches.get(id)
+    if etat is None:
+        etat = Pin.broches[id] = _EtatBroche()
+    niveau = 1 if niveau else 0
+    if niveau == etat.niveau:
+        return
+    etat.niveau = niveau
+    front = Pin.IRQ_RISING if niveau else Pin.IRQ_FALLING
+    horloge.tracer("pin", f"GPIO{id}={niveau}")
+    if etat.handler is not None and etat.trigger & front:
+        etat.nb_irq += 1
+        broche = Pin(id)
+        if etat.hard:
+            etat.handler(broche)
+        else:
+            # IRQ logicielle: le handler passe par micropython.schedule
+            _micropython.schedule(etat.handler, broche)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.id = id
+        self._generation = 0
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None, tick_hz=1000):
+        self._generation += 1
+        if freq > 0:
+            periode_us = int(1000000 / freq)
+        else:
+            periode_us = int(period * 1000000 / tick_hz)
+        generation = self._generation
+
+        def tic():
+            if generation != self._generation:
+                return
+            if mode == Timer.PERIODIC:
+                horloge.dans(periode_us, tic)
+            if callback is not None:
+                callback(self)
+
+        horloge.dans(periode_us, tic)
+
+    def deinit(self):
+        self._generation += 1
+
+
+class I2C:
+    # Périphériques présents sur le bus, par adresse (ex: écran simulé en 0x3C)
+    peripheriques = {}
+    # Si vrai, chaque transaction bloque le temps de son transfert sur le bus
+    modeliser_duree = False
+
+    def __init__(self, id=0, scl=None, sda=None, freq=400000, timeout=50000):
+        self.id = id
+        self.freq = freq
+        self.octets_ecrits = 0
+        self.nb_transactions = 0
+
+    def scan(self):
+        return sorted(I2C.peripheriques)
+
+    def _peripherique(self, addr):
+        peripherique = I2C.peripheriques.get(addr)
+        if peripherique is None:
+            raise OSError(5)  # EIO: pas d'acquittement
+        return peripherique
+
+    def _occuper_bus(self, octets):
+        # Adresse + données, 9 bits par octet (avec l'acquittement)
+        if I2C.modeliser_duree:
+            horloge.occuper_us((octets + 1) * 9 * 1000000 // self.freq)
+
+    def writeto(self, addr, buf, stop=True):
+        self._peripherique(addr).recevoir(bytes(buf))
+        self.octets_ecrits += len(buf) + 1
+        self.nb_transactions += 1
+        self._occuper_bus(len(buf))
+        return 1
+
+    def writevto(self, addr, vecteurs, stop=True):
+        donnees = b"".join(bytes(v) for v in vecteurs)
+        self._peripherique(addr).recevoir(donnees)
+        self.octets_ecrits += len(donnees) + 1
+        self.nb_transactions += 1
+        self._occuper_bus(len(donnees))
+        return len(vecteurs)
+
+    def readfrom(self, addr, n, stop=True):
+        self._peripherique(addr)
+        return bytes(n)
+
+    def readfrom_mem(self, addr, registre, n, addrsize=8):
+        self._peripherique(addr)
+        return bytes(n)
+
+    def writeto_mem(self, addr, registre, buf, addrsize=8):
+        self.writeto(addr, bytes((registre,)) + bytes(buf))
+
+
+class PWM:
+    def __init__(self, pin, freq=0, duty_u16=0, **kwargs):
+        self.pin = pin
+        self._freq = freq
+        self._duty = duty_u16
+
+    def freq(self, valeur=None):
+        if valeur is None:
+            return self._freq
+        self._freq = valeur
+
+    def duty_u16(self, valeur=None):
+        if valeur is None:
+            return self._duty
+        self._duty = valeur
+
+    def deinit(self):
+        self._duty = 0
+
+
+class ADC:
+    CORE_TEMP = 4
+
+    # Valeur brute 16 bits de chaque canal: entier ou fonction(t_us) -> entier
+    valeurs = {}
+
+    def __init__(self, pin):
+        if isinstance(pin, Pin):
+            self.canal = pin.id - 26
+        else:
+            self.canal = pin if pin < 26 else pin - 26
+        self.nb_lectures = 0
+
+    def read_u16(self):
+        self.nb_lectures += 1
+        valeur = ADC.valeurs.get(self.canal, 0)
+        if callable(valeur):
+            valeur = valeur(horloge.us)
+        # Le convertisseur du RP2040 fait 12 bits, étendus sur 16
+        valeur = max(0, min(65535, int(valeur)))
+        return (valeur >> 4) << 4 | (valeur >> 12)
+
+
+class WDT:
+    # Instance active (une seule sur la carte)
+    actif = None
+    TIMEOUT_MAX_MS = 8388
+
+    def __init__(self, id=0, timeout=5000):
+        if timeout > WDT.TIMEOUT_MAX_MS:
+            raise ValueError("timeout too large")
+        self.timeout_ms = timeout
+        self.nb_nourri = 0
+        self.ecart_max_ms = 0
+        self._dernier_us = horloge.us
+        WDT.actif = self
+        self._armer()
+
+    def _armer(self):
+        dernier = self._dernier_us
+
+        def verifier():
+            if self._dernier_us == dernier:
+                horloge.tracer("wdt", "expiration")
+                raise ResetWatchdog(f"watchdog non nourri depuis {self.timeout_ms} ms")
+
+        horloge.planifier(dernier + self.timeout_ms * 1000, verifier)
+
+    def feed(self):
+        ecart = (horloge.us - self._dernier_us) // 1000
+        if ecart > self.ecart_max_ms:
+            self.ecart_max_ms = ecart
+        self.nb_nourri += 1
+        self._dernier_us = horloge.us
+        self._armer()
+
+
+def reinitialiser():
+    Pin.broches.clear()
+    I2C.peripheriques.clear()
+    I2C.modeliser_duree = False
+    ADC.valeurs.clear()
+    WDT.actif = None
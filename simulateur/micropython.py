@@ -0,0 +1,77 @@
+# Module `micropython` de substitution pour la simulation sur l'hôte
+from simulateur.horloge import horloge
+
+# Profondeur de la file de micropython.schedule() sur rp2
+PROFONDEUR_SCHEDULE = 8
+
+_en_attente = 0
+nb_schedule = 0
+nb_schedule_refuses = 0
+
+
+def const(valeur):
+    return valeur
+
+
+def schedule(fonction, argument):
+    """Comme sur la carte: exécution différée, RuntimeError si la file est pleine"""
+    global _en_attente, nb_schedule, nb_schedule_refuses
+    if _en_attente >= PROFONDEUR_SCHEDULE:
+        nb_schedule_refuses += 1
+        raise RuntimeError("schedule queue full")
+    _en_attente += 1
+    nb_schedule += 1
+
+    def appeler():
+        global _en_attente
+        _en_attente -= 1
+        fonction(argument)
+
+    horloge.planifier(horloge.us, appeler)
+
+
+def reinitialiser():
+    global _en_attente, nb_schedule, nb_schedule_refuses
+    _en_attente = 0
+    nb_schedule = 0
+    nb_schedule_refuses = 0
+
+
+def alloc_emergency_exception_buf(taille):
+    pass
+
+
+def mem_info(*args):
+    pass
+
+
+def qstr_info(*args):
+    pass
+
+
+def stack_use():
+    return 0
+
+
+def heap_lock():
+    return 0
+
+
+def heap_unlock():
+    return 0
+
+
+def kbd_intr(caractere):
+    pass
+
+
+def opt_level(*args):
+    return 0
+
+
+def native(fonction):
+    return fonction
+
+
+def viper(fonction):
+    return fonction
@@ -0,0 +1,63 @@
+# Module `neopixel` de substitution: garde la dernière trame envoyée au ruban
+from simulateur.horloge import horloge
+
+
+class NeoPixel:
+    ORDER = (1, 0, 2, 3)
+
+    # Rubans créés, pour inspection par le simulateur
+    instances = []
+    # Si vrai, write() bloque le temps d'envoi de la trame (1,25 us par bit),
+    # IRQ masquées comme avec machine.bitstream sur le RP2040
+    modeliser_duree = False
+
+    def __init__(self, pin, n, bpp=3, timing=1):
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+        self.trame = bytes(n * bpp)     # Ce que le ruban affiche réellement
+
+        # Statistiques
+        self.nb_ecritures = 0
+        self.ecart_max_us = 0
+        self._derniere_us = None
+        NeoPixel.instances.append(self)
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, i, v):
+        o = i * self.bpp
+        for k in range(self.bpp):
+            self.buf[o + self.ORDER[k]] = v[k]
+
+    def __getitem__(self, i):
+        o = i * self.bpp
+        return tuple(self.buf[o + self.ORDER[k]] for k in range(self.bpp))
+
+    def fill(self, v):
+        for i in range(self.n):
+            self[i] = v
+
+    def write(self):
+        if NeoPixel.modeliser_duree:
+            horloge.us += len(self.buf) * 10
+        self.trame = bytes(self.buf)
+        if self._derniere_us is not None:
+            ecart = horloge.us - self._derniere_us
+            if ecart > self.ecart_max_us:
+                self.ecart_max_us = ecart
+        self._derniere_us = horloge.us
+        self.nb_ecritures += 1
+        horloge.tracer("neopixel", "write")
+
+    def couleur(self, i):
+        """Couleur (r, g, b) effectivement affichée par la LED i"""
+        o = i * self.bpp
+        return tuple(self.trame[o + self.ORDER[k]] for k in range(3))
+
+
+def reinitialiser():
+    NeoPixel.instances.clear()
+    NeoPixel.modeliser_duree = False
@@ -0,0 +1,141 @@
+# Périphériques BLE scriptés pour la simulation (pédale, cardio, ...)
+from simulateur.horloge import horloge
+
+FLAG_READ = 0x0002
+FLAG_WRITE_NO_RESPONSE = 0x0004
+FLAG_WRITE = 0x0008
+FLAG_NOTIFY = 0x0010
+FLAG_INDICATE = 0x0020
+
+_AD_FLAGS = 0x01
+_AD_UUID16_COMPLET = 0x03
+_AD_UUID128_COMPLET = 0x07
+_AD_NOM_COMPLET = 0x09
+
+
+class Caracteristique:
+    def __init__(self, uuid, proprietes, valeur=b"", sur_ecriture=None):
+        self.uuid = uuid
+        self.proprietes = proprietes
+        self.valeur = bytes(valeur)
+        self.sur_ecriture = sur_ecriture   # fonction(pair, donnees) appelée à chaque écriture
+        self.h_definition = 0
+        self.h_valeur = 0
+        self.h_cccd = 0
+
+
+class Service:
+    def __init__(self, uuid, caracteristiques):
+        self.uuid = uuid
+        self.caracteristiques = list(caracteristiques)
+        self.debut = 0
+        self.fin = 0
+
+
+class Peripherique:
+    """
+    Pair BLE scripté: annonce périodiquement tant qu'il n'est pas connecté,
+    expose une table GATT (handles attribués comme sur un vrai serveur: le
+    CCCD suit immédiatement la valeur) et envoie des notifications aux
+    caractéristiques auxquelles la centrale s'est abonnée.
+    """
+
+    def __init__(self, adresse, services, nom=None, type_adresse=0, rssi=-60,
+                 intervalle_annonce_ms=100, uuids_annonces=None):
+        self.adresse = bytes(adresse)
+        self.services = list(services)
+        self.nom = nom
+        self.type_adresse = type_adresse
+        self.rssi = rssi
+        self.intervalle_annonce_us = intervalle_annonce_ms * 1000
+        self.a_portee = True
+        self.connexion = None      # Handle de connexion côté centrale
+        self.abonnements = set()   # Handles de valeur avec notifications actives
+
+        # Statistiques
+        self.nb_annonces = 0
+        self.nb_notifications = 0
+        self.nb_notifications_perdues = 0
+
+        self._handles = {}
+        h = 1
+        for service in self.services:
+            service.debut = h
+            for car in service.caracteristiques:
+                car.h_definition = h + 1
+                car.h_valeur = h + 2
+                h += 2
+                if car.proprietes & (FLAG_NOTIFY | FLAG_INDICATE):
+                    car.h_cccd = h + 1
+                    h += 1
+                self._handles[car.h_valeur] = car
+                if car.h_cccd:
+                    self._handles[car.h_cccd] = car
+            service.fin = h
+            h += 1
+
+        if uuids_annonces is None:
+            uuids_annonces = [s.uuid for s in self.services]
+        self.annonce = self._construire_annonce(uuids_annonces)
+
+    def _construire_annonce(self, uuids):
+        annonce = bytearray((2, _AD_FLAGS, 0x06))
+        courts = b"".join(bytes(u) for u in uuids if len(bytes(u)) == 2)
+        longs = [bytes(u) for u in uuids if len(bytes(u)) == 16]
+        if courts:
+            annonce += bytes((len(courts) + 1, _AD_UUID16_COMPLET)) + courts
+        if longs and len(annonce) + 18 <= 31:
+            annonce += bytes((17, _AD_UUID128_COMPLET)) + longs[0]
+        if self.nom:
+            nom = self.nom.encode()[:31 - len(annonce) - 2]
+            annonce += bytes((len(nom) + 1, _AD_NOM_COMPLET)) + nom
+        return bytes(annonce)
+
+    def caracteristique(self, uuid):
+        for service in self.services:
+            for car in service.caracteristiques:
+                if car.uuid == uuid:
+                    return car
+        raise KeyError(uuid)
+
+    def par_handle(self, handle):
+        return self._handles.get(handle)
+
+    def notifier(self, uuid, donnees):
+        """Met à jour la valeur et la notifie si la centrale est abonnée"""
+        car = self.caracteristique(uuid)
+        car.valeur = bytes(donnees)
+        if self.connexion is None or car.h_valeur not in self.abonnements:
+            self.nb_notifications_perdues += 1
+            return False
+        self.nb_notifications += 1
+        self.radio.notification(self, car)
+        return True
+
+    def notifier_periodiquement(self, uuid, periode_ms, fabrique, debut_ms=0):
+        """Appelle fabrique(t_ms) toutes les periode_ms et notifie le résultat"""
+        def tic():
+            donnees = fabrique(horloge.us // 1000)
+            if donnees is not None:
+                self.notifier(uuid, donnees)
+            horloge.dans(periode_ms * 1000, tic)
+
+        horloge.planifier(debut_ms * 1000, tic)
+
+    def hors_portee(self, a_ms, pendant_ms):
+        """Le pair disparaît (ex: pédale à l'arrêt) puis revient"""
+        def partir():
+            self.a_portee = False
+            horloge.tracer("pair", f"{self.nom} hors de portée")
+            if self.radio is not None:
+                self.radio.hors_portee(self)
+
+        def revenir():
+            self.a_portee = True
+            horloge.tracer("pair", f"{self.nom} de retour")
+
+        horloge.planifier(a_ms * 1000, partir)
+        horloge.planifier((a_ms + pendant_ms) * 1000, revenir)
+
+    # Renseigné par bluetooth.ajouter_pair()
+    radio = None
@@ -0,0 +1,127 @@
+# Scénarios de simulation: pairs BLE du vélo, capteurs et boutons
+import struct
+
+from simulateur.horloge import horloge
+from simulateur import bluetooth, machine
+from simulateur.pairs import (Peripherique, Service, Caracteristique,
+                              FLAG_READ, FLAG_NOTIFY, FLAG_WRITE, FLAG_WRITE_NO_RESPONSE)
+from simulateur.ssd1306 import EcranSimule
+
+ADRESSE_ASSIOMA = b"\xE9\xB5\x4A\x31\x63\xB5"
+ADRESSE_CARDIO = b"\xA0\x9E\x1A\x86\xEC\x33"
+
+# Tension de sortie de l'ACS712 à courant nul (2,54 V) en pas ADC 16 bits
+ADC_ZERO_ACS712 = 50441
+
+
+def _uuid(valeur):
+    return bluetooth.UUID(valeur)
+
+
+def trame_puissance(t_ms, puissance_w, cadence_rpm):
+    """Notification 0x2A63 au format Assioma (flags 0x0023: équilibre + pédalier)"""
+    if not cadence_rpm:
+        tours = 0
+        instant = 0
+    else:
+        tours = t_ms * cadence_rpm // 60000
+        instant = tours * 60000 // cadence_rpm * 1024 // 1000
+    return struct.pack("<HhBHH", 0x0023, puissance_w, 100, tours & 0xFFFF, instant & 0xFFFF)
+
+
+def trame_cardio(bpm):
+    """Notification 0x2A37: fréquence sur 8 bits, sans champ optionnel"""
+    return bytes((0x00, bpm))
+
+
+def puissance_rampe(t_ms):
+    """Rampe de 150 à 245 W qui recommence toutes les 20 s"""
+    return 150 + (t_ms // 1000) % 20 * 5
+
+
+def frequence_rampe(t_ms):
+    return 120 + (t_ms // 1000) % 30
+
+
+def pedale_assioma(puissance=puissance_rampe, cadence_rpm=85, periode_ms=500, batterie=85):
+    """
+    Pédale Assioma: Cycling Power et Battery Service. puissance(t_ms) -> W.
+    Sans periode_ms, la pédale ne notifie rien d'elle-même.
+    """
+    pedale = Peripherique(ADRESSE_ASSIOMA, [
+        Service(_uuid(0x1818), [Caracteristique(_uuid(0x2A63), FLAG_NOTIFY)]),
+        Service(_uuid(0x180F), [Caracteristique(_uuid(0x2A19), FLAG_READ | FLAG_NOTIFY, bytes((batterie,)))]),
+    ], nom="ASSIOMA", type_adresse=1, uuids_annonces=[_uuid(0x1818)])
+
+    if periode_ms:
+        pedale.notifier_periodiquement(
+            _uuid(0x2A63), periode_ms,
+            lambda t_ms: trame_puissance(t_ms, puissance(t_ms), cadence_rpm))
+    return pedale
+
+
+def ceinture_cardio(frequence=frequence_rampe, periode_ms=1000):
+    """Cardiofréquencemètre (0x180D/0x2A37) avec un service UART Nordic en écho"""
+    uart_tx = _uuid("6E400003-B5A3-F393-E0A9-E50E24DCCA9E")
+
+    def echo(pair, donnees):
+        pair.notifier(uart_tx, donnees)
+
+    cardio = Peripherique(ADRESSE_CARDIO, [
+        Service(_uuid(0x180D), [Caracteristique(_uuid(0x2A37), FLAG_NOTIFY)]),
+        Service(_uuid("6E400001-B5A3-F393-E0A9-E50E24DCCA9E"), [
+            Caracteristique(_uuid("6E400002-B5A3-F393-E0A9-E50E24DCCA9E"),
+                            FLAG_WRITE | FLAG_WRITE_NO_RESPONSE, sur_ecriture=echo),
+            Caracteristique(uart_tx, FLAG_NOTIFY),
+        ]),
+    ], nom="HRM", uuids_annonces=[_uuid(0x180D)])
+
+    if periode_ms:
+        cardio.notifier_periodiquement(_uuid(0x2A37), periode_ms,
+                                       lambda t_ms: trame_cardio(frequence(t_ms)))
+    return cardio
+
+
+def appuyer(broche, a_ms, duree_ms=80):
+    """Appui sur un bouton câblé vers la masse (entrée en pull-up)"""
+    horloge.planifier(a_ms * 1000, lambda: machine.forcer_broche(broche, 0), materiel=True)
+    horloge.planifier((a_ms + duree_ms) * 1000, lambda: machine.forcer_broche(broche, 1), materiel=True)
+
+
+def roue(vitesse_kmh, circonference_mm=2105, broche=21, rebonds=2, debut_ms=0):
+    """
+    Contact reed de la roue (vers la masse): une fermeture par tour, suivie
+    de `rebonds` rebonds de 0,3 ms. vitesse_kmh: nombre ou fonction(t_ms).
+    """
+    def tour():
+        v = vitesse_kmh(horloge.us // 1000) if callable(vitesse_kmh) else vitesse_kmh
+        if v <= 0:
+            horloge.dans(500000, tour, materiel=True)
+            return
+        machine.forcer_broche(broche, 0)
+        for k in range(rebonds):
+            horloge.dans(300 * (2 * k + 1), lambda: machine.forcer_broche(broche, 1), materiel=True)
+            horloge.dans(300 * (2 * k + 2), lambda: machine.forcer_broche(broche, 0), materiel=True)
+        horloge.dans(5000, lambda: machine.forcer_broche(broche, 1), materiel=True)
+        horloge.dans(int(circonference_mm * 3600 / v), tour, materiel=True)
+
+    horloge.planifier(debut_ms * 1000, tour, materiel=True)
+
+
+def velo(courant_a=0.0, demarrage_moteur_ms=3000):
+    """
+    Banc complet: pédale et cardio à portée, écran SSD1306 en 0x3C,
+    ACS712 sur ADC0 traversé par courant_a ampères (66 mV/A) une fois le
+    moteur démarré (courant nul avant, pour la calibration au démarrage).
+    Renvoie (pédale, cardio, écran).
+    """
+    pedale = pedale_assioma()
+    cardio = ceinture_cardio()
+    bluetooth.ajouter_pair(pedale)
+    bluetooth.ajouter_pair(cardio)
+
+    ecran = EcranSimule()
+    machine.I2C.peripheriques[0x3C] = ecran
+    en_marche = ADC_ZERO_ACS712 + int(courant_a * 0.066 / 3.3 * 65535)
+    machine.ADC.valeurs[0] = lambda t_us: ADC_ZERO_ACS712 if t_us < demarrage_moteur_ms * 1000 else en_marche
+    return pedale, cardio, ecran
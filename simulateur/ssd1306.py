@@ -0,0 +1,188 @@
+# Pilote SSD1306 de substitution: même interface que le pilote micropython-lib
+from micropython import const
+import framebuf
+
+SET_CONTRAST = const(0x81)
+SET_ENTIRE_ON = const(0xA4)
+SET_NORM_INV = const(0xA6)
+SET_DISP = const(0xAE)
+SET_MEM_ADDR = const(0x20)
+SET_COL_ADDR = const(0x21)
+SET_PAGE_ADDR = const(0x22)
+SET_DISP_START_LINE = const(0x40)
+SET_SEG_REMAP = const(0xA0)
+SET_MUX_RATIO = const(0xA8)
+SET_IREF_SELECT = const(0xAD)
+SET_COM_OUT_DIR = const(0xC0)
+SET_DISP_OFFSET = const(0xD3)
+SET_COM_PIN_CFG = const(0xDA)
+SET_DISP_CLK_DIV = const(0xD5)
+SET_PRECHARGE = const(0xD9)
+SET_VCOM_DESEL = const(0xDB)
+SET_CHARGE_PUMP = const(0x8D)
+
+
+class SSD1306(framebuf.FrameBuffer):
+    def __init__(self, width, height, external_vcc):
+        self.width = width
+        self.height = height
+        self.external_vcc = external_vcc
+        self.pages = self.height // 8
+        self.buffer = bytearray(self.pages * self.width)
+        super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
+        self.init_display()
+
+    def init_display(self):
+        for cmd in (
+            SET_DISP,
+            SET_MEM_ADDR, 0x00,
+            SET_DISP_START_LINE,
+            SET_SEG_REMAP | 0x01,
+            SET_MUX_RATIO, self.height - 1,
+            SET_COM_OUT_DIR | 0x08,
+            SET_DISP_OFFSET, 0x00,
+            SET_COM_PIN_CFG, 0x02 if self.width > 2 * self.height else 0x12,
+            SET_DISP_CLK_DIV, 0x80,
+            SET_PRECHARGE, 0x22 if self.external_vcc else 0xF1,
+            SET_VCOM_DESEL, 0x30,
+            SET_CONTRAST, 0xFF,
+            SET_ENTIRE_ON,
+            SET_NORM_INV,
+            SET_IREF_SELECT, 0x30,
+            SET_CHARGE_PUMP, 0x10 if self.external_vcc else 0x14,
+            SET_DISP | 0x01,
+        ):
+            self.write_cmd(cmd)
+        self.fill(0)
+        self.show()
+
+    def poweroff(self):
+        self.write_cmd(SET_DISP)
+
+    def poweron(self):
+        self.write_cmd(SET_DISP | 0x01)
+
+    def contrast(self, contrast):
+        self.write_cmd(SET_CONTRAST)
+        self.write_cmd(contrast)
+
+    def invert(self, invert):
+        self.write_cmd(SET_NORM_INV | (invert & 1))
+
+    def rotate(self, rotate):
+        self.write_cmd(SET_COM_OUT_DIR | ((rotate & 1) << 3))
+        self.write_cmd(SET_SEG_REMAP | (rotate & 1))
+
+    def show(self):
+        x0 = 0
+        x1 = self.width - 1
+        if self.width != 128:
+            col_offset = (128 - self.width) // 2
+            x0 += col_offset
+            x1 += col_offset
+        self.write_cmd(SET_COL_ADDR)
+        self.write_cmd(x0)
+        self.write_cmd(x1)
+        self.write_cmd(SET_PAGE_ADDR)
+        self.write_cmd(0)
+        self.write_cmd(self.pages - 1)
+        self.write_data(self.buffer)
+
+
+class SSD1306_I2C(SSD1306):
+    def __init__(self, width, height, i2c, addr=0x3C, external_vcc=False):
+        self.i2c = i2c
+        self.addr = addr
+        self.temp = bytearray(2)
+        self.write_list = [b"\x40", None]  # Co=0, D/C#=1
+        super().__init__(width, height, external_vcc)
+
+    def write_cmd(self, cmd):
+        self.temp[0] = 0x80  # Co=1, D/C#=0
+        self.temp[1] = cmd
+        self.i2c.writeto(self.addr, self.temp)
+
+    def write_data(self, buf):
+        self.write_list[1] = buf
+        self.i2c.writevto(self.addr, self.write_list)
+
+
+# Nombre d'octets d'arguments de chaque commande (les autres n'en ont pas)
+_ARGUMENTS = {
+    SET_CONTRAST: 1, SET_MEM_ADDR: 1, SET_COL_ADDR: 2, SET_PAGE_ADDR: 2,
+    SET_MUX_RATIO: 1, SET_IREF_SELECT: 1, SET_DISP_OFFSET: 1, SET_COM_PIN_CFG: 1,
+    SET_DISP_CLK_DIV: 1, SET_PRECHARGE: 1, SET_VCOM_DESEL: 1, SET_CHARGE_PUMP: 1,
+}
+
+
+class EcranSimule:
+    """
+    Contrôleur SSD1306 côté bus I2C: décode les commandes et tient à jour
+    la RAM d'affichage (mode d'adressage horizontal avec fenêtre). Permet de
+    vérifier que ce qui est réellement à l'écran correspond au framebuffer.
+    """
+
+    def __init__(self, largeur=128, hauteur=64):
+        self.largeur = largeur
+        self.pages = hauteur // 8
+        self.gram = bytearray(largeur * self.pages)
+        self._commande = None
+        self._arguments = []
+        self._col = (0, largeur - 1)
+        self._page = (0, self.pages - 1)
+        self._x = 0
+        self._p = 0
+        self.allume = False
+        self.octets_donnees = 0
+
+    def recevoir(self, octets):
+        i = 0
+        while i < len(octets):
+            controle = octets[i]
+            i += 1
+            if controle & 0x40:
+                # Données jusqu'à la fin de la transaction
+                self._donnees(octets[i:])
+                return
+            if controle & 0x80:
+                # Co=1: un seul octet de commande suit
+                if i < len(octets):
+                    self._octet_commande(octets[i])
+                    i += 1
+            else:
+                # Co=0: flot de commandes jusqu'à la fin
+                for octet in octets[i:]:
+                    self._octet_commande(octet)
+                return
+
+    def _octet_commande(self, octet):
+        if self._commande is not None:
+            self._arguments.append(octet)
+            if len(self._arguments) < _ARGUMENTS[self._commande]:
+                return
+            commande, arguments = self._commande, self._arguments
+            self._commande = None
+            self._arguments = []
+            if commande == SET_COL_ADDR:
+                self._col = (arguments[0], arguments[1])
+                self._x = arguments[0]
+            elif commande == SET_PAGE_ADDR:
+                self._page = (arguments[0], arguments[1])
+                self._p = arguments[0]
+            return
+        if octet in _ARGUMENTS:
+            self._commande = octet
+        elif octet & 0xFE == SET_DISP:
+            self.allume = bool(octet & 1)
+
+    def _donnees(self, octets):
+        self.octets_donnees += len(octets)
+        for octet in octets:
+            if self._x < self.largeur and self._p < self.pages:
+                self.gram[self._p * self.largeur + self._x] = octet
+            self._x += 1
+            if self._x > self._col[1]:
+                self._x = self._col[0]
+                self._p += 1
+                if self._p > self._page[1]:
+                    self._p = self._page[0]
@@ -0,0 +1,103 @@
+# Module `uasyncio` de substitution: boucle d'événements sur l'horloge virtuelle
+from simulateur.horloge import horloge
+
+
+class _Sommeil:
+    __slots__ = ("us",)
+
+    def __init__(self, us):
+        self.us = us
+
+    def __await__(self):
+        yield self
+
+
+def sleep_ms(ms):
+    return _Sommeil(max(0, int(ms)) * 1000)
+
+
+def sleep(secondes):
+    return _Sommeil(max(0, int(secondes * 1000000)))
+
+
+class CancelledError(BaseException):
+    pass
+
+
+class Task:
+    def __init__(self, coro):
+        self.coro = coro
+        self.fait = False
+        self.resultat = None
+        self._annulee = False
+
+    def _reprendre(self):
+        if self.fait:
+            return
+        try:
+            if self._annulee:
+                demande = self.coro.throw(CancelledError())
+            else:
+                demande = self.coro.send(None)
+        except StopIteration as e:
+            self.fait = True
+            self.resultat = e.value
+            return
+        except CancelledError:
+            self.fait = True
+            return
+        except Exception:
+            self.fait = True
+            raise
+        delai = demande.us if isinstance(demande, _Sommeil) else 0
+        horloge.planifier(horloge.us + delai, self._reprendre, tache=True)
+
+    def done(self):
+        return self.fait
+
+    def cancel(self):
+        self._annulee = True
+
+    def __await__(self):
+        while not self.fait:
+            yield _Sommeil(0)
+        return self.resultat
+
+
+class Event:
+    def __init__(self):
+        self._etat = False
+
+    def set(self):
+        self._etat = True
+
+    def clear(self):
+        self._etat = False
+
+    def is_set(self):
+        return self._etat
+
+    async def wait(self):
+        while not self._etat:
+            await _Sommeil(1000)
+        return True
+
+
+ThreadSafeFlag = Event
+
+
+def create_task(coro):
+    tache = Task(coro)
+    horloge.planifier(horloge.us, tache._reprendre, tache=True)
+    return tache
+
+
+async def gather(*elements):
+    taches = [e if isinstance(e, Task) else create_task(e) for e in elements]
+    return [await t for t in taches]
+
+
+def run(coro):
+    principale = create_task(coro)
+    horloge.executer(arret=lambda: principale.fait)
+    return principale.resultat
@@ -0,0 +1,13 @@
+# Module `ubinascii` de substitution: binascii de CPython avec la signature MicroPython
+from binascii import unhexlify, a2b_base64, crc32  # noqa: F401
+import binascii as _binascii
+
+
+def hexlify(donnees, separateur=None):
+    if separateur is None:
+        return _binascii.hexlify(bytes(donnees))
+    return _binascii.hexlify(bytes(donnees), separateur)
+
+
+def b2a_base64(donnees, newline=True):
+    return _binascii.b2a_base64(bytes(donnees), newline=newline)
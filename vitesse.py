@@ -0,0 +1,192 @@
+import json
+import os
+import time
+from array import array
+from micropython import const
+
+from machine import Pin
+
+import coeurs
+
+FICHIER_ODOMETRE = "odometre.json"
+
+_TAILLE_ANNEAU = const(16)          # Périodes gardées (puissance de 2)
+_PERIODE_MIN_US = const(40000)      # ~190 km/h en 700c: plus court = rebond
+_DELAI_ARRET_MS = const(3000)       # Sans impulsion: vitesse nulle (~2,5 km/h)
+_ECART_SAUVEGARDE_M = const(100)
+
+# Valeurs lues par main.py et l'enregistreur
+current_speed = 0           # km/h
+vitesse_centi = 0           # km/h x 100
+distance_trajet_m = 0
+odometre_m = 0
+capteur = None
+
+_reste_mm = 0
+_odometre_sauve = 0
+_t_sauvegarde = None
+
+
+class CapteurVitesse:
+    """
+    Vitesse de roue à partir d'un contact reed (un aimant par tour).
+
+    Le gestionnaire d'IRQ (hard) ne fait qu'horodater l'impulsion avec
+    ticks_us et ranger l'intervalle depuis la précédente dans un tableau 'I'
+    préalloué, en tenant la somme des `nb_periodes` derniers intervalles:
+    aucune allocation, O(1). À 60 km/h une roue de 700c fait un tour toutes
+    les 126 ms, très loin de la limite du gestionnaire.
+
+    Filtre anti-rebond par période: une impulsion arrivant moins de
+    _PERIODE_MIN_US après la précédente, ou moins d'une demi-période après
+    elle (un vrai tour ne peut pas durer deux fois moins que le précédent),
+    est comptée comme rebond et ignorée.
+
+    vitesse_centi(maintenant_us) lit la somme sans masquer les IRQ: la lecture
+    est refaite si une impulsion est arrivée pendant. Sans impulsion depuis
+    delai_arret_ms, la vitesse est nulle; entre les deux, la vitesse est
+    bornée par le temps écoulé depuis la dernière impulsion, ce qui la fait
+    décroître progressivement au freinage.
+    """
+
+    def __init__(self, broche, circonference_mm=2105, nb_periodes=4, delai_arret_ms=_DELAI_ARRET_MS):
+        self.circonference_mm = circonference_mm
+        self.nb_periodes = nb_periodes
+        self.delai_arret_us = delai_arret_ms * 1000
+        self._periodes = array('I', [0] * _TAILLE_ANNEAU)
+        self._tete = 0
+        self._nb = 0             # Périodes valides consécutives (bornée à _TAILLE_ANNEAU)
+        self._somme = 0          # Somme des min(_nb, nb_periodes) dernières périodes
+        self._derniere = 0       # ticks_us de la dernière impulsion retenue
+        self._en_route = False
+        self.nb_tours = 0
+        self.nb_rebonds = 0
+        self._tours_lus = 0
+        broche.irq(handler=self._irq, trigger=Pin.IRQ_FALLING, hard=True)
+
+    def _irq(self, broche):
+        t = time.ticks_us()
+        if not self._en_route:
+            # Premier tour après un arrêt: pas encore de période
+            self._en_route = True
+            self._derniere = t
+            self._nb = 0
+            self._somme = 0
+            self.nb_tours += 1
+            return
+        dt = time.ticks_diff(t, self._derniere)
+        if dt < _PERIODE_MIN_US:
+            self.nb_rebonds += 1
+            return
+        if self._nb and dt < self._periodes[(self._tete - 1) & (_TAILLE_ANNEAU - 1)] >> 1:
+            self.nb_rebonds += 1
+            return
+        self._derniere = t
+        self.nb_tours += 1
+        if dt > self.delai_arret_us:
+            # Roue arrêtée entre-temps: l'intervalle ne mesure pas une vitesse
+            self._nb = 0
+            self._somme = 0
+            return
+        i = self._tete
+        if self._nb >= self.nb_periodes:
+            self._somme -= self._periodes[(i - self.nb_periodes) & (_TAILLE_ANNEAU - 1)]
+        self._periodes[i] = dt
+        self._somme += dt
+        self._tete = (i + 1) & (_TAILLE_ANNEAU - 1)
+        if self._nb < _TAILLE_ANNEAU:
+            self._nb += 1
+
+    def vitesse_centi(self, maintenant_us):
+        """Vitesse en km/h x 100"""
+        while True:
+            tours = self.nb_tours
+            somme = self._somme
+            nb = self._nb
+            derniere = self._derniere
+            if tours == self.nb_tours:
+                break
+        if not self._en_route:
+            return 0
+        ecoule = time.ticks_diff(maintenant_us, derniere)
+        if ecoule > self.delai_arret_us:
+            # Une seule écriture (atomique vis-à-vis de l'IRQ): la prochaine
+            # impulsion repart de zéro, même après un retour à zéro de ticks_us
+            self._en_route = False
+            return 0
+        if nb > self.nb_periodes:
+            nb = self.nb_periodes
+        if nb == 0:
+            return 0
+        # Pas de tour depuis plus d'une période moyenne: la roue ralentit
+        if ecoule * nb > somme:
+            somme = ecoule
+            nb = 1
+        # mm/us = 3600 km/h, en entiers bornés: nb x circonférence x 3600 / (somme / 100)
+        return nb * self.circonference_mm * 3600 // (somme // 100)
+
+    def tours_depuis_lecture(self):
+        """Tours complets depuis l'appel précédent (pour la distance)"""
+        tours = self.nb_tours
+        n = tours - self._tours_lus
+        self._tours_lus = tours
+        return n
+
+
+def _charger_odometre():
+    try:
+        with open(FICHIER_ODOMETRE) as f:
+            return json.load(f)["m"]
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def demarrer(broche, circonference_mm=2105, nb_periodes=4):
+    """Branche le capteur sur la broche du reed (entrée en pull-up)"""
+    global capteur, odometre_m, _odometre_sauve
+    capteur = CapteurVitesse(broche, circonference_mm, nb_periodes)
+    odometre_m = _odometre_sauve = _charger_odometre()
+
+
+def mettre_a_jour():
+    """Recalcule vitesse et distances (tâche périodique, hors IRQ)"""
+    global current_speed, vitesse_centi, distance_trajet_m, odometre_m
+    if capteur is None:
+        return
+    vitesse_centi = capteur.vitesse_centi(time.ticks_us())
+    current_speed = vitesse_centi / 100
+    tours = capteur.tours_depuis_lecture()
+    if tours:
+        _ajouter_distance_mm(tours * capteur.circonference_mm)
+
+
+def _ajouter_distance_mm(mm):
+    # Reste en mm gardé pour ne pas perdre les fractions de mètre
+    global _reste_mm, distance_trajet_m, odometre_m
+    _reste_mm += mm
+    metres = _reste_mm // 1000
+    if metres:
+        _reste_mm -= metres * 1000
+        distance_trajet_m += metres
+        odometre_m += metres
+
+
+def sauver(intervalle_ms=60000):
+    """Écrit l'odomètre en flash s'il a avancé, au plus une fois par intervalle_ms"""
+    global _odometre_sauve, _t_sauvegarde
+    if odometre_m - _odometre_sauve < _ECART_SAUVEGARDE_M:
+        return
+    maintenant = time.ticks_ms()
+    if _t_sauvegarde is not None and time.ticks_diff(maintenant, _t_sauvegarde) < intervalle_ms:
+        return
+    temporaire = FICHIER_ODOMETRE + ".tmp"
+    with coeurs.verrou_flash:
+        try:
+            with open(temporaire, "w") as f:
+                json.dump({"m": odometre_m}, f)
+            os.rename(temporaire, FICHIER_ODOMETRE)
+        except OSError as e:
+            print(f"Erreur écriture odomètre: {e}")
+            return
+    _odometre_sauve = odometre_m
+    _t_sauvegarde = maintenant